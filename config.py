@@ -20,6 +20,16 @@ class Config:
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
     SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///local_dev.db'
 
+    # Connection pool sized for threaded workers: every gunicorn thread (and the dashboard's
+    # widget pool) may hold one connection. pre_ping drops connections the server closed.
+    if DATABASE_URL:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'pool_pre_ping': True,
+            'pool_recycle': 280,
+        }
+
     # Cashfree
     CASHFREE_APP_ID = os.environ.get('CASHFREE_APP_ID')
     CASHFREE_SECRET_KEY = os.environ.get('CASHFREE_SECRET_KEY')
@@ -36,3 +46,88 @@ class Config:
     CELERY_BROKER_CONNECTION_RETRY = True
     CELERY_BROKER_CONNECTION_MAX_RETRIES = 10
     CELERY_TASK_IGNORE_RESULT = True
+
+    # --- Concurrency (see gunicorn.conf.py) ---
+    # Per-worker caps on concurrent requests for slow blueprint groups, so AI calls and
+    # long-lived streams can't take every thread and starve normal page loads.
+    # Entries are blueprint names or single 'blueprint.endpoint' names.
+    CONCURRENCY_GROUPS = {
+        'ai': ['ai_api', 'tool.ai_generator', 'tool.api_generate_description', 'tool.api_generate_script'],
+        'reports': ['report'],
+        'streams': ['sse'],
+    }
+    CONCURRENCY_LIMITS = {
+        'ai': int(os.environ.get('AI_CONCURRENCY_LIMIT', 3)),
+        'reports': int(os.environ.get('REPORT_CONCURRENCY_LIMIT', 1)),
+        'streams': int(os.environ.get('SSE_CONCURRENCY_LIMIT', 4)),
+    }
+    # How long a request waits for a free slot before getting a 503.
+    CONCURRENCY_WAIT_SECONDS = 2
+
+    # --- Rate limiting (Flask-Limiter, see tubealgo/rate_limits.py) ---
+    # Counters live in Redis so limits are shared by all workers and web nodes.
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', REDIS_URL)
+    RATELIMIT_STRATEGY = 'moving-window'
+    RATELIMIT_HEADERS_ENABLED = True
+    RATELIMIT_KEY_PREFIX = 'tubealgo-rl'
+    # If Redis goes down, limit per process instead of failing requests.
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
+    RATELIMIT_SWALLOW_ERRORS = True
+    # Endpoint classes by blueprint, or by single 'blueprint.endpoint' (which wins over
+    # its blueprint's class); anything not listed counts as 'page'. Only the AI-generation
+    # tool views are 'ai': keyword autocomplete runs on every keystroke.
+    RATE_LIMIT_CLASSES = {
+        'ai': ['ai_api', 'tool.ai_generator', 'tool.api_generate_description', 'tool.api_generate_script'],
+        'youtube': ['api', 'analysis', 'competitor', 'seo', 'video_analytics'],
+    }
+    RATE_LIMIT_EXEMPT_BLUEPRINTS = ['sse', 'admin', 'telegram']
+    RATE_LIMIT_EXEMPT_ENDPOINTS = ['core.health_check', 'payment.cashfree_webhook']
+    # Per plan and class. 'anonymous' is logged-out traffic (limited per IP).
+    RATE_LIMITS = {
+        'anonymous': {'page': '60 per minute;600 per hour', 'ai': '5 per minute;20 per hour', 'youtube': '10 per minute;60 per hour'},
+        'free': {'page': '120 per minute;2000 per hour', 'ai': '10 per minute;60 per hour', 'youtube': '20 per minute;200 per hour'},
+        'creator': {'page': '240 per minute;5000 per hour', 'ai': '20 per minute;200 per hour', 'youtube': '40 per minute;600 per hour'},
+        'pro': {'page': '300 per minute;8000 per hour', 'ai': '40 per minute;500 per hour', 'youtube': '80 per minute;1500 per hour'},
+    }
+
+    # --- SQL query profiling (see tubealgo/query_profiler.py) ---
+    # Off unless an environment opts in with QUERY_PROFILER_ENABLED=true (e.g. a local .env, or one Render service while investigating).
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'false').lower() == 'true'
+    # Same statement shape this many times in one request/task = likely N+1.
+    QUERY_REPEAT_THRESHOLD = 10
+    # Total queries in one request/task above which it is flagged anyway.
+    QUERY_COUNT_WARNING = 50
+
+    # --- Monthly PDF reports (see tubealgo/services/report_service.py) ---
+    # Generated PDFs are kept here. Web and Celery workers should share this path;
+    # if they don't, on-demand reports are handed over through Redis instead.
+    REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'reports'))
+    # Older reports kept per user on disk.
+    REPORT_CACHE_KEEP = 3
+
+    # --- Bulk competitor export (see tubealgo/services/bulk_export.py) ---
+    BULK_EXPORT_DIR = os.environ.get('BULK_EXPORT_DIR', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'exports'))
+    # Plans that can export every tracked competitor at once.
+    BULK_EXPORT_PLANS = ['pro']
+    # Set when the web service and Celery workers share BULK_EXPORT_DIR. Otherwise finished
+    # archives are copied to the web service through Redis, which is also the Celery broker,
+    # so only archives up to 4 MB can be delivered that way. Enable this for anything larger.
+    BULK_EXPORT_SHARED_DIR = os.environ.get('BULK_EXPORT_SHARED_DIR', 'false').lower() == 'true'
+
+    # --- Category leaderboards (see tubealgo/services/leaderboard_service.py) ---
+    # Refreshed daily; each region costs ~100 quota units per assignable category.
+    LEADERBOARD_REGIONS = [r.strip().upper() for r in os.environ.get('LEADERBOARD_REGIONS', 'IN').split(',') if r.strip()]
+
+    # --- Google Trends (see tubealgo/services/trends_service.py) ---
+    # Every payload includes this keyword and all series are scaled so its average is 100.
+    # Pick something steadily searched on YouTube; a far bigger anchor flattens small keywords to 0.
+    TRENDS_ANCHOR_KEYWORD = os.environ.get('TRENDS_ANCHOR_KEYWORD', 'recipe')
+
+    # --- Telegram bot webhook (see tubealgo/routes/telegram_routes.py) ---
+    # Public base URL Telegram calls, e.g. https://tubealgo.example.com; used by `flask telegram-webhook set`.
+    # The endpoint only accepts updates when TELEGRAM_WEBHOOK_SECRET is set (env or site setting).
+    TELEGRAM_WEBHOOK_BASE_URL = os.environ.get('TELEGRAM_WEBHOOK_BASE_URL')
+
+    # Server-sent events
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_MAX_STREAM_SECONDS = 300
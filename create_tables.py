@@ -49,7 +49,16 @@ def create_all_tables():
                 Coupon,
                 ApiCache,
                 APIKeyStatus,
-                SiteSetting
+                SiteSetting,
+                VideoDailyMetric,
+                ChannelDailyMetric,
+                ChannelTrafficDaily,
+                AnalyticsIngestRun,
+                ChannelAlias,
+                ChannelProfile,
+                CategoryLeaderboardEntry,
+                KeywordTerm,
+                NotificationOutbox
             )
             print("   ✓ All models imported successfully")
             
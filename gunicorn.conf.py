@@ -1,16 +1,35 @@
 # gunicorn.conf.py
-import multiprocessing
-
-# Use sync workers instead of async for better compatibility
-worker_class = 'sync'
+import os
+
+# Worker profile (set GUNICORN_PROFILE):
+#   'gthread' (default) - threaded workers. No monkey patching needed; Flask-SQLAlchemy
+#                         scopes the session to each request's app context, so every
+#                         thread gets its own session and pooled connection.
+#   'gevent'            - greenlet workers for many concurrent SSE streams.
+#                         Needs `pip install gevent psycogreen`.
+#   'sync'              - the old single-request-per-worker mode.
+# Slow blueprints (AI, reports, SSE) are additionally capped per worker via
+# CONCURRENCY_LIMITS in config.py so they can't take every thread.
+worker_profile = os.environ.get('GUNICORN_PROFILE', 'gthread')
 
 # Worker configuration
-workers = 1
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+if worker_profile == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 200))
+elif worker_profile == 'gthread':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 12))
+else:
+    worker_class = 'sync'
 
 # Bind address
 bind = '0.0.0.0:10000'
 
 # Timeouts
+# For gthread/gevent this is a worker heartbeat, not a per-request limit, so
+# long SSE streams are fine as long as the worker itself stays responsive.
 timeout = 120
 graceful_timeout = 60
 keepalive = 5
@@ -24,8 +43,18 @@ errorlog = '-'
 proc_name = 'tubealgo'
 
 # Server hooks
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 is a C extension; without this, DB calls block the whole gevent worker.
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen not installed; database calls will block gevent workers.")
+    server.log.info(f"Worker {worker.pid} started ({worker_class}).")
+
 def on_exit(server):
     server.log.info("TubeAlgo server shutting down...")
 
 def worker_abort(worker):
-    worker.log.info("Worker aborting...")
\ No newline at end of file
+    worker.log.info("Worker aborting...")
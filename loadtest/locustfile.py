@@ -0,0 +1,115 @@
+# loadtest/locustfile.py
+"""
+Load-test scenario for comparing gunicorn worker profiles.
+
+Simulates the situation the gthread profile is meant to fix: a few users
+hammering slow AI endpoints while everyone else is just loading pages.
+With the old single sync worker, page loads queue behind the AI calls;
+with gthread + concurrency caps, page latency should stay flat and the
+excess AI calls get fast 503s instead.
+
+Setup (not part of requirements.txt):
+    pip install locust
+
+Run the app with each profile, then the same load against it:
+    GUNICORN_PROFILE=sync    gunicorn -c gunicorn.conf.py run:app
+    GUNICORN_PROFILE=gthread gunicorn -c gunicorn.conf.py run:app
+
+    LOADTEST_EMAIL=you@example.com LOADTEST_PASSWORD=secret \
+        locust -f loadtest/locustfile.py --host http://127.0.0.1:10000 \
+        --headless -u 40 -r 5 -t 2m --csv loadtest/results_<profile>
+
+Compare requests/s and the p95 of the "page" rows in the two CSVs.
+Without LOADTEST_EMAIL only the public pages are exercised.
+
+Measured 2026-10-19 on one CPU, SQLite, no Redis, rate limiting off, a
+test user on the pro plan without a connected channel (so the dashboard
+widget rows are 404s), and the Gemini call replaced by a 3 s sleep.
+Same locust command as above with -t 60s:
+
+    profile   total req/s   home med / p95   pricing med / p95   AI calls (200 / 503)
+    sync           2.9      11 s / 17 s      13 s / 17 s          18 / 0, med 14 s
+    gthread       29.3      10 ms / 50 ms    13 ms / 66 ms        60 / 42, med 3.6 s
+    gevent        28.9       8 ms / 54 ms    10 ms / 100 ms       60 / 47, med 3.4 s
+
+With sync every page waits behind the AI calls. With gthread or gevent,
+page latency stays in milliseconds, and AI calls above the cap of 3 get a
+503 after the 2 s wait.
+"""
+
+import os
+import re
+from locust import HttpUser, task, between
+
+LOADTEST_EMAIL = os.environ.get('LOADTEST_EMAIL')
+LOADTEST_PASSWORD = os.environ.get('LOADTEST_PASSWORD')
+
+CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+class TubeAlgoUser(HttpUser):
+    abstract = True
+    csrf_token = None
+    logged_in = False
+
+    def on_start(self):
+        if not (LOADTEST_EMAIL and LOADTEST_PASSWORD):
+            return
+        page = self.client.get('/login', name='login form')
+        match = CSRF_RE.search(page.text)
+        if not match:
+            return
+        response = self.client.post('/login', data={
+            'csrf_token': match.group(1),
+            'email': LOADTEST_EMAIL,
+            'password': LOADTEST_PASSWORD,
+        }, name='login submit')
+        self.logged_in = response.ok and '/login' not in response.url
+        self.csrf_token = match.group(1)
+
+
+class PageUser(TubeAlgoUser):
+    """Regular browsing; these latencies are what the worker profile should protect."""
+    weight = 4
+    wait_time = between(1, 3)
+
+    @task(3)
+    def home(self):
+        self.client.get('/', name='page: home')
+
+    @task(2)
+    def pricing(self):
+        self.client.get('/pricing', name='page: pricing')
+
+    @task(1)
+    def health(self):
+        self.client.get('/health', name='page: health')
+
+    @task(4)
+    def dashboard(self):
+        if not self.logged_in:
+            return
+        self.client.get('/dashboard', name='page: dashboard')
+        self.client.get('/api/dashboard/widget/layout', name='page: dashboard layout')
+        self.client.get('/api/dashboard/widget/kpis', name='page: dashboard kpis')
+
+
+class AIUser(TubeAlgoUser):
+    """Slow Gemini-backed calls that used to block the only worker."""
+    weight = 1
+    wait_time = between(0.5, 1.5)
+
+    @task
+    def generate_titles(self):
+        if not self.logged_in:
+            return
+        with self.client.post(
+            '/manage/api/generate-titles',
+            json={'topic': 'budget travel tips for students'},
+            headers={'X-CSRFToken': self.csrf_token},
+            name='ai: generate titles',
+            catch_response=True,
+        ) as response:
+            # 503 (concurrency cap) and 429 (plan limit) are expected back-pressure, not failures.
+            if response.status_code in (429, 503):
+                response.success()
@@ -0,0 +1,85 @@
+# profile_startup.py
+"""
+Startup profiler for TubeAlgo.
+
+Runs `import tubealgo` and `create_app()` in a child interpreter with
+`python -X importtime`, then reports where the cold start goes: total time
+per phase, the heaviest packages and the slowest individual modules.
+
+Usage:
+    python profile_startup.py            # top 25
+    python profile_startup.py --top 50
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+CHILD_CODE = """
+import json, time
+start = time.perf_counter()
+import tubealgo
+imported = time.perf_counter()
+app = tubealgo.create_app()
+created = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'rules': len(list(app.url_map.iter_rules()))}))
+"""
+
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)$")
+
+
+def parse_importtime(stderr):
+    """Returns a list of (module, self_us, cumulative_us) from `-X importtime` output."""
+    modules = []
+    for line in stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us)))
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile TubeAlgo startup (imports and create_app).")
+    parser.add_argument('--top', type=int, default=25, help="Rows to show per table.")
+    args = parser.parse_args()
+
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_CODE],
+        cwd=project_root, capture_output=True, text=True
+    )
+    summary_line = next((line for line in reversed(result.stdout.splitlines()) if line.startswith('{')), None)
+    if result.returncode != 0 or summary_line is None:
+        print(result.stdout)
+        print(result.stderr[-4000:])
+        sys.exit("Startup failed; see output above.")
+
+    summary = json.loads(summary_line)
+    modules = parse_importtime(result.stderr)
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in modules:
+        by_package[name.split('.')[0]] += self_us
+
+    print("=" * 60)
+    print("TUBEALGO STARTUP PROFILE")
+    print("=" * 60)
+    print(f"import tubealgo : {summary['import_ms']:8.0f} ms")
+    print(f"create_app()    : {summary['create_app_ms']:8.0f} ms  ({summary['rules']} URL rules)")
+    print(f"modules imported: {len(modules)}")
+
+    print("\nHeaviest packages (import time of all their modules):")
+    for package, total_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {total_us / 1000:8.1f} ms  {package}")
+
+    print("\nSlowest modules (cumulative, including what they import):")
+    for name, _, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 # run.py
-# No async monkey patching for now - using sync workers
+# No monkey patching here: gunicorn.conf.py picks the worker profile (gthread by default).
 
 from tubealgo import create_app
 
@@ -42,6 +42,9 @@ function competitorPage() {
         currentAnalysis: null, // Holds AI analysis results
         analysisError: '',
         videoForAnalysis: null,
+        exportFormat: 'xlsx',
+        exportStatus: null, // Bulk export job status from the server
+        exportError: '',
 
         init() {
             this.competitors = JSON.parse(document.getElementById('competitors-data').textContent); //
@@ -58,6 +61,8 @@ function competitorPage() {
             this.$el.addEventListener('move-competitor', (event) => this.moveCompetitor(event.detail.id, event.detail.direction)); //
             this.$el.addEventListener('go-to-analysis', (event) => this.goToDeepAnalysis(event.detail.data, event.detail.competitor)); //
             this.$el.addEventListener('analyze-transcript', (event) => this.analyzeTranscript(event.detail.video)); //
+            this.pollBulkExport(); // Resume showing an export started earlier
+            this.initSortable();
         },
 
         get currentCount() { return this.competitors.length; },
@@ -159,6 +164,65 @@ function competitorPage() {
                 }
             });
         },
+        initSortable() {
+            const list = document.getElementById('competitor-list');
+            if (!list || typeof Sortable === 'undefined') return;
+            let nextSibling = null;
+            new Sortable(list, {
+                draggable: '[data-competitor-id]',
+                handle: '.competitor-drag-handle',
+                animation: 150,
+                onStart: (evt) => { nextSibling = evt.item.nextSibling; },
+                onEnd: (evt) => {
+                    // Put the card back where Alpine rendered it; x-for then re-orders it from the array
+                    list.insertBefore(evt.item, nextSibling);
+                    if (evt.oldDraggableIndex !== evt.newDraggableIndex) {
+                        this.reorderCompetitors(evt.oldDraggableIndex, evt.newDraggableIndex);
+                    }
+                }
+            });
+        },
+        reorderCompetitors(fromIndex, toIndex) {
+            const previousOrder = [...this.competitors];
+            const [moved] = this.competitors.splice(fromIndex, 1);
+            this.competitors.splice(toIndex, 0, moved);
+            const csrfToken = document.querySelector('form[id="add-competitor-form"] input[name=csrf_token]').value;
+            fetch('/competitors/reorder', {
+                method: 'POST', headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+                body: JSON.stringify({ order: this.competitors.map(c => c.id) })
+            }).then(res => res.json()).then(data => {
+                if (!data.success) throw new Error(data.error || 'Reorder failed');
+            }).catch(() => {
+                this.competitors = previousOrder; // Revert on error
+                alert('Could not save the new order. Please refresh.');
+            });
+        },
+        get exportRunning() { return this.exportStatus && ['queued', 'running'].includes(this.exportStatus.state); },
+
+        startBulkExport() {
+            if (this.exportRunning) return;
+            this.exportError = '';
+            const csrfToken = document.querySelector('form[id="add-competitor-form"] input[name=csrf_token]').value;
+            fetch('/competitors/export', {
+                method: 'POST', headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+                body: JSON.stringify({ format: this.exportFormat })
+            }).then(res => res.json()).then(data => {
+                if (data.error) {
+                    this.exportError = data.error;
+                    return;
+                }
+                this.exportStatus = data;
+                setTimeout(() => this.pollBulkExport(), 3000);
+            }).catch(() => { this.exportError = 'An unexpected network error occurred.'; });
+        },
+
+        pollBulkExport() {
+            fetch('/competitors/export/status').then(res => res.json()).then(data => {
+                this.exportStatus = data.state === 'none' ? null : data;
+                if (this.exportRunning) setTimeout(() => this.pollBulkExport(), 5000); // The job itself sends a Telegram message when done
+            }).catch(() => {});
+        },
+
         goToDeepAnalysis(cardData, competitor) {
             sessionStorage.setItem('deepAnalysisPreload', JSON.stringify(cardData)); //
             window.location.href = `/deep-analysis/${competitor.channel_id_youtube}`; //
@@ -5,7 +5,7 @@ function dashboard() {
         isLoading: true,
         error: null,
         data: {
-            kpis: {},
+            kpis: null,
             growth_chart: { labels: [], subscribers: [], views: [] },
             ai_assistant: [],
             top_recent_videos: [],
@@ -35,25 +35,55 @@ function dashboard() {
             this.fetchData();
         },
 
+        // Each card has its own endpoint and cache; load them in parallel so
+        // the fast cards render without waiting on the slow ones.
+        widgetNames: ['kpis', 'growth_chart', 'top_recent_videos', 'goal', 'best_time_to_post', 'ai_assistant'],
+
+        fetchWidget(name, refresh = false) {
+            const refreshParam = refresh ? '&refresh=1' : '';
+            return fetch(`/api/dashboard/widget/${name}?t=${new Date().getTime()}${refreshParam}`)
+                .then(res => res.json())
+                .then(apiData => {
+                    if (apiData.error) {
+                        console.error(`Dashboard widget '${name}' failed:`, apiData.error);
+                        return;
+                    }
+                    this.data[name] = apiData[name];
+                    if (name === 'growth_chart') {
+                        this.$nextTick(() => this.renderChart());
+                    }
+                });
+        },
+
         fetchData() {
             this.isLoading = true;
-            fetch(`/api/dashboard/main-data?t=${new Date().getTime()}`)
+            this.error = null;
+
+            // The layout is a cheap read; show the page as soon as it arrives.
+            const layoutRequest = fetch(`/api/dashboard/widget/layout?t=${new Date().getTime()}`)
                 .then(res => res.json())
                 .then(apiData => {
-                    this.data = apiData;
-                    this.error = null;
+                    if (apiData.error) {
+                        throw new Error(apiData.error);
+                    }
+                    this.data.layout = apiData.layout;
+                    this.isLoading = false;
                     this.$nextTick(() => {
                         this.applyLayout();
-                        this.renderChart();
                         this.initSortable();
                     });
-                })
-                .catch(err => {
-                    this.error = err.message;
-                })
-                .finally(() => {
-                    this.isLoading = false;
                 });
+
+            const widgetRequests = this.widgetNames.map(name => this.fetchWidget(name));
+
+            Promise.allSettled([layoutRequest, ...widgetRequests]).then(results => {
+                if (results[0].status === 'rejected') {
+                    this.error = results[0].reason.message;
+                } else if (results.every(r => r.status === 'rejected')) {
+                    this.error = 'Could not load your dashboard data at this time. Please try again later.';
+                }
+                this.isLoading = false;
+            });
         },
 
         initSortable() {
@@ -262,7 +292,7 @@ function dashboard() {
                 }
 
                 this.showGoalModal = false;
-                this.fetchData(); // Reload dashboard data to show the new goal
+                this.fetchWidget('goal', true); // Rebuild just the goal card to show the new goal
 
             } catch (error) {
                 this.goalError = error.message;
@@ -175,7 +175,26 @@ function contentPlanner() {
             if (!this.plannerData[toStatus]) this.plannerData[toStatus] = [];
             this.plannerData[toStatus].push(idea);
             
-            this.saveBoardState();
+            this.saveCardPosition(idea.id, toStatus);
+        },
+
+        // Saves one moved card by sending its new neighbours; the server usually updates just that row.
+        saveCardPosition(ideaId, status) {
+            this.saveToCache();
+            const column = this.plannerData[status] || [];
+            const index = column.findIndex(i => String(i.id) === String(ideaId));
+            if (index === -1) return this.saveBoardState();
+            const before = index > 0 ? column[index - 1].id : null;
+            const after = index < column.length - 1 ? column[index + 1].id : null;
+
+            fetch(PAGE_DATA.urls.moveIdeaPosition.replace('/0/', `/${ideaId}/`), {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'X-CSRFToken': this.csrfToken },
+                body: JSON.stringify({ status: status, before_id: before, after_id: after })
+            }).then(res => {
+                // If the server's view of the board differs, save the whole board instead.
+                if (!res.ok) this.saveBoardState();
+            });
         },
         
         saveBoardState() {
@@ -335,7 +354,7 @@ function contentPlanner() {
                             newData[status] = ideaIds.map(id => allIdeas[id]).filter(Boolean);
                         });
                         this.plannerData = newData;
-                        this.saveBoardState();
+                        this.saveCardPosition(evt.item.dataset.id, evt.to.dataset.status);
                     }
                 });
             });
@@ -7,15 +7,14 @@ from flask_login import LoginManager, current_user
 from dotenv import load_dotenv
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from celery import Celery, Task
 from celery.schedules import crontab
 import config
-from sqlalchemy import text, inspect
+from sqlalchemy import inspect
 from sqlalchemy.exc import OperationalError
 import pytz
 from flask_wtf.csrf import CSRFProtect, generate_csrf
-from flask_sse import sse
 
 load_dotenv()
 
@@ -29,8 +28,8 @@ def limiter_key_func():
         return str(current_user.id)
     return get_remote_address()
 
-# Initialize Flask-Limiter
-limiter = Limiter(key_func=limiter_key_func, default_limits=["200 per day", "50 per hour"])
+# Initialize Flask-Limiter (storage, strategy and per-plan limits come from config; see rate_limits.py)
+limiter = Limiter(key_func=limiter_key_func)
 
 # Initialize Celery
 celery = Celery(__name__)
@@ -113,6 +112,7 @@ def create_app():
 
     # Configure Redis URL for SSE
     app.config["REDIS_URL"] = app.config.get("REDIS_URL", "redis://127.0.0.1:6379/0")
+    from .concurrency import sse, init_concurrency_limits
     app.register_blueprint(sse, url_prefix='/stream')
 
     # *** UPDATED: Configure Celery with connection retry ***
@@ -128,6 +128,11 @@ def create_app():
         result_serializer='json',
         timezone='UTC',
         enable_utc=True,
+        # Telegram delivery gets its own worker so slow sends never hold up other jobs
+        task_routes={
+            'tubealgo.jobs.deliver_notifications': {'queue': 'notifications'},
+            'tubealgo.jobs.handle_telegram_update': {'queue': 'notifications'}, # Bot commands shouldn't wait behind long jobs
+        },
     )
     
     # Define Celery beat schedule for periodic tasks
@@ -152,13 +157,41 @@ def create_app():
             'task': 'tubealgo.jobs.cleanup_old_snapshots',
             'schedule': crontab(hour=1, minute=0, day_of_week='*'), # Run daily at 01:00 UTC
         },
+        'ingest-analytics-warehouse-nightly': {
+            'task': 'tubealgo.jobs.ingest_analytics_warehouse',
+            'schedule': crontab(hour=2, minute=30, day_of_week='*'), # Run daily at 02:30 UTC
+        },
+        'flush-usage-counters-every-5-minutes': {
+            'task': 'tubealgo.jobs.flush_usage_to_db',
+            'schedule': crontab(minute='*/5'), # Copy Redis usage counters to the User table
+        },
+        'flush-last-seen-every-minute': {
+            'task': 'tubealgo.jobs.flush_last_seen',
+            'schedule': crontab(minute='*'), # Write buffered last_seen activity to the User table
+        },
+        'generate-month-end-reports': {
+            'task': 'tubealgo.jobs.generate_month_end_reports',
+            'schedule': crontab(hour=3, minute=30, day_of_month='4'), # Previous month's reports, once the 02:30 ingest has moved past the refresh window
+        },
+        'refresh-category-leaderboards-daily': {
+            'task': 'tubealgo.jobs.refresh_category_leaderboards',
+            'schedule': crontab(hour=8, minute=15), # Just after the YouTube API quota resets (midnight Pacific)
+        },
+        'deliver-notifications-every-minute': {
+            'task': 'tubealgo.jobs.deliver_notifications',
+            'schedule': crontab(minute='*'), # Safety net; enqueueing a message also queues a run
+        },
     }
 
     # Configure Celery Task context to work within Flask app context
+    from .query_profiler import init_query_profiler, profile_queries
     class ContextTask(Task):
         def __call__(self, *args, **kwargs):
             with app.app_context():
-                return self.run(*args, **kwargs)
+                if not app.config.get('QUERY_PROFILER_ENABLED'):
+                    return self.run(*args, **kwargs)
+                with profile_queries(app, f"task:{self.name}"):
+                    return self.run(*args, **kwargs)
     celery.Task = ContextTask
     app.celery = celery # Attach celery instance to app
 
@@ -169,29 +202,23 @@ def create_app():
     login_manager.login_view = 'auth_local.login' # Route to redirect unauthenticated users
     login_manager.login_message_category = "error" # Flash message category
 
-    # Initialize Flask-Limiter
-    limiter_storage_uri = app.config.get("REDIS_URL", "memory://") # Use Redis if available
+    # Initialize Flask-Limiter (RATELIMIT_STORAGE_URI points at the shared Redis)
     limiter.init_app(app)
 
     # --- Request Hooks ---
+    # Registered first so a capped request is turned away before doing any other work.
+    init_concurrency_limits(app)
+    init_query_profiler(app)
+
+    from .services.activity_tracker import record_activity
+    from .services.user_cache import register_cache_invalidation
+    register_cache_invalidation()
+
     @app.before_request
     def before_request_handler():
-        """Update user's last_seen timestamp."""
+        """Record activity for last_seen; the flush_last_seen job writes it to the DB."""
         if current_user.is_authenticated:
-            # Update only periodically (e.g., every 5 minutes) to reduce DB writes
-            five_minutes_ago = datetime.utcnow() - timedelta(minutes=5)
-            # Handle case where last_seen might be None initially
-            last_seen_time = current_user.last_seen or datetime.utcnow() - timedelta(days=1)
-
-            if last_seen_time < five_minutes_ago:
-                current_user.last_seen = datetime.utcnow()
-                try:
-                    # Attempt to commit without adding, as user object is already managed
-                    db.session.commit()
-                except Exception as e:
-                    db.session.rollback()
-                    # Log error more quietly in production
-                    app.logger.error(f"Error updating last_seen for user {current_user.id}: {e}")
+            record_activity(current_user.id)
 
     @app.after_request
     def add_security_headers(response):
@@ -242,26 +269,9 @@ def create_app():
         """Handle page not found errors (404)."""
         return render_template('errors/404.html'), 404
 
-    # --- Simplified Application context block for startup checks ---
-    with app.app_context():
-        try:
-            print("Checking database connection...")
-            db.session.execute(text('SELECT 1')) # Simple check
-            print("Database connection seems OK.")
-
-            # Initialize AI clients here as it relies on config loaded into app
-            print("Initializing AI clients within app context...")
-            from .services.ai_service import initialize_ai_clients
-            initialize_ai_clients()
-
-            # Seed plans only if the table exists (created by create_tables.py)
-            seed_plans()
-
-        except Exception as e:
-            # Log a warning, but allow the app to continue starting
-            print(f"WARNING: Could not verify DB connection or initialize services on startup: {e}")
-            db.session.rollback()
-
+    # One-time setup (DB check, plan seeding) is the `flask bootstrap` command, not part of every boot.
+    from .cli import register_cli
+    register_cli(app)
 
     # --- Import and register Blueprints ---
     from .auth_local import auth_local_bp
@@ -324,10 +334,18 @@ def create_app():
     from .routes.user_routes import user_bp
     app.register_blueprint(user_bp)
 
+    from .routes.telegram_routes import telegram_bp
+    app.register_blueprint(telegram_bp)
+
     # Exempt specific blueprints from CSRF protection if they handle external webhooks/APIs
     csrf.exempt(api_bp)
     csrf.exempt(ai_api_bp)
     csrf.exempt(payment_bp)
+    csrf.exempt(telegram_bp)
+
+    # Per-plan rate limits for every registered blueprint
+    from .rate_limits import init_rate_limits
+    init_rate_limits(app, limiter)
 
     # Import models at the end to ensure db is initialized and blueprints are registered
     from . import models
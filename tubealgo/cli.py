@@ -0,0 +1,78 @@
+# tubealgo/cli.py
+"""
+One-time setup commands.
+
+create_app() used to check the database, load AI clients and seed plans on
+every boot, in every web worker, Celery worker and script. That work now
+runs once per deploy:
+
+    flask --app run.py bootstrap
+
+AI clients are loaded lazily on first use in each process (see
+services/ai_service.py).
+
+The Telegram bot webhook is registered the same way, once per deploy:
+
+    flask --app run.py telegram-webhook set
+"""
+
+import secrets
+import click
+from sqlalchemy import text
+from . import db, seed_plans
+
+
+def register_cli(app):
+    @app.cli.command('bootstrap')
+    @click.option('--create-tables', is_flag=True, help='Also create any missing tables (db.create_all).')
+    def bootstrap(create_tables):
+        """Checks the database, seeds subscription plans and verifies AI keys."""
+        click.echo("Checking database connection...")
+        try:
+            db.session.execute(text('SELECT 1'))
+        except Exception as e:
+            db.session.rollback()
+            raise click.ClickException(f"Database connection failed: {e}")
+        click.echo("Database connection OK.")
+
+        if create_tables:
+            from . import models  # Registers every table with SQLAlchemy
+            db.create_all()
+            click.echo("Tables created.")
+
+        seed_plans()
+
+        from .services import ai_service
+        ai_service.initialize_ai_clients()
+        if not ai_service.gemini_keys and not ai_service.openai_client:
+            click.echo("WARNING: No AI provider keys are configured.")
+        click.echo("Bootstrap complete.")
+
+    @app.cli.command('telegram-webhook')
+    @click.argument('action', type=click.Choice(['set', 'delete', 'info']))
+    def telegram_webhook(action):
+        """Registers, removes or shows the Telegram bot webhook."""
+        from .models import get_config_value
+        from .services.notification_service import call_telegram
+
+        if action == 'info':
+            click.echo(call_telegram('getWebhookInfo', {}))
+            return
+        if action == 'delete':
+            click.echo(call_telegram('deleteWebhook', {}))
+            return
+
+        base_url = app.config.get('TELEGRAM_WEBHOOK_BASE_URL')
+        secret = get_config_value('TELEGRAM_WEBHOOK_SECRET')
+        if not base_url:
+            raise click.ClickException("Set TELEGRAM_WEBHOOK_BASE_URL to the public https URL of this app.")
+        if not secret:
+            raise click.ClickException(f"Set TELEGRAM_WEBHOOK_SECRET first, for example: {secrets.token_urlsafe(32)}")
+        result = call_telegram('setWebhook', {
+            'url': f"{base_url.rstrip('/')}/telegram/webhook",
+            'secret_token': secret,
+            'allowed_updates': '["message", "callback_query"]',
+        })
+        if not result.get('ok'):
+            raise click.ClickException(f"Telegram refused the webhook: {result.get('description')}")
+        click.echo("Webhook registered.")
@@ -0,0 +1,103 @@
+# tubealgo/concurrency.py
+"""
+Helpers for running under threaded (gthread) or gevent gunicorn workers.
+
+- Per-blueprint concurrency caps: slow blueprint or endpoint groups (AI,
+  reports, SSE) get a bounded number of in-flight requests per worker process, so they
+  can't occupy every thread while normal pages wait.
+- An SSE blueprint that sends heartbeats and ends long streams, so a closed
+  browser tab frees its thread instead of holding it until the next event.
+"""
+
+import json
+import time
+import threading
+from flask import request, g, jsonify, current_app, stream_with_context
+from flask_sse import ServerSentEventsBlueprint, Message
+from redis.exceptions import ConnectionError
+from . import db
+
+
+def init_concurrency_limits(app):
+    """Registers request hooks that enforce CONCURRENCY_LIMITS for the blueprints and endpoints in CONCURRENCY_GROUPS."""
+    groups = app.config.get('CONCURRENCY_GROUPS', {})
+    limits = app.config.get('CONCURRENCY_LIMITS', {})
+    wait_seconds = app.config.get('CONCURRENCY_WAIT_SECONDS', 2)
+
+    blueprint_groups = {name: group for group, names in groups.items() for name in names if '.' not in name}
+    endpoint_groups = {name: group for group, names in groups.items() for name in names if '.' in name}
+    # threading primitives are monkey-patched under gevent, so these work for greenlets too.
+    semaphores = {group: threading.BoundedSemaphore(limit) for group, limit in limits.items() if limit and limit > 0}
+
+    @app.before_request
+    def acquire_concurrency_slot():
+        group = endpoint_groups.get(request.endpoint) or blueprint_groups.get(request.blueprint)
+        if group not in semaphores:
+            return None
+        if not semaphores[group].acquire(timeout=wait_seconds):
+            app.logger.warning(f"Concurrency cap reached for '{group}' ({request.path})")
+            response = jsonify({'error': 'The server is busy right now. Please try again in a moment.'})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        g._concurrency_group = group
+        return None
+
+    @app.teardown_request
+    def release_concurrency_slot(exc):
+        # For streamed responses (stream_with_context) this runs when the stream ends.
+        group = g.pop('_concurrency_group', None)
+        if group:
+            semaphores[group].release()
+
+
+class HeartbeatSSEBlueprint(ServerSentEventsBlueprint):
+    """flask_sse blueprint with keep-alive comments and a maximum stream duration."""
+
+    def messages(self, channel='sse', heartbeat_seconds=15, max_seconds=300):
+        """
+        Yields Message objects from the channel, or None whenever `heartbeat_seconds`
+        pass without one. Stops after `max_seconds`; EventSource reconnects by itself.
+        """
+        pubsub = self.redis.pubsub()
+        pubsub.subscribe(channel)
+        started = last_sent = time.monotonic()
+        try:
+            while time.monotonic() - started < max_seconds:
+                pubsub_message = pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat_seconds)
+                if pubsub_message and pubsub_message['type'] == 'message':
+                    last_sent = time.monotonic()
+                    yield Message(**json.loads(pubsub_message['data']))
+                elif time.monotonic() - last_sent >= heartbeat_seconds:
+                    last_sent = time.monotonic()
+                    yield None
+        finally:
+            try:
+                pubsub.unsubscribe(channel)
+                pubsub.close()
+            except ConnectionError:
+                pass
+
+    def stream(self):
+        channel = request.args.get('channel') or 'sse'
+        heartbeat_seconds = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+        max_seconds = current_app.config.get('SSE_MAX_STREAM_SECONDS', 300)
+
+        # The stream can stay open for minutes; don't hold a pooled DB connection
+        # (e.g. from loading current_user) for that long.
+        db.session.close()
+
+        @stream_with_context
+        def generator():
+            for message in self.messages(channel, heartbeat_seconds, max_seconds):
+                # Comment lines are ignored by EventSource but fail fast on a closed socket.
+                yield ': keep-alive\n\n' if message is None else str(message)
+
+        response = current_app.response_class(generator(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+        return response
+
+
+sse = HeartbeatSSEBlueprint('sse', __name__)
+sse.add_url_rule(rule="", endpoint="stream", view_func=sse.stream)
@@ -5,19 +5,27 @@ import traceback
 import os
 from datetime import date, timedelta, datetime
 from flask import current_app
+from sqlalchemy.orm import joinedload
 import time
 import random
 
 from . import db, celery
 # --- बदलाव यहाँ: ChannelSnapshot और VideoSnapshot को इम्पोर्ट किया गया ---
-from .models import User, Competitor, ChannelSnapshot, DashboardCache, log_system_event, ThumbnailTest, VideoSnapshot #
-from .services.video_fetcher import get_latest_videos
+from .models import User, Competitor, ChannelSnapshot, log_system_event, ThumbnailTest, VideoSnapshot #
+from .services.video_fetcher import get_latest_videos, get_latest_upload_id, invalidate_latest_videos
 from .services.channel_fetcher import analyze_channel
-from .services.notification_service import send_telegram_message
-from .services.ai_service import get_ai_video_suggestions, generate_motivational_suggestion
+from .services.notification_service import send_telegram_message, deliver_pending_notifications
+from .services.ai_service import generate_motivational_suggestion
 from .routes.utils import get_credentials
 from .services.youtube_manager import set_video_thumbnail, get_single_video, update_video_details
 from .services.analytics_service import get_video_ctr
+from .services.dashboard_service import assemble_dashboard, recompute_sections, on_dashboard_event
+from .services.usage_meter import flush_usage_counters
+from .services.activity_tracker import flush_activity
+from .services.report_service import report_key, report_period, is_period_final, find_cached_report, generate_report, set_job_status
+from .services.bulk_export import build_competitor_archive, set_export_status
+from .services.leaderboard_service import refresh_region_leaderboards
+from .services.analytics_warehouse import ingest_channel_metrics, mark_ingest_failed, get_video_ctr as get_warehouse_video_ctr
 from celery.schedules import crontab # crontab को इम्पोर्ट किया गया
 
 
@@ -58,6 +66,7 @@ def take_daily_snapshots():
                 db.session.add(new_snapshot) #
 
             db.session.commit() #
+            on_dashboard_event(user.id, 'channel_stats')
             print(f"Successfully took snapshot for user: {user.email}") #
 
         except Exception as e: #
@@ -74,127 +83,85 @@ def take_daily_snapshots():
 
 @celery.task
 def check_for_new_videos():
-    """प्रतियोगियों के नए वीडियो की जांच करता है और टेलीग्राम पर सूचित करता है।"""
+    """
+    सभी प्रतियोगी चैनलों के नए वीडियो की जांच करता है (हर चैनल एक बार, सिर्फ़ 1 quota unit की
+    playlistItems कॉल से)। नया वीडियो मिलने पर ही उस चैनल का वीडियो कैश हटाता है, डैशबोर्ड
+    रीफ्रेश कराता है और टेलीग्राम पर सूचित करता है।
+    """
     print("Celery Task: Running job to check for new videos...") #
-    users_with_telegram = User.query.filter(User.telegram_chat_id.isnot(None), User.telegram_notify_new_video == True).all() #
-
-    for user in users_with_telegram: #
-        print(f"Checking competitors for user: {user.email}") #
-        competitors = user.competitors.all() #
-
-        for comp in competitors: #
-            try: #
-                latest_videos_data = get_latest_videos(comp.channel_id_youtube, max_results=1) #
-
-                if not latest_videos_data or not latest_videos_data.get('videos'): #
-                    continue #
-
-                latest_video = latest_videos_data['videos'][0] #
-                video_id = latest_video['id'] #
-                video_title = latest_video['title'] #
+    competitors_by_channel = {}
+    for comp in Competitor.query.options(joinedload(Competitor.user)).all():
+        competitors_by_channel.setdefault(comp.channel_id_youtube, []).append(comp)
 
-                if not comp.last_known_video_id: #
-                    comp.last_known_video_id = video_id #
-                    db.session.commit() #
-                    continue #
-
-                if comp.last_known_video_id != video_id: #
-                    print(f"Found new video for {comp.channel_title}: {video_title}") #
-
-                    comp.last_known_video_id = video_id #
-                    db.session.commit() #
+    users_with_uploads = set()
+    for channel_id, competitors in competitors_by_channel.items():
+        try: #
+            latest = get_latest_upload_id(channel_id)
+            if 'error' in latest:
+                raise Exception(latest['error'])
+            video_id = latest['video_id']
+            if not video_id or all(comp.last_known_video_id == video_id for comp in competitors):
+                continue
+
+            uploaded_for = [comp for comp in competitors if comp.last_known_video_id and comp.last_known_video_id != video_id]
+            for comp in competitors:
+                comp.last_known_video_id = video_id
+            db.session.commit()
+            if not uploaded_for:
+                continue
+
+            # Dashboards rebuild from get_latest_videos, so drop its (4 hour) cache for this channel
+            # first; the refetch below then also gives us the new video's title.
+            invalidate_latest_videos(channel_id)
+            latest_videos_data = get_latest_videos(channel_id, max_results=1)
+            videos = latest_videos_data.get('videos') or []
+            video_title = videos[0]['title'] if videos and videos[0]['id'] == video_id else 'New video'
+            print(f"Found new video for {competitors[0].channel_title}: {video_title}")
+            users_with_uploads.update(comp.user_id for comp in uploaded_for)
+
+            for comp in uploaded_for:
+                user = comp.user
+                if not user.telegram_chat_id or not user.telegram_notify_new_video:
+                    continue
+                message = ( #
+                    f"🚀 *New Video Alert!*\n\n" #
+                    f"Your competitor *{comp.channel_title}* just uploaded a new video!\n\n" #
+                    f"*Video Title:*\n \"{video_title}\"\n\n" #
+                    f"_[Watch on YouTube](https://www.youtube.com/watch?v={video_id})_" #
+                ) #
 
-                    message = ( #
-                        f"🚀 *New Video Alert!*\n\n" #
-                        f"Your competitor *{comp.channel_title}* just uploaded a new video!\n\n" #
-                        f"*Video Title:*\n \"{video_title}\"\n\n" #
-                        f"_[Watch on YouTube](https://www.youtube.com/watch?v={video_id})_" #
-                    ) #
+                if user.telegram_notify_ai_suggestion: #
+                    ai_suggestion = generate_motivational_suggestion(video_title) #
+                    message += f"\n\n---\n💡 *Your Motivational AI Assistant:*\n\n{ai_suggestion}" #
 
-                    if user.telegram_notify_ai_suggestion: #
-                        ai_suggestion = generate_motivational_suggestion(video_title) #
-                        message += f"\n\n---\n💡 *Your Motivational AI Assistant:*\n\n{ai_suggestion}" #
+                send_telegram_message(user.telegram_chat_id, message) #
 
-                    send_telegram_message(user.telegram_chat_id, message) #
+        except Exception as e: #
+            db.session.rollback() #
+            tb_str = traceback.format_exc() #
+            log_system_event( #
+                message=f"Error checking new videos for channel {channel_id}",
+                log_type='ERROR', #
+                details={'competitor_ids': [comp.id for comp in competitors], 'error': str(e), 'traceback': tb_str}
+            ) #
 
-            except Exception as e: #
-                db.session.rollback() #
-                tb_str = traceback.format_exc() #
-                log_system_event( #
-                    message=f"Error checking new videos for competitor {comp.channel_title}", #
-                    log_type='ERROR', #
-                    details={'user_id': user.id, 'competitor_id': comp.id, 'error': str(e), 'traceback': tb_str} #
-                ) #
+    for user_id in users_with_uploads:
+        on_dashboard_event(user_id, 'competitors')
 
     print("Celery Task: Finished checking for new videos.") #
 
 
 @celery.task
 def update_all_dashboards():
-    """सभी यूज़र्स के लिए डैशबोर्ड डेटा को बैकग्राउंड में रीफ्रेश और कैश करता है।"""
+    """सभी यूज़र्स के डैशबोर्ड के पुराने (stale/expired) सेक्शन बैकग्राउंड में रीफ्रेश करता है।"""
     print("Celery Task: Running job to update all user dashboards...") #
     users_with_channels = User.query.join(User.channel).all() #
 
     for user in users_with_channels: #
         try: #
             print(f"Updating dashboard for user: {user.email}") #
-            channel_id = user.channel.id #
-
-            channel_data = analyze_channel(user.channel.channel_id_youtube) #
-            if 'error' in channel_data: continue #
-
-            kpis = {'subscribers': channel_data.get('Subscribers', 0), 'views': channel_data.get('Total Views', 0), 'videos': channel_data.get('Video Count', 0)} #
-
-            today = date.today() #
-            start_date = today - timedelta(days=29) #
-            snapshots = ChannelSnapshot.query.filter(ChannelSnapshot.channel_db_id == channel_id, ChannelSnapshot.date >= start_date).order_by(ChannelSnapshot.date.asc()).all() #
-            labels = [(start_date + timedelta(days=i)).strftime('%d %b') for i in range(30)] #
-            sub_data, view_data, last_subs, last_views = [], [], 0, 0 #
-            first_snapshot = ChannelSnapshot.query.filter(ChannelSnapshot.channel_db_id == channel_id, ChannelSnapshot.date < start_date).order_by(ChannelSnapshot.date.desc()).first() #
-            if first_snapshot: #
-                last_subs, last_views = first_snapshot.subscribers, first_snapshot.views #
-            elif snapshots: #
-                 last_subs, last_views = snapshots[0].subscribers, snapshots[0].views #
-            snapshot_dict = {s.date: s for s in snapshots} #
-            for i in range(30): #
-                current_date = start_date + timedelta(days=i) #
-                if current_date in snapshot_dict: #
-                    last_subs, last_views = snapshot_dict[current_date].subscribers, snapshot_dict[current_date].views #
-                sub_data.append(last_subs) #
-                view_data.append(last_views) #
-            growth_chart_data = {'labels': labels, 'subscribers': sub_data, 'views': view_data} #
-
-            videos_data = get_latest_videos(user.channel.channel_id_youtube, max_results=50) #
-            all_user_videos = videos_data.get('videos', []) #
-
-            latest_video = all_user_videos[0] if all_user_videos else None #
-            if latest_video and len(all_user_videos) > 1: #
-                other_videos = all_user_videos[1:10] #
-                avg_views = sum(v['view_count'] for v in other_videos) / len(other_videos) if other_videos else 0 #
-                performance = round(((latest_video['view_count'] - avg_views) / avg_views) * 100) if avg_views > 0 else 100 #
-                latest_video['performance_vs_avg'] = performance #
-            elif latest_video: #
-                 latest_video['performance_vs_avg'] = 100 #
-            top_videos = sorted([v for v in all_user_videos if 'view_count' in v], key=lambda x: x['view_count'], reverse=True)[:3] #
-
-            ai_suggestions = get_ai_video_suggestions(user, user_videos=all_user_videos) #
-
-            final_data_package = { #
-                'kpis': kpis, #
-                'growth_chart': growth_chart_data, #
-                'latest_video': latest_video, #
-                'top_videos': top_videos, #
-                'ai_suggestions': ai_suggestions #
-            } #
-
-            cache_entry = DashboardCache.query.filter_by(user_id=user.id).first() #
-            if not cache_entry: #
-                cache_entry = DashboardCache(user_id=user.id) #
-                db.session.add(cache_entry) #
-
-            cache_entry.data = final_data_package #
-            cache_entry.updated_at = datetime.utcnow() #
-            db.session.commit() #
+            # Fresh sections are served from cache; only missing, stale or expired ones are rebuilt.
+            assemble_dashboard(user)
             print(f"Successfully updated dashboard for user: {user.email}") #
 
         except Exception as e: #
@@ -209,6 +176,24 @@ def update_all_dashboards():
     print("Celery Task: Finished updating all user dashboards.") #
 
 
+@celery.task
+def recompute_dashboard_sections(user_id, sections):
+    """किसी इवेंट से प्रभावित डैशबोर्ड सेक्शन को ही दोबारा बनाता है।"""
+    user = db.session.get(User, user_id)
+    if not user or not user.channel:
+        return
+    try:
+        recompute_sections(user, sections)
+        print(f"Recomputed dashboard sections {sections} for user: {user.email}")
+    except Exception as e:
+        db.session.rollback()
+        log_system_event(
+            message=f"Error recomputing dashboard sections for user {user.email}",
+            log_type='ERROR',
+            details={'sections': sections, 'error': str(e), 'traceback': traceback.format_exc()}
+        )
+
+
 @celery.task
 def perform_full_analysis(competitor_id):
     """एक प्रतियोगी के लिए बैकग्राउंड में पूरा डेटा पैकेज लाता है और कैश करता है।"""
@@ -230,6 +215,14 @@ def perform_full_analysis(competitor_id):
 
 TEST_DURATION_HOURS = 24 #
 
+def _get_test_ctr(user, creds, video_id, start_date, end_date):
+    """Reads CTR from the local analytics warehouse, falling back to a live Analytics query."""
+    if user.channel:
+        warehouse_ctr = get_warehouse_video_ctr(user.channel.id, video_id, start_date, end_date)
+        if warehouse_ctr is not None:
+            return warehouse_ctr, None
+    return get_video_ctr(creds, video_id, start_date, end_date)
+
 @celery.task(bind=True)
 def start_thumbnail_test(self, test_id):
     """A/B टेस्ट शुरू करता है: थंबनेल 'A' सेट करता है और अगले चरण को शेड्यूल करता है।"""
@@ -281,7 +274,7 @@ def advance_thumbnail_test(self, test_id):
         try: #
             start_date = test.test_start_time.date() #
             end_date = datetime.utcnow().date() #
-            ctr_a, error = get_video_ctr(creds, test.video_id, start_date, end_date) #
+            ctr_a, error = _get_test_ctr(user, creds, test.video_id, start_date, end_date) #
 
             if error: #
                 raise Exception(error.get('error', 'Unknown analytics error')) #
@@ -322,7 +315,7 @@ def finalize_thumbnail_test(self, test_id):
         try: #
             start_date = test.switch_time.date() #
             end_date = datetime.utcnow().date() #
-            ctr_b, error = get_video_ctr(creds, test.video_id, start_date, end_date) #
+            ctr_b, error = _get_test_ctr(user, creds, test.video_id, start_date, end_date) #
 
             if error: #
                 raise Exception(error.get('error', 'Unknown analytics error')) #
@@ -521,3 +514,197 @@ def cleanup_old_snapshots():
         ) #
     print("Celery Task: Finished cleaning up old snapshots.") #
 # --- बदलाव खत्म ---
+
+
+@celery.task
+def ingest_analytics_warehouse():
+    """Pulls per-video, per-day YouTube Analytics metrics for every connected channel into the local warehouse."""
+    print("Celery Task: Running nightly analytics warehouse ingestion...")
+    users_with_channels = User.query.join(User.channel).filter(User.google_refresh_token.isnot(None)).all()
+
+    total_rows = 0
+    for user in users_with_channels:
+        try:
+            creds = get_credentials(user)
+            if not creds:
+                continue
+            total_rows += ingest_channel_metrics(user.channel, creds)
+        except Exception as e:
+            db.session.rollback()
+            try:
+                mark_ingest_failed(user.channel)
+            except Exception:
+                db.session.rollback()
+            log_system_event(
+                message=f"Error ingesting analytics warehouse data for user {user.email}",
+                log_type='ERROR',
+                details={'user_id': user.id, 'error': str(e), 'traceback': traceback.format_exc()}
+            )
+
+    print(f"Celery Task: Finished analytics warehouse ingestion ({total_rows} rows written).")
+
+
+@celery.task
+def flush_usage_to_db():
+    """Redis के दैनिक उपयोग काउंटर को User टेबल में एक साथ (batch) लिखता है।"""
+    try:
+        written = flush_usage_counters()
+        if written:
+            print(f"Celery Task: Flushed usage counters for {written} users.")
+    except Exception as e:
+        log_system_event(
+            message="Error flushing usage counters",
+            log_type='ERROR',
+            details={'error': str(e), 'traceback': traceback.format_exc()}
+        )
+
+
+@celery.task
+def flush_last_seen():
+    """Redis में जमा last_seen गतिविधि को User टेबल में एक bulk UPDATE से लिखता है।"""
+    try:
+        written = flush_activity()
+        if written:
+            print(f"Celery Task: Updated last_seen for {written} users.")
+    except Exception as e:
+        log_system_event(
+            message="Error flushing last_seen activity",
+            log_type='ERROR',
+            details={'error': str(e), 'traceback': traceback.format_exc()}
+        )
+
+
+@celery.task
+def generate_monthly_report_pdf(user_id, key, handoff=False):
+    """एक यूज़र की मासिक PDF रिपोर्ट बनाकर डिस्क कैश में रखता है (स्टेटस पेज इसे poll करता है)।"""
+    user = User.query.get(user_id)
+    if not user or not user.channel:
+        set_job_status(user_id, key, 'error', error='Channel not connected.')
+        return
+    try:
+        result = generate_report(user, get_credentials(user), key, handoff=handoff)
+        if 'error' in result:
+            print(f"Celery Task: Monthly report for user {user_id} failed: {result['error']}")
+    except Exception as e:
+        set_job_status(user_id, key, 'error', error='Report generation failed. Please try again later.')
+        log_system_event(
+            message=f"Error generating monthly report for user {user_id}",
+            log_type='ERROR',
+            details={'user_id': user_id, 'error': str(e), 'traceback': traceback.format_exc()}
+        )
+
+
+@celery.task
+def generate_month_end_reports():
+    """हर महीने की 4 तारीख को (जब पिछले महीने का warehouse डेटा final हो जाए), जिन यूज़र्स ने मासिक रिपोर्ट चुनी है उनकी पिछले महीने की PDF पहले से बना देता है।"""
+    print("Celery Task: Pre-generating month-end reports...")
+    users = User.query.join(User.channel).filter(User.telegram_notify_monthly_report == True).all()
+
+    _, end = report_period()
+    generated = 0
+    for user in users:
+        try:
+            # Days near the month end are still re-pulled; a PDF made now would go stale
+            if not is_period_final(user.channel, end):
+                continue
+            key = report_key(user.channel)
+            if find_cached_report(user.id, key):
+                continue
+            # handoff: the web service may not share this worker's disk
+            result = generate_report(user, get_credentials(user), key, handoff=True)
+            if 'error' in result:
+                continue
+            generated += 1
+            if user.telegram_chat_id:
+                send_telegram_message(user.telegram_chat_id, "📄 *Your monthly report is ready!*\n\nDownload it from the Download Report button on your dashboard.")
+        except Exception as e:
+            db.session.rollback()
+            log_system_event(
+                message=f"Error pre-generating monthly report for user {user.email}",
+                log_type='ERROR',
+                details={'user_id': user.id, 'error': str(e), 'traceback': traceback.format_exc()}
+            )
+
+    print(f"Celery Task: Finished month-end reports ({generated} generated).")
+
+
+@celery.task
+def export_competitors(user_id, job_id, fmt):
+    """यूज़र के सभी competitors का डेटा (per-channel CSV/XLSX + combined CSV) एक zip में लिखता है।"""
+    user = User.query.get(user_id)
+    if not user:
+        return
+    competitors = user.competitors.order_by(Competitor.position.asc()).all()
+    if not competitors:
+        set_export_status(user_id, job_id, 'error', error='You are not tracking any competitors yet.')
+        return
+
+    try:
+        path = build_competitor_archive(user, job_id, competitors, fmt)
+    except Exception as e:
+        set_export_status(user_id, job_id, 'error', error='Export failed. Please try again later.')
+        log_system_event(
+            message=f"Error building competitor export for user {user.email}",
+            log_type='ERROR',
+            details={'user_id': user_id, 'error': str(e), 'traceback': traceback.format_exc()}
+        )
+        if user.telegram_chat_id:
+            send_telegram_message(user.telegram_chat_id, "❌ Your competitor export failed. Please try again from the Competitors page.")
+        return
+
+    if not path:
+        # Built but can't be delivered (the job status says why)
+        print(f"Celery Task: Competitor export for user {user_id} could not be handed off.")
+        if user.telegram_chat_id:
+            send_telegram_message(user.telegram_chat_id, "❌ Your competitor export could not be delivered. See the Competitors page for details.")
+        return
+
+    print(f"Celery Task: Competitor export for user {user_id} finished ({len(competitors)} channels).")
+    if user.telegram_chat_id:
+        send_telegram_message(user.telegram_chat_id, f"📦 *Your competitor export is ready!*\n\n{len(competitors)} channels exported. Download it from the Competitors page.")
+
+
+@celery.task
+def refresh_category_leaderboards():
+    """हर रीजन और कैटेगरी के टॉप चैनलों की लीडरबोर्ड पहले से बनाकर टेबल में रखता है।"""
+    print("Celery Task: Refreshing category leaderboards...")
+    for region_code in current_app.config.get('LEADERBOARD_REGIONS', ['IN']):
+        try:
+            written = refresh_region_leaderboards(region_code)
+            print(f"Celery Task: Leaderboards for {region_code} refreshed ({written} rows).")
+        except Exception as e:
+            db.session.rollback()
+            log_system_event(
+                message=f"Error refreshing category leaderboards for region {region_code}",
+                log_type='ERROR',
+                details={'region_code': region_code, 'error': str(e), 'traceback': traceback.format_exc()}
+            )
+    print("Celery Task: Finished refreshing category leaderboards.")
+
+
+@celery.task
+def deliver_notifications():
+    """आउटबॉक्स में रखे टेलीग्राम मैसेज रेट-लिमिट के अंदर भेजता है (notifications queue पर चलता है)।"""
+    try:
+        calls = deliver_pending_notifications()
+        if calls:
+            print(f"Celery Task: Delivered Telegram notifications ({calls} API calls).")
+    except Exception as e:
+        db.session.rollback()
+        # log_system_event नहीं: उसका ERROR अलर्ट फिर इसी आउटबॉक्स में जाता
+        print(f"Celery Task: Telegram delivery failed: {e}\n{traceback.format_exc()}")
+
+
+@celery.task
+def handle_telegram_update(update):
+    """वेबहुक से आए टेलीग्राम अपडेट (बॉट कमांड) को प्रोसेस करता है।"""
+    from .telegram_bot_handler import handle_update
+    try:
+        handle_update(update)
+    except Exception as e:
+        db.session.rollback()
+        log_system_event(
+            message="Error processing Telegram update",
+            log_type='ERROR',
+            details={'update_id': update.get('update_id'), 'error': str(e), 'traceback': traceback.format_exc()}
+        )
@@ -7,23 +7,26 @@ from .. import db
 from .system_models import (
     SystemLog, ApiCache, APIKeyStatus, SiteSetting,
     log_system_event, is_admin_telegram_user, get_setting, get_config_value,
-    DashboardCache, CompetitorAnalysisCache
+    DashboardCache, CompetitorAnalysisCache, NotificationOutbox
 )
 from .user_models import User, SearchHistory, ContentIdea, Goal, load_user
-from .youtube_models import YouTubeChannel, ChannelSnapshot, Competitor, ThumbnailTest, VideoSnapshot
+from .youtube_models import YouTubeChannel, ChannelSnapshot, Competitor, ThumbnailTest, VideoSnapshot, ChannelAlias, ChannelProfile, CategoryLeaderboardEntry, KeywordTerm
 from .payment_models import Coupon, Payment, SubscriptionPlan
+from .analytics_models import VideoDailyMetric, ChannelDailyMetric, ChannelTrafficDaily, AnalyticsIngestRun
 
 # __all__ defines the public API for the models package.
 # This allows other parts of the application to still do `from tubealgo.models import User`
 __all__ = [
     "db",
     # System Models & Functions
-    "SystemLog", "ApiCache", "APIKeyStatus", "SiteSetting", "DashboardCache", "CompetitorAnalysisCache",
+    "SystemLog", "ApiCache", "APIKeyStatus", "SiteSetting", "DashboardCache", "CompetitorAnalysisCache", "NotificationOutbox",
     "log_system_event", "is_admin_telegram_user", "get_setting", "get_config_value",
     # User Models & Functions
     "User", "SearchHistory", "ContentIdea", "Goal", "load_user",
     # YouTube Models
-    "YouTubeChannel", "ChannelSnapshot", "Competitor", "ThumbnailTest", "VideoSnapshot",
+    "YouTubeChannel", "ChannelSnapshot", "Competitor", "ThumbnailTest", "VideoSnapshot", "ChannelAlias", "ChannelProfile", "CategoryLeaderboardEntry", "KeywordTerm",
     # Payment Models
-    "Coupon", "Payment", "SubscriptionPlan"
+    "Coupon", "Payment", "SubscriptionPlan",
+    # Analytics Warehouse Models
+    "VideoDailyMetric", "ChannelDailyMetric", "ChannelTrafficDaily", "AnalyticsIngestRun"
 ]
@@ -0,0 +1,49 @@
+# tubealgo/models/analytics_models.py
+
+from .. import db
+from datetime import datetime
+
+class VideoDailyMetric(db.Model):
+    """One row per (channel, video, day) pulled from the YouTube Analytics API."""
+    id = db.Column(db.Integer, primary_key=True)
+    channel_db_id = db.Column(db.Integer, db.ForeignKey('you_tube_channel.id', ondelete='CASCADE'), nullable=False, index=True)
+    video_id = db.Column(db.String(50), nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    watch_minutes = db.Column(db.Integer, nullable=False, default=0)
+    subscribers_gained = db.Column(db.Integer, nullable=False, default=0)
+    subscribers_lost = db.Column(db.Integer, nullable=False, default=0)
+    impressions_ctr = db.Column(db.Float, nullable=True)
+
+    __table_args__ = (db.UniqueConstraint('channel_db_id', 'video_id', 'date', name='_channel_video_date_uc'),)
+
+class ChannelDailyMetric(db.Model):
+    """Channel-wide totals per day. Subscribers are only complete at this level, not summed per video."""
+    id = db.Column(db.Integer, primary_key=True)
+    channel_db_id = db.Column(db.Integer, db.ForeignKey('you_tube_channel.id', ondelete='CASCADE'), nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    watch_minutes = db.Column(db.Integer, nullable=False, default=0)
+    subscribers_gained = db.Column(db.Integer, nullable=False, default=0)
+    subscribers_lost = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('channel_db_id', 'date', name='_channel_daily_date_uc'),)
+
+class ChannelTrafficDaily(db.Model):
+    """Channel-wide views per traffic source per day."""
+    id = db.Column(db.Integer, primary_key=True)
+    channel_db_id = db.Column(db.Integer, db.ForeignKey('you_tube_channel.id', ondelete='CASCADE'), nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    source_type = db.Column(db.String(50), nullable=False)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('channel_db_id', 'date', 'source_type', name='_channel_date_source_uc'),)
+
+class AnalyticsIngestRun(db.Model):
+    """Bookkeeping for the nightly warehouse ingestion, one row per channel."""
+    id = db.Column(db.Integer, primary_key=True)
+    channel_db_id = db.Column(db.Integer, db.ForeignKey('you_tube_channel.id', ondelete='CASCADE'), nullable=False, unique=True)
+    last_ingested_date = db.Column(db.Date, nullable=True)
+    last_run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_status = db.Column(db.String(20), nullable=False, default='ok')
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
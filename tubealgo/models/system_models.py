@@ -1,10 +1,8 @@
 # tubealgo/models/system_models.py
 
 import os
-import json
 from datetime import datetime
 from .. import db
-from sqlalchemy.exc import OperationalError, ProgrammingError
 import traceback
 
 # --- SystemLog, log_system_event, is_admin_telegram_user ---
@@ -16,51 +14,16 @@ class SystemLog(db.Model):
     details = db.Column(db.Text, nullable=True)
 
 def log_system_event(message, log_type='INFO', details=None, traceback_info=None):
-    """Logs an event to the database and sends a notification for critical errors."""
+    """
+    Records an event for SystemLog and, for critical types, the admin alert digest.
+    Only touches an in-memory buffer; see services/event_log.py for flushing and aggregation.
+    """
     try:
-        from ..services.notification_service import send_telegram_message
-
-        details_str = ""
-        if details:
-            if isinstance(details, dict):
-                if traceback_info:
-                    details['traceback'] = traceback_info
-                details_str = json.dumps(details, indent=2, default=str)
-            else:
-                details_str = str(details)
-                if traceback_info:
-                    details_str += f"\n\nTraceback:\n{traceback_info}"
-        elif traceback_info:
-             details_str = f"Traceback:\n{traceback_info}"
-
-        log_entry = SystemLog(
-            log_type=log_type,
-            message=message,
-            details=details_str
-        )
-        db.session.add(log_entry)
-        db.session.commit()
-
-        CRITICAL_LOG_TYPES = ['QUOTA_EXCEEDED', 'ERROR', 'PROJECT_QUOTA_EXCEEDED']
-        if log_type in CRITICAL_LOG_TYPES:
-            admin_chat_id = get_setting('ADMIN_TELEGRAM_CHAT_ID')
-            if admin_chat_id:
-                alert_title = "Critical Alert" if log_type == 'ERROR' else "Quota Alert"
-                icon = "🚨" if log_type == 'ERROR' else "⚠️"
-
-                telegram_message = (
-                    f"{icon} *{alert_title}: {log_type}*\n\n"
-                    f"*Message:* {message}\n\n"
-                )
-                if details_str:
-                    truncated_details = details_str[:1000] + ('...' if len(details_str) > 1000 else '')
-                    telegram_message += f"*Details:* ```\n{truncated_details}\n```"
-
-                send_telegram_message(admin_chat_id, telegram_message)
-
+        from flask import current_app
+        from ..services.event_log import record_event, format_details
+        record_event(current_app._get_current_object(), log_type, str(message), format_details(details, traceback_info))
     except Exception as e:
         print(f"!!! FAILED TO LOG SYSTEM EVENT (Original message: {message}): {e}\n{traceback.format_exc()}")
-        db.session.rollback()
 
 
 def is_admin_telegram_user(chat_id):
@@ -76,22 +39,13 @@ class SiteSetting(db.Model):
 
 def get_setting(key, default=None):
     """
-    Safely gets a setting from the database.
+    Safely gets a setting from the process-local settings snapshot.
     Returns default if the table doesn't exist or another DB error occurs.
     """
+    from ..services.settings_cache import settings_snapshot
     try:
-        setting = SiteSetting.query.get(key)
-        if setting and setting.value is not None:
-            val_lower = setting.value.lower()
-            if val_lower == 'true': return True
-            if val_lower == 'false': return False
-            return setting.value
-        return default
-    except (OperationalError, ProgrammingError) as db_err:
-        db.session.rollback()
-        return default
+        return settings_snapshot.get(key, default)
     except Exception as e:
-        db.session.rollback()
         return default
 
 def get_config_value(key, default=None):
@@ -119,11 +73,36 @@ class APIKeyStatus(db.Model):
     last_failure_at = db.Column(db.DateTime, nullable=True, index=True)
 
 class DashboardCache(db.Model):
+    """One cached dashboard section (kpis, goal, ...) per user. Sections are invalidated and rebuilt independently."""
+    # Replaces the old single-blob `dashboard_cache` table; that table only held cache data and can be dropped.
+    __tablename__ = 'dashboard_section_cache'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    section = db.Column(db.String(50), nullable=False)
     data = db.Column(db.JSON, nullable=True)
+    is_stale = db.Column(db.Boolean, nullable=False, default=False)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    __table_args__ = (db.UniqueConstraint('user_id', 'section', name='_user_dashboard_section_uc'),)
+
+class NotificationOutbox(db.Model):
+    """A queued Telegram message or photo, delivered by the deliver_notifications task."""
+    __tablename__ = 'notification_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.String(50), nullable=False)
+    kind = db.Column(db.String(10), nullable=False, default='message')  # 'message' or 'photo'
+    text = db.Column(db.Text, nullable=False)
+    photo_url = db.Column(db.String(500), nullable=True)
+    reply_markup = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'sent' or 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_notification_outbox_due', 'status', 'next_attempt_at'),)
+
 # === नया मॉडल जोड़ा गया ===
 class CompetitorAnalysisCache(db.Model):
     """Stores cached analysis data for competitors"""
@@ -38,7 +38,7 @@ class User(UserMixin, db.Model):
     status = db.Column(db.String(20), nullable=False, default='active') # active, suspended
 
     # --- बदलाव यहाँ है: last_seen कॉलम जोड़ा गया ---
-    last_seen = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, index=True)
     # --- बदलाव खत्म ---
 
     dashboard_layout = db.Column(db.Text, nullable=True) # JSON string for layout
@@ -50,6 +50,7 @@ class User(UserMixin, db.Model):
     telegram_notify_milestone = db.Column(db.Boolean, default=True)
     telegram_notify_ai_suggestion = db.Column(db.Boolean, default=True)
     telegram_notify_weekly_report = db.Column(db.Boolean, default=False)
+    telegram_notify_monthly_report = db.Column(db.Boolean, default=False) # Pre-generate last month's PDF on the 1st
 
     # Relationships (Relationships remain unchanged)
     channel = db.relationship('YouTubeChannel', backref='user', uselist=False, cascade="all, delete-orphan")
@@ -59,7 +60,7 @@ class User(UserMixin, db.Model):
     goals = db.relationship('Goal', backref='user', lazy='dynamic', cascade="all, delete-orphan")
     content_ideas = db.relationship('ContentIdea', backref='user', lazy='dynamic', cascade="all, delete-orphan")
     # Add relationship for DashboardCache if needed, ensure cascade delete
-    dashboard_cache_rel = db.relationship('DashboardCache', backref='user', uselist=False, cascade="all, delete-orphan")
+    dashboard_cache_rel = db.relationship('DashboardCache', backref='user', lazy='dynamic', cascade="all, delete-orphan")
 
 
     def set_password(self, password):
@@ -105,5 +106,6 @@ class Goal(db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Loads user for Flask-Login."""
-    return User.query.get(int(user_id))
\ No newline at end of file
+    """Loads user for Flask-Login (user, channel and competitor count, cached briefly in Redis)."""
+    from ..services.user_cache import load_user_cached
+    return load_user_cached(int(user_id))
\ No newline at end of file
@@ -3,6 +3,48 @@
 from .. import db
 from datetime import datetime
 
+class ChannelAlias(db.Model):
+    """A handle, custom URL or search text (e.g. 'handle:mrbeast') and the channel ID it resolved to."""
+    id = db.Column(db.Integer, primary_key=True)
+    alias = db.Column(db.String(255), unique=True, nullable=False, index=True)
+    channel_id_youtube = db.Column(db.String(100), nullable=False, index=True)
+    resolved_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class ChannelProfile(db.Model):
+    """Per-source term counts for any channel the app has fetched; feeds the similar-channels index."""
+    id = db.Column(db.Integer, primary_key=True)
+    channel_id_youtube = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    title = db.Column(db.String(200), nullable=False)
+    thumbnail_url = db.Column(db.String(255))
+    subscribers = db.Column(db.BigInteger, nullable=True)
+    sources = db.Column(db.JSON, nullable=False, default=dict)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class KeywordTerm(db.Model):
+    """A tag or keyword seen anywhere in the app, with its accumulated popularity (feeds local autocomplete)."""
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False, default=0)
+    uses = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class CategoryLeaderboardEntry(db.Model):
+    """A channel's stats on one day of a (region, category) leaderboard. Title/thumbnail live in ChannelProfile."""
+    __tablename__ = 'category_leaderboard'
+    id = db.Column(db.Integer, primary_key=True)
+    region_code = db.Column(db.String(5), nullable=False)
+    category_id = db.Column(db.String(10), nullable=False)
+    channel_id_youtube = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    rank = db.Column(db.Integer, nullable=True)  # Position in that day's search; None = still tracked from earlier days
+    subscribers = db.Column(db.BigInteger, nullable=False, default=0)
+    views = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('region_code', 'category_id', 'channel_id_youtube', 'date', name='_leaderboard_channel_date_uc'),
+        db.Index('ix_leaderboard_region_category_date', 'region_code', 'category_id', 'date'),
+    )
+
 class YouTubeChannel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
@@ -0,0 +1,261 @@
+# tubealgo/query_profiler.py
+"""
+Per-request and per-task SQL query counting.
+
+Every SQL statement run inside a request or Celery task is counted and timed
+via SQLAlchemy cursor events. Statements are reduced to a "shape" (bound
+values and IN-lists collapsed), and a unit that runs the same shape
+QUERY_REPEAT_THRESHOLD or more times is flagged as a likely N+1 loop.
+
+- Debug mode: X-DB-Query-Count / X-DB-Time-Ms / X-DB-Repeated-Queries
+  response headers on every response.
+- Whenever enabled: per-endpoint / per-task totals and the most recent flagged units,
+  kept in Redis and shown at /admin/query-stats.
+
+Totals are accumulated in process memory and pushed to Redis at most every
+STATS_FLUSH_SECONDS, so the request path doesn't pay a Redis round-trip.
+Work in other threads (e.g. the dashboard's thread pool) has its own app
+context and is not counted towards the request.
+
+Profiling is opt-in per environment with QUERY_PROFILER_ENABLED=true.
+"""
+
+import re
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, request, has_app_context
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = 'querystats:units'
+FLAGGED_KEY = 'querystats:flagged'
+FLAGGED_KEEP = 100
+STATS_FLUSH_SECONDS = 30
+SHAPE_PREVIEW_CHARS = 300
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\([^)]+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\([^)]+\)s|%s|:\w+))*\s*\)")
+_PLACEHOLDER = re.compile(r"%\([^)]+\)s|:\w+|%s")
+_NUMBER = re.compile(r"\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+
+_pending = {}             # unit label -> [runs, queries, db_ms, flagged runs, max queries]
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def statement_shape(statement):
+    """Normalizes SQL so the same query with different values compares equal."""
+    shape = _PLACEHOLDER_LIST.sub('(?)', statement)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER.sub('N', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryStats:
+    def __init__(self, label):
+        self.label = label
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.db_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+# --- SQLAlchemy hooks ---
+
+def _current_stats():
+    if not has_app_context():
+        return None
+    return g.get('_query_stats')
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats() is not None:
+        conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    starts = conn.info.get('_query_start')
+    if stats is None or not starts:
+        return
+    stats.record(statement, time.perf_counter() - starts.pop())
+
+
+# --- Units of work ---
+
+def start_unit(label):
+    g._query_stats = QueryStats(label)
+
+def finish_unit(app):
+    """Ends the current unit, records it and returns its QueryStats (or None)."""
+    stats = g.pop('_query_stats', None)
+    if stats is None:
+        return None
+    threshold = app.config.get('QUERY_REPEAT_THRESHOLD', 10)
+    max_queries = app.config.get('QUERY_COUNT_WARNING', 50)
+    repeated = stats.repeated(threshold)
+    flagged = bool(repeated) or stats.count > max_queries
+    if flagged:
+        logger.warning(
+            f"{stats.label}: {stats.count} queries in {stats.db_seconds * 1000:.0f}ms"
+            + (f", repeated {repeated[0][1]}x: {repeated[0][0][:SHAPE_PREVIEW_CHARS]}" if repeated else "")
+        )
+    _accumulate(stats, flagged)
+    if flagged:
+        _push_flagged(stats, repeated)
+    _flush_if_due()
+    return stats
+
+@contextmanager
+def profile_queries(app, label):
+    """Counts the queries run inside the block as one unit (used for Celery tasks)."""
+    start_unit(label)
+    try:
+        yield
+    finally:
+        finish_unit(app)
+
+
+# --- Storage ---
+
+def _accumulate(stats, flagged):
+    with _pending_lock:
+        entry = _pending.setdefault(stats.label, [0, 0, 0.0, 0, 0])
+        entry[0] += 1
+        entry[1] += stats.count
+        entry[2] += stats.db_seconds * 1000
+        entry[3] += 1 if flagged else 0
+        entry[4] = max(entry[4], stats.count)
+
+def _push_flagged(stats, repeated):
+    from .services.redis_client import get_redis, mark_redis_failure
+    client = get_redis()
+    if client is None:
+        return
+    record = {
+        'label': stats.label,
+        'queries': stats.count,
+        'db_ms': round(stats.db_seconds * 1000, 1),
+        'repeated': [{'shape': shape[:SHAPE_PREVIEW_CHARS], 'count': n} for shape, n in repeated[:3]],
+        'at': datetime.utcnow().isoformat(timespec='seconds'),
+    }
+    try:
+        pipe = client.pipeline()
+        pipe.lpush(FLAGGED_KEY, json.dumps(record))
+        pipe.ltrim(FLAGGED_KEY, 0, FLAGGED_KEEP - 1)
+        pipe.execute()
+    except RedisError as e:
+        mark_redis_failure(e)
+
+def _flush_if_due(force=False):
+    global _pending, _last_flush
+    with _pending_lock:
+        if not _pending or (not force and time.monotonic() - _last_flush < STATS_FLUSH_SECONDS):
+            return
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+
+    from .services.redis_client import get_redis, mark_redis_failure
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline()
+        for label, (runs, queries, db_ms, flagged, max_queries) in pending.items():
+            pipe.hincrby(STATS_KEY, f"{label}|runs", runs)
+            pipe.hincrby(STATS_KEY, f"{label}|queries", queries)
+            pipe.hincrbyfloat(STATS_KEY, f"{label}|db_ms", round(db_ms, 1))
+            pipe.hincrby(STATS_KEY, f"{label}|flagged", flagged)
+        pipe.execute()
+        # Max can't be incremented; keep the larger of the stored and new value.
+        stored = client.hmget(STATS_KEY, [f"{label}|max" for label in pending])
+        updates = {f"{label}|max": entry[4] for (label, entry), old in zip(pending.items(), stored)
+                   if old is None or int(old) < entry[4]}
+        if updates:
+            client.hset(STATS_KEY, mapping=updates)
+    except RedisError as e:
+        mark_redis_failure(e)
+
+def get_query_stats():
+    """(per-unit rows sorted by average query count, recent flagged units) for the admin panel."""
+    from .services.redis_client import get_redis, mark_redis_failure
+    _flush_if_due(force=True)
+    client = get_redis()
+    if client is None:
+        return [], []
+    try:
+        raw = client.hgetall(STATS_KEY)
+        flagged = [json.loads(item) for item in client.lrange(FLAGGED_KEY, 0, FLAGGED_KEEP - 1)]
+    except RedisError as e:
+        mark_redis_failure(e)
+        return [], []
+
+    units = {}
+    for field, value in raw.items():
+        label, metric = field.decode().rsplit('|', 1)
+        units.setdefault(label, {'label': label})[metric] = float(value)
+    rows = []
+    for unit in units.values():
+        runs = unit.get('runs') or 0
+        if not runs:
+            continue
+        rows.append({
+            'label': unit['label'],
+            'runs': int(runs),
+            'avg_queries': unit.get('queries', 0) / runs,
+            'max_queries': int(unit.get('max', 0)),
+            'avg_db_ms': unit.get('db_ms', 0) / runs,
+            'flagged': int(unit.get('flagged', 0)),
+        })
+    rows.sort(key=lambda row: row['avg_queries'], reverse=True)
+    return rows, flagged
+
+def reset_query_stats():
+    from .services.redis_client import get_redis, mark_redis_failure
+    with _pending_lock:
+        _pending.clear()
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(STATS_KEY, FLAGGED_KEY)
+    except RedisError as e:
+        mark_redis_failure(e)
+
+
+# --- Flask wiring ---
+
+def init_query_profiler(app):
+    """Registers the request hooks. Celery tasks are wrapped in ContextTask via profile_queries()."""
+    if not app.config.get('QUERY_PROFILER_ENABLED'):
+        return
+
+    @app.before_request
+    def start_request_unit():
+        if request.endpoint and request.endpoint != 'static':
+            start_unit(request.endpoint)
+
+    @app.after_request
+    def finish_request_unit(response):
+        stats = finish_unit(app)
+        if stats is not None and app.debug:
+            threshold = app.config.get('QUERY_REPEAT_THRESHOLD', 10)
+            response.headers['X-DB-Query-Count'] = str(stats.count)
+            response.headers['X-DB-Time-Ms'] = f"{stats.db_seconds * 1000:.1f}"
+            response.headers['X-DB-Repeated-Queries'] = str(len(stats.repeated(threshold)))
+        return response
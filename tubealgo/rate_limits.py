@@ -0,0 +1,77 @@
+# tubealgo/rate_limits.py
+"""
+Tiered request rate limits on top of Flask-Limiter.
+
+Every blueprint belongs to an endpoint class (RATE_LIMIT_CLASSES in
+config.py, default 'page'); single endpoints can be put in another class
+than their blueprint. All routes of a class share one budget per user (or
+per IP when logged out). The budget depends on the user's plan via
+RATE_LIMITS. Counters are stored in Redis (RATELIMIT_STORAGE_URI) with the
+moving-window strategy, so limits hold across workers, web nodes and
+deploys; X-RateLimit-* headers tell clients what is left.
+
+These are burst limits. Daily plan quotas (keyword searches, AI generations)
+are still enforced by check_limits / usage_meter.
+"""
+
+from flask import request, jsonify, render_template
+from flask_login import current_user
+from flask_limiter.errors import RateLimitExceeded
+
+DEFAULT_CLASS = 'page'
+
+
+def _plan_key():
+    if current_user and current_user.is_authenticated:
+        return current_user.subscription_plan or 'free'
+    return 'anonymous'
+
+def _wants_json():
+    return request.is_json or '/api/' in request.path or request.accept_mimetypes.best == 'application/json'
+
+
+def init_rate_limits(app, limiter):
+    """Attaches a shared, plan-dependent limit to every registered blueprint. Call after registering blueprints."""
+    classes = app.config.get('RATE_LIMIT_CLASSES', {})
+    plan_limits = app.config.get('RATE_LIMITS', {})
+    exempt_blueprints = set(app.config.get('RATE_LIMIT_EXEMPT_BLUEPRINTS', []))
+    exempt_endpoints = set(app.config.get('RATE_LIMIT_EXEMPT_ENDPOINTS', []))
+
+    blueprint_classes = {name: cls for cls, names in classes.items() for name in names if '.' not in name}
+    endpoint_classes = {name: cls for cls, names in classes.items() for name in names if '.' in name}
+
+    def limit_for(endpoint_class):
+        def provider():
+            limits = plan_limits.get(_plan_key()) or plan_limits.get('free', {})
+            return limits.get(endpoint_class) or limits.get(DEFAULT_CLASS, '')
+        return provider
+
+    for name, blueprint in app.blueprints.items():
+        if name in exempt_blueprints:
+            limiter.exempt(blueprint)
+            continue
+        endpoint_class = blueprint_classes.get(name, DEFAULT_CLASS)
+        limiter.shared_limit(limit_for(endpoint_class), scope=endpoint_class)(blueprint)
+
+    # A limit on the view function overrides its blueprint's limit.
+    for endpoint, endpoint_class in endpoint_classes.items():
+        view_func = app.view_functions.get(endpoint)
+        if view_func is None:
+            app.logger.warning(f"RATE_LIMIT_CLASSES lists unknown endpoint '{endpoint}'")
+            continue
+        app.view_functions[endpoint] = limiter.shared_limit(limit_for(endpoint_class), scope=endpoint_class)(view_func)
+
+    @limiter.request_filter
+    def exempt_listed_endpoints():
+        return request.endpoint in exempt_endpoints
+
+    @app.errorhandler(RateLimitExceeded)
+    def rate_limit_exceeded(error):
+        message = "You're making requests too quickly. Please wait a moment and try again."
+        if _wants_json():
+            response = jsonify({'error': message, 'limit': str(error.limit.limit)})
+        else:
+            response = app.make_response(render_template('errors/429.html', message=message))
+        response.status_code = 429
+        # Flask-Limiter's after_request hook adds Retry-After and X-RateLimit-* to this response.
+        return response
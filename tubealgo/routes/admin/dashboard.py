@@ -6,6 +6,7 @@ from . import admin_bp
 from ... import db
 from ...decorators import admin_required
 from ...models import User, APIKeyStatus, get_config_value
+from ...services.activity_tracker import active_user_count
 from sqlalchemy import func
 from datetime import date, datetime
 import pytz
@@ -17,6 +18,7 @@ def dashboard():
     total_users = User.query.count()
     subscribed_users = User.query.filter(User.subscription_plan != 'free').count()
     users_today = User.query.filter(func.date(User.created_at) == date.today()).count()
+    active_users_24h = active_user_count(hours=24)
     recent_users = User.query.order_by(User.id.desc()).limit(5).all()
 
     api_keys_str = get_config_value('YOUTUBE_API_KEYS', '')
@@ -52,6 +54,7 @@ def dashboard():
                            total_users=total_users,
                            subscribed_users=subscribed_users,
                            users_today=users_today,
+                           active_users_24h=active_users_24h,
                            recent_users=recent_users,
                            api_key_count=len(api_keys_list),
                            key_identifiers=key_identifiers,
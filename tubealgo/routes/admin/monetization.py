@@ -6,6 +6,7 @@ from . import admin_bp
 from ... import db
 from ...decorators import admin_required
 from ...models import Payment, Coupon, SubscriptionPlan
+from ...services.usage_meter import invalidate_plan_cache
 # <<< बदलाव यहाँ है: PlanForm को SubscriptionPlanForm से बदला गया >>>
 from ...forms import CouponForm, SubscriptionPlanForm # Was PlanForm
 
@@ -117,6 +118,7 @@ def edit_plan(plan_id):
             # Update plan attributes from form
             form.populate_obj(plan) # Automatically update fields matching form names
             db.session.commit()
+            invalidate_plan_cache() # Other workers pick up the change within a minute
             flash(f"Plan '{plan.name}' updated successfully!", 'success')
             return redirect(url_for('admin.plans'))
         except Exception as e:
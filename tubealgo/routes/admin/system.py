@@ -10,8 +10,9 @@ from ...decorators import admin_required
 from sqlalchemy import func, cast, Date, exc, text
 from datetime import date, timedelta, datetime
 from ...models import SystemLog, ApiCache, SiteSetting, get_config_value, User, get_setting, log_system_event, APIKeyStatus
+from ...services.settings_cache import publish_settings_changed
+from ...query_profiler import get_query_stats, reset_query_stats
 import json
-import google.generativeai as genai
 import pytz
 import traceback
 
@@ -106,6 +107,29 @@ def clear_cache():
         flash("Invalid request or security token expired.", 'error')
     return redirect(url_for('admin.cache_management'))
 
+@admin_bp.route('/query-stats')
+@login_required
+@admin_required
+def query_stats():
+    units, flagged = get_query_stats()
+    form = CSRFOnlyForm()
+    return render_template('admin/query_stats.html', units=units, flagged=flagged, form=form,
+                           repeat_threshold=current_app.config.get('QUERY_REPEAT_THRESHOLD', 10),
+                           count_warning=current_app.config.get('QUERY_COUNT_WARNING', 50))
+
+
+@admin_bp.route('/query-stats/reset', methods=['POST'])
+@login_required
+@admin_required
+def reset_query_stats_route():
+    form = CSRFOnlyForm()
+    if form.validate_on_submit():
+        reset_query_stats()
+        flash('Query statistics have been reset.', 'success')
+    else:
+        flash("Invalid request or security token expired.", 'error')
+    return redirect(url_for('admin.query_stats'))
+
 @admin_bp.route('/settings', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -162,6 +186,7 @@ def site_settings():
                 db.session.bulk_save_objects(settings_to_add)
 
             db.session.commit()
+            publish_settings_changed()
             flash('Site settings updated successfully!', 'success')
         except Exception as e:
             db.session.rollback()
@@ -222,6 +247,7 @@ def reset_setting(key_name):
         try:
             db.session.delete(setting)
             db.session.commit()
+            publish_settings_changed()
             flash(f"Setting '{key_name}' removed from database. Using default.", 'success')
         except Exception as e:
             db.session.rollback()
@@ -286,6 +312,7 @@ def ai_settings():
                 db.session.bulk_save_objects(settings_to_add)
 
             db.session.commit()
+            publish_settings_changed()
             flash('AI Settings updated successfully!', 'success')
             from ...services.ai_service import initialize_ai_clients
             initialize_ai_clients()
@@ -325,6 +352,7 @@ def ai_settings():
 
     if first_valid_key:
         try:
+            import google.generativeai as genai
             genai.configure(api_key=first_valid_key)
             fetched_models = []
             for m in genai.list_models():
@@ -374,6 +402,7 @@ def test_ai_config():
     if not model_name: return jsonify({'status': 'error', 'message': 'Model name required.'}), 400
     if not isinstance(api_keys, list): return jsonify({'status': 'error', 'message': 'Keys must be a list.'}), 400
 
+    import google.generativeai as genai
     results = []; overall_success = False; valid_keys_provided = False
     for key in api_keys:
         key = key.strip();
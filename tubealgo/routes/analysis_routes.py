@@ -1,22 +1,24 @@
 # tubealgo/routes/analysis_routes.py
 
-from flask import render_template, request, redirect, url_for, flash, Blueprint, Response
+from flask import render_template, request, redirect, url_for, flash, Blueprint, Response, stream_with_context
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
-from tubealgo.models import Competitor
+from tubealgo.models import Competitor, YouTubeChannel
 from tubealgo.services.channel_fetcher import (
     analyze_channel, get_most_used_tags, get_upload_schedule_analysis
 )
 from tubealgo.services.video_fetcher import (
     get_full_video_details, get_all_channel_videos, 
-    get_most_viewed_videos, get_latest_videos
+    get_most_viewed_videos, get_latest_videos, iter_channel_videos
+)
+from tubealgo.services.export_stream import (
+    stream_xlsx, stream_csv, stream_ndjson, download_headers,
+    XLSX_MIMETYPE, CSV_MIMETYPE, NDJSON_MIMETYPE
 )
 from tubealgo.routes.api_routes import get_full_competitor_package
 from tubealgo.routes.utils import get_video_info_dict, sanitize_filename
 from datetime import datetime, timezone
 import json
-from openpyxl import Workbook
-from docx import Document
 from io import BytesIO
 from urllib.parse import quote
 import pytz
@@ -107,42 +109,55 @@ def video_analysis(video_id):
     form = FlaskForm()
     return render_template('video_analysis.html', video=video_info, form=form)
 
-@analysis_bp.route('/analysis/export/excel/<string:channel_id>')
-@login_required
-def export_channel_videos_to_excel(channel_id):
+EXPORT_FORMATS = {
+    'excel': ('xlsx', XLSX_MIMETYPE),
+    'csv': ('csv', CSV_MIMETYPE),
+    'ndjson': ('ndjson', NDJSON_MIMETYPE),
+}
+
+def _export_cell(video, col):
+    if col == 'video_url':
+        return f"https://www.youtube.com/watch?v={video.get('id', '')}"
+    if col == 'upload_date':
+        date_str = video.get(col, '')
+        return datetime.fromisoformat(date_str.replace('Z', '')).strftime('%Y-%m-%d %H:%M') if date_str else ''
+    return video.get(col, 'N/A')
+
+def _export_channel_title(channel_id):
+    # Stored titles only; the export shouldn't spend an API call on its filename.
+    competitor = Competitor.query.filter_by(channel_id_youtube=channel_id).first()
+    if competitor:
+        return competitor.channel_title
+    channel = YouTubeChannel.query.filter_by(channel_id_youtube=channel_id).first()
+    return channel.channel_title if channel else channel_id
+
+def _stream_channel_export(channel_id, fmt):
     selected_columns = request.args.getlist('columns')
     if not selected_columns:
         return "Please select at least one column to export.", 400
-    all_videos = get_all_channel_videos(channel_id)
-    if not isinstance(all_videos, list):
-        all_videos = []
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Channel Video Data"
+    extension, mimetype = EXPORT_FORMATS[fmt]
+
     headers = [col.replace('_', ' ').title() for col in selected_columns]
-    ws.append(headers)
-    for video in all_videos:
-        row = []
-        for col in selected_columns:
-            if col == 'video_url':
-                row.append(f"https://www.youtube.com/watch?v={video.get('id', '')}")
-            elif col == 'upload_date':
-                date_str = video.get(col, '')
-                if date_str:
-                    row.append(datetime.fromisoformat(date_str.replace('Z', '')).strftime('%Y-%m-%d %H:%M'))
-                else:
-                    row.append('')
-            else:
-                row.append(video.get(col, 'N/A'))
-        ws.append(row)
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    channel_info = analyze_channel(channel_id)
-    filename = f"{sanitize_filename(channel_info.get('Title', 'channel'))}_videos_export.xlsx"
-    ascii_filename = filename.encode('ascii', 'ignore').decode('ascii', 'ignore')
-    headers = {'Content-Disposition': 'attachment; filename*=UTF-8\'\'{}; filename="{}"'.format(quote(filename), ascii_filename)}
-    return Response(buffer, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', headers=headers)
+    videos = iter_channel_videos(channel_id)
+    if fmt == 'excel':
+        body = stream_xlsx(headers, ([_export_cell(v, col) for col in selected_columns] for v in videos), sheet_title="Channel Video Data")
+    elif fmt == 'csv':
+        body = stream_csv(headers, ([_export_cell(v, col) for col in selected_columns] for v in videos))
+    else:
+        body = stream_ndjson({col: _export_cell(v, col) for col in selected_columns} for v in videos)
+
+    filename = f"{sanitize_filename(_export_channel_title(channel_id))}_videos_export.{extension}"
+    return Response(stream_with_context(body), mimetype=mimetype, headers=download_headers(filename))
+
+@analysis_bp.route('/analysis/export/excel/<string:channel_id>')
+@login_required
+def export_channel_videos_to_excel(channel_id):
+    return _stream_channel_export(channel_id, 'excel')
+
+@analysis_bp.route('/analysis/export/<any(csv, ndjson):fmt>/<string:channel_id>')
+@login_required
+def export_channel_videos(channel_id, fmt):
+    return _stream_channel_export(channel_id, fmt)
 
 @analysis_bp.route('/analysis/export_video/excel/<string:video_id>')
 @login_required
@@ -151,6 +166,7 @@ def export_single_video_to_excel(video_id):
     if 'error' in video_info:
         flash(f"Could not export data: {video_info['error']}", "error")
         return redirect(url_for('analysis.video_analysis', video_id=video_id))
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "Video Analysis"
@@ -175,6 +191,7 @@ def export_single_video_to_word(video_id):
     if 'error' in video_info:
         flash(f"Could not export data: {video_info['error']}", "error")
         return redirect(url_for('analysis.video_analysis', video_id=video_id))
+    from docx import Document
     document = Document()
     document.add_heading(video_info['title'], level=1)
     document.add_paragraph(f"Channel: {video_info['channel_title']}")
@@ -232,6 +249,7 @@ def export_analysis_to_word(channel_id):
     recent_videos_data = get_latest_videos(channel_id, max_results=5) or {}
     most_viewed_videos = most_viewed_data.get('videos', [])
     recent_videos = recent_videos_data.get('videos', [])
+    from docx import Document
     document = Document()
     document.add_heading('YouTube Channel Analysis Report', level=0)
     document.add_heading(f"Analysis for: {channel_data.get('Title', 'N/A')}", level=1)
@@ -93,7 +93,7 @@ def get_full_competitor_package(competitor_id, force_refresh=False):
 
     playlists = get_channel_playlists(comp.channel_id_youtube)
     top_tags = get_most_used_tags(comp.channel_id_youtube, video_limit=50)
-    category = get_channel_main_category(comp.channel_id_youtube)
+    category = get_channel_main_category(comp.channel_id_youtube, videos=all_videos_unique)
 
     final_data = {
         'details': details,
@@ -1,6 +1,6 @@
 # tubealgo/routes/competitor_routes.py
 
-from flask import render_template, request, redirect, url_for, flash, Blueprint, jsonify
+from flask import render_template, request, redirect, url_for, flash, Blueprint, jsonify, send_file
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from tubealgo import db
@@ -11,12 +11,15 @@ from tubealgo.services.discovery_fetcher import (
     find_similar_channels
 )
 from tubealgo.services.notification_service import send_telegram_photo_with_caption
+from tubealgo.services.dashboard_service import on_dashboard_event
+from tubealgo.services.ordering import next_position, apply_order, renumber
+from tubealgo.services.bulk_export import queue_export, get_export_status, find_archive, archive_filename
+from tubealgo.services.leaderboard_service import LEADERBOARD_VIEWS
 from tubealgo.services.ai_service import generate_idea_from_competitor, analyze_transcript_with_ai
 from tubealgo.routes.api_routes import get_full_competitor_package
 from tubealgo.routes.utils import get_video_info_dict
 from tubealgo.decorators import check_limits, RateLimitExceeded
 import json
-from youtube_transcript_api import YouTubeTranscriptApi
 
 
 competitor_bp = Blueprint('competitor', __name__)
@@ -72,18 +75,17 @@ def add_competitor():
         if existing:
             return jsonify({'success': False, 'error': f"'{analysis_data['Title']}' is already in your list."}), 409
 
-        Competitor.query.filter_by(user_id=current_user.id).update({Competitor.position: Competitor.position + 1})
-        db.session.flush()
-
+        # New competitors go to the top of the list without shifting the others.
         new_competitor = Competitor(
             user_id=current_user.id, 
             channel_id_youtube=analysis_data['id'], 
             channel_title=analysis_data['Title'], 
             thumbnail_url=analysis_data.get('Thumbnail URL', ''), 
-            position=1 
+            position=next_position(Competitor, current_user.id, first=True)
         )
         db.session.add(new_competitor)
         db.session.commit()
+        on_dashboard_event(current_user.id, 'competitors')
 
         # *** UPDATED: Safe background task queuing ***
         try:
@@ -127,11 +129,10 @@ def delete_competitor(competitor_id):
     cache_key = f"competitor_package_v6:{competitor_id}" 
     ApiCache.query.filter_by(cache_key=cache_key).delete()
     
-    deleted_position = comp.position
+    # Positions are gap-based, so the others don't need renumbering.
     db.session.delete(comp)
-    
-    Competitor.query.filter(Competitor.user_id == current_user.id, Competitor.position > deleted_position).update({Competitor.position: Competitor.position - 1})
     db.session.commit()
+    on_dashboard_event(current_user.id, 'competitors')
     flash(f"'{comp.channel_title}' has been removed.", 'success')
     return redirect(url_for('competitor.competitors'))
 
@@ -142,37 +143,91 @@ def move_competitor(competitor_id, direction):
     if comp_to_move.user_id != current_user.id:
         return jsonify({'success': False, 'error': 'Unauthorized'}), 403
 
-    current_pos = comp_to_move.position
-    
+    # Positions have gaps, so the neighbour is the nearest one in that direction.
+    neighbours = Competitor.query.filter(Competitor.user_id == current_user.id, Competitor.id != comp_to_move.id)
     if direction == 'up':
-        swap_pos = current_pos - 1
+        comp_to_swap = neighbours.filter(Competitor.position <= comp_to_move.position).order_by(Competitor.position.desc(), Competitor.id.desc()).first()
     elif direction == 'down':
-        swap_pos = current_pos + 1
+        comp_to_swap = neighbours.filter(Competitor.position >= comp_to_move.position).order_by(Competitor.position, Competitor.id).first()
     else:
         return jsonify({'success': False, 'error': 'Invalid direction'}), 400
 
-    comp_to_swap = Competitor.query.filter_by(user_id=current_user.id, position=swap_pos).first()
-
     if comp_to_swap:
+        if comp_to_swap.position == comp_to_move.position:
+            # Older rows can share a position; spread them out so the swap changes the order.
+            renumber(Competitor, current_user.id)
+            db.session.refresh(comp_to_move)
+            db.session.refresh(comp_to_swap)
         comp_to_move.position, comp_to_swap.position = comp_to_swap.position, comp_to_move.position
         db.session.commit()
+        # Only the first few competitors feed the dashboard, so order matters.
+        on_dashboard_event(current_user.id, 'competitors')
         return jsonify({'success': True, 'message': 'Position updated.'})
     
     return jsonify({'success': False, 'error': 'Move out of bounds'}), 400
 
+@competitor_bp.route('/competitors/reorder', methods=['POST'])
+@login_required
+def reorder_competitors():
+    """Saves the full competitor order ({"order": [ids]}) in one UPDATE."""
+    data = request.get_json() or {}
+    order = data.get('order')
+    if not isinstance(order, list):
+        return jsonify({'success': False, 'error': 'Missing order list'}), 400
+    apply_order(Competitor, current_user.id, {None: order})
+    db.session.commit()
+    on_dashboard_event(current_user.id, 'competitors')
+    return jsonify({'success': True, 'message': 'Order updated.'})
+
+@competitor_bp.route('/competitors/export', methods=['POST'])
+@login_required
+def export_all_competitors():
+    try:
+        @check_limits(feature='bulk_export')
+        def do_queue():
+            data = request.get_json(silent=True) or {}
+            result = queue_export(current_user.id, data.get('format', 'xlsx'))
+            if result.get('error'):
+                return jsonify(result), 400 if result['error'] == 'Unsupported export format.' else 503
+            return jsonify(result), 202
+        return do_queue()
+    except RateLimitExceeded as e:
+        return jsonify({'error': str(e)}), 403
+
+@competitor_bp.route('/competitors/export/status', methods=['GET'])
+@login_required
+def export_all_competitors_status():
+    status = get_export_status(current_user.id) or {'state': 'none'}
+    if status.get('state') == 'done':
+        status['download_url'] = url_for('competitor.download_competitor_export')
+    return jsonify(status)
+
+@competitor_bp.route('/competitors/export/download', methods=['GET'])
+@login_required
+def download_competitor_export():
+    status = get_export_status(current_user.id)
+    path = find_archive(current_user.id, status['job_id']) if status and status.get('state') == 'done' else None
+    if not path:
+        flash('Your export is no longer available. Please start a new one.', 'error')
+        return redirect(url_for('competitor.competitors'))
+    return send_file(path, mimetype='application/zip', as_attachment=True, download_name=archive_filename(), max_age=0)
+
 @competitor_bp.route('/discover', methods=['GET', 'POST'])
 @login_required
 def discover():
     categories = get_youtube_categories()
     top_channels, similar_channels = [], []
-    selected_category_id, searched_channel_name = None, ""
+    selected_category_id, searched_channel_name, leaderboard_view = None, "", 'top'
     if request.method == 'POST':
         form_type = request.form.get('form_type')
         if form_type == 'category_search':
             selected_category_id = request.form.get('category_id')
+            leaderboard_view = request.form.get('view') if request.form.get('view') in LEADERBOARD_VIEWS else 'top'
             if selected_category_id:
-                top_channels = get_top_channels_by_category(selected_category_id)
-                if not top_channels: flash('No popular channels found for this category.', 'info')
+                top_channels = get_top_channels_by_category(selected_category_id, view=leaderboard_view)
+                if not top_channels and leaderboard_view == 'growing':
+                    flash('Growth rankings for this category are not ready yet. Please check back tomorrow.', 'info')
+                elif not top_channels: flash('No popular channels found for this category.', 'info')
         elif form_type == 'similar_search':
             searched_channel_name = request.form.get('channel_url')
             if searched_channel_name:
@@ -182,7 +237,7 @@ def discover():
                 else:
                     similar_channels = find_similar_channels(source_data['id'])
                     if not similar_channels: flash(f"Could not find channels similar to '{source_data['Title']}'.", 'info')
-    return render_template('discover.html', categories=categories, top_channels=top_channels, similar_channels=similar_channels, selected_category_id=selected_category_id, searched_channel_name=searched_channel_name, active_page='discover')
+    return render_template('discover.html', categories=categories, top_channels=top_channels, similar_channels=similar_channels, selected_category_id=selected_category_id, searched_channel_name=searched_channel_name, leaderboard_view=leaderboard_view, active_page='discover')
 
 @competitor_bp.route('/video/<video_id>/send/telegram')
 @login_required
@@ -252,6 +307,7 @@ def analyze_transcript(video_id):
         @check_limits(feature='ai_generation')
         def do_analysis():
             try:
+                from youtube_transcript_api import YouTubeTranscriptApi
                 transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
                 full_transcript = " ".join([item['text'] for item in transcript_list])
             except Exception as e:
@@ -5,6 +5,7 @@ from flask_login import login_required, current_user
 from tubealgo import db
 from tubealgo.models import Goal, User
 from tubealgo.services.channel_fetcher import analyze_channel
+from tubealgo.services.dashboard_service import on_dashboard_event
 from datetime import datetime
 
 goal_bp = Blueprint('goal', __name__, url_prefix='/api/goals')
@@ -59,5 +60,6 @@ def set_goal():
     )
     db.session.add(new_goal)
     db.session.commit()
+    on_dashboard_event(current_user.id, 'goals')
 
     return jsonify({'success': True, 'message': 'Goal set successfully!'}), 201
\ No newline at end of file
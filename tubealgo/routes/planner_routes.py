@@ -7,9 +7,12 @@ from tubealgo import db
 from tubealgo.models import ContentIdea
 from tubealgo.services.ai_service import generate_idea_set
 from tubealgo.decorators import check_limits, RateLimitExceeded
+from tubealgo.services.ordering import next_position, apply_order, move_item
 
 planner_bp = Blueprint('planner', __name__)
 
+PLANNER_STATUSES = ('idea', 'scripting', 'filming', 'editing', 'scheduled')
+
 @planner_bp.route('/planner')
 @login_required
 def planner():
@@ -72,15 +75,13 @@ def create_idea():
     if not title:
         return jsonify({'error': 'Title is required'}), 400
 
-    max_position = db.session.query(db.func.max(ContentIdea.position)).filter_by(user_id=current_user.id, status=status).scalar() or -1
-    
     new_idea = ContentIdea(
         user_id=current_user.id,
         title=title,
         display_title=title,
         notes=notes,
         status=status,
-        position=max_position + 1
+        position=next_position(ContentIdea, current_user.id, status=status)
     )
     db.session.add(new_idea)
     db.session.commit()
@@ -108,9 +109,8 @@ def update_idea(idea_id):
     if 'notes' in data:
         idea.notes = data['notes']
     if 'status' in data:
+        idea.position = next_position(ContentIdea, current_user.id, status=data['status'])
         idea.status = data['status']
-        max_position = db.session.query(db.func.max(ContentIdea.position)).filter_by(user_id=current_user.id, status=data['status']).scalar() or -1
-        idea.position = max_position + 1
 
     db.session.commit()
     return jsonify({
@@ -124,22 +124,34 @@ def update_idea(idea_id):
 @planner_bp.route('/api/planner/ideas/move', methods=['POST'])
 @login_required
 def move_idea():
-    data = request.json
-    for status, idea_ids in data.items():
-        if not isinstance(idea_ids, list):
-            continue
-        for index, idea_id in enumerate(idea_ids):
-            try:
-                idea = ContentIdea.query.get(int(idea_id))
-                if idea and idea.user_id == current_user.id:
-                    idea.status = status
-                    idea.position = index
-            except (ValueError, TypeError):
-                continue
-            
+    """Saves the whole board ({status: [idea ids in order]}) in one UPDATE."""
+    data = request.json or {}
+    board = {status: ids for status, ids in data.items() if status in PLANNER_STATUSES}
+    apply_order(ContentIdea, current_user.id, board, group_column='status')
     db.session.commit()
     return jsonify({'success': True, 'message': 'Planner updated successfully.'})
 
+@planner_bp.route('/api/planner/ideas/<int:idea_id>/position', methods=['POST'])
+@login_required
+def move_single_idea(idea_id):
+    """Moves one card between its new neighbours: {status, before_id, after_id}."""
+    data = request.json or {}
+    status = data.get('status')
+    if status not in PLANNER_STATUSES:
+        return jsonify({'error': 'Invalid status'}), 400
+    try:
+        before_id = int(data['before_id']) if data.get('before_id') is not None else None
+        after_id = int(data['after_id']) if data.get('after_id') is not None else None
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid neighbour id'}), 400
+
+    result = move_item(ContentIdea, current_user.id, idea_id, before_id, after_id, status=status)
+    if 'error' in result:
+        db.session.rollback()
+        return jsonify(result), 404
+    db.session.commit()
+    return jsonify(result)
+
 @planner_bp.route('/api/planner/ideas/<int:idea_id>', methods=['DELETE'])
 @login_required
 def delete_idea(idea_id):
@@ -9,6 +9,7 @@ from ..services.youtube_manager import (
     get_competitors_playlists
 )
 from ..services.ai_service import generate_playlist_suggestions
+from ..services.user_cache import get_competitor_count
 from ..decorators import check_limits, RateLimitExceeded
 from ..models import SubscriptionPlan
 from .utils import get_credentials
@@ -116,7 +117,7 @@ def generate_playlist_ideas():
             if not creds:
                 return jsonify({'error': 'Please connect your Google Account first.'}), 400
 
-            if current_user.competitors.count() == 0:
+            if get_competitor_count(current_user) == 0:
                 return jsonify({
                     'error': 'no_competitors', 
                     'message': 'Add competitors to get AI-powered playlist suggestions.',
@@ -5,7 +5,7 @@ from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from tubealgo import db
 from tubealgo.models import User, log_system_event
-from tubealgo.services.notification_service import send_telegram_message
+from tubealgo.services.notification_service import send_telegram_message, send_telegram_message_now
 import pytz
 
 settings_bp = Blueprint('settings', __name__)
@@ -40,7 +40,7 @@ def test_telegram():
     chat_id_to_test = current_user.telegram_chat_id
     message = "✅ This is a test message from TubeAlgo! Your notifications are working correctly. 🚀"
     
-    response = send_telegram_message(chat_id_to_test, message)
+    response = send_telegram_message_now(chat_id_to_test, message)
     
     if response and response.get('ok'):
         flash('Test message sent successfully! Please check your Telegram.', 'success')
@@ -118,6 +118,7 @@ def telegram_settings():
         current_user.telegram_notify_milestone = 'notify_milestone' in request.form
         current_user.telegram_notify_ai_suggestion = 'notify_ai_suggestion' in request.form
         current_user.telegram_notify_weekly_report = 'notify_weekly_report' in request.form
+        current_user.telegram_notify_monthly_report = 'notify_monthly_report' in request.form
         
         db.session.commit()
         flash('Telegram settings saved successfully!', 'success')
@@ -0,0 +1,39 @@
+# tubealgo/routes/telegram_routes.py
+
+import hmac
+from flask import Blueprint, request, jsonify, current_app
+from tubealgo.models import get_config_value
+from tubealgo.telegram_bot_handler import claim_update, release_update
+
+telegram_bp = Blueprint('telegram', __name__, url_prefix='/telegram')
+
+@telegram_bp.route('/webhook', methods=['POST'])
+def telegram_webhook():
+    """
+    Telegram Bot API webhook (registered with `flask telegram-webhook set`).
+    Checks the secret token, drops update_ids already seen on any node and
+    hands the update to a Celery task, so Telegram gets its 200 right away.
+    """
+    secret = get_config_value('TELEGRAM_WEBHOOK_SECRET')
+    if not secret:
+        return jsonify({'error': 'Webhook mode is not enabled.'}), 404
+    received = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not hmac.compare_digest(received.encode(), secret.encode()):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    update = request.get_json(silent=True) or {}
+    update_id = update.get('update_id')
+    if not isinstance(update_id, int):
+        return jsonify({'error': 'Invalid update.'}), 400
+    if not claim_update(update_id):
+        return jsonify({'status': 'duplicate'}), 200
+
+    try:
+        from tubealgo.jobs import handle_telegram_update
+        handle_telegram_update.apply_async(args=[update], retry=False)
+    except Exception as e:
+        # Let Telegram re-send it later
+        release_update(update_id)
+        current_app.logger.error(f"Could not queue Telegram update {update_id}: {e}")
+        return jsonify({'status': 'error'}), 500
+    return jsonify({'status': 'ok'}), 200
@@ -4,20 +4,20 @@ from flask import render_template, request, flash, Blueprint, jsonify, redirect,
 from flask_login import login_required, current_user
 from tubealgo import db
 from tubealgo.models import SearchHistory
-from tubealgo.services.suggestion_service import get_keyword_suggestions
+from tubealgo.services.keyword_engine import get_keyword_suggestions, research_keyword
+from tubealgo.services.keyword_index import complete_keyword
+from tubealgo.services.trends_service import get_trends, MAX_KEYWORDS as MAX_TREND_KEYWORDS
 from tubealgo.services.ai_service import generate_titles_and_tags, generate_description, generate_script_outline
-from tubealgo.services.youtube_core import get_youtube_service
 from tubealgo.services.video_fetcher import get_trending_videos
-from collections import Counter
 from tubealgo.decorators import check_limits, RateLimitExceeded
 import re
-from youtube_transcript_api import YouTubeTranscriptApi
-from pytrends.request import TrendReq
-from tubealgo.services.cache_manager import get_from_cache, set_to_cache
 
 
 tool_bp = Blueprint('tool', __name__)
 
+MIN_LOCAL_SUGGESTIONS = 5
+RELATED_TREND_KEYWORDS = 3
+
 def extract_video_id(url):
     patterns = [
         r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/watch\?v=([a-zA-Z0-9_-]{11})',
@@ -68,77 +68,33 @@ def keyword_research():
                 db.session.add(new_search)
                 db.session.commit()
 
-                # --- Get data from various sources ---
-                suggestions = get_keyword_suggestions(keyword_in)
-                top_video_tags = []
-                top_ranking_videos = []
-                competition_score = {"score": "N/A", "text": "Could not determine.", "color": "text-gray-500"}
-
-                try:
-                    youtube, error = get_youtube_service()
-                    if error:
-                        flash(f"API Error: {error}", "error")
-                    else:
-                        # 1. Search for top 5 videos
-                        search_response = youtube.search().list(
-                            q=keyword_in, part='id', type='video', maxResults=5, order='relevance'
-                        ).execute()
-                        video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
-
-                        if video_ids:
-                            # 2. Get details for those videos
-                            videos_response = youtube.videos().list(
-                                part='snippet,statistics,contentDetails', id=','.join(video_ids)
-                            ).execute()
-                            
-                            all_tags = []
-                            total_views = 0
-                            high_view_count_videos = 0
-                            
-                            for item in videos_response.get('items', []):
-                                # a. Process for Top Ranking Videos display
-                                stats = item.get('statistics', {})
-                                view_count = int(stats.get('viewCount', 0))
-                                total_views += view_count
-                                if view_count > 500000: # 5 Lakh views
-                                    high_view_count_videos += 1
-                                
-                                top_ranking_videos.append({
-                                    'id': item.get('id'),
-                                    'title': item.get('snippet', {}).get('title'),
-                                    'thumbnail': item.get('snippet', {}).get('thumbnails', {}).get('medium', {}).get('url'),
-                                    'channel_title': item.get('snippet', {}).get('channelTitle'),
-                                    'view_count': view_count,
-                                    'published_at': item.get('snippet', {}).get('publishedAt')
-                                })
-
-                                # b. Process for Tag Cloud
-                                tags = item.get('snippet', {}).get('tags', [])
-                                if tags:
-                                    all_tags.extend(tags)
-                            
-                            # 3. Calculate competition score
-                            if total_views > 2000000 and high_view_count_videos >= 2:
-                                competition_score = {"score": "High", "text": "Very competitive. Dominated by high-view videos.", "color": "text-red-500"}
-                            elif total_views > 500000 or high_view_count_videos >= 1:
-                                competition_score = {"score": "Medium", "text": "Moderately competitive. Opportunity exists.", "color": "text-yellow-500"}
-                            else:
-                                competition_score = {"score": "Low", "text": "Less competitive. Good opportunity to rank!", "color": "text-green-500"}
-
-                            if all_tags:
-                                tag_counts = Counter(all_tags)
-                                top_video_tags = tag_counts.most_common(30)
-
-                except Exception as e:
-                    flash(f"Could not fetch complete YouTube data: {e}", "error")
+                # --- Suggestions and YouTube competition, fetched together (both cached) ---
+                expanded = request.form.get('expanded') == '1'
+                suggestions, competition = research_keyword(keyword_in, expanded=expanded)
+                if 'error' in competition:
+                    flash(competition['error'], "error")
+                top_video_tags = competition.get('top_video_tags', [])
+                top_ranking_videos = competition.get('top_ranking_videos', [])
+                competition_score = competition.get('competition_score') or {"score": "N/A", "text": "Could not determine.", "color": "text-gray-500"}
+
+                # The main keyword and a few related ones share one Trends payload
+                trend_keywords = [keyword_in]
+                if 'error' not in suggestions and suggestions['suggestions'][0]['volume']:
+                    for s in suggestions['suggestions']:
+                        if len(trend_keywords) > RELATED_TREND_KEYWORDS:
+                            break
+                        if s['keyword'].lower() != keyword_in.lower():
+                            trend_keywords.append(s['keyword'])
 
                 return render_template(
                     'keyword_tool.html', 
                     keyword=keyword_in, 
                     suggestions=suggestions,
+                    expanded=expanded,
                     top_video_tags=top_video_tags,
                     top_ranking_videos=top_ranking_videos,
                     competition_score=competition_score,
+                    trend_keywords=trend_keywords,
                     active_page='keyword_research'
                 )
             return do_search()
@@ -165,7 +121,17 @@ def api_keyword_suggestions():
     query = request.args.get('q', '')
     if len(query) < 2:
         return jsonify([])
-    return jsonify(get_keyword_suggestions(query))
+    expanded = request.args.get('expanded') == '1'
+
+    # Local index first; Google is only asked for cold prefixes (its answers are recorded locally)
+    local = [] if expanded else complete_keyword(query)
+    if len(local) < MIN_LOCAL_SUGGESTIONS:
+        remote = get_keyword_suggestions(query, expanded=expanded)
+        if not local:
+            return jsonify(remote)
+        if 'error' not in remote:
+            local += [s['keyword'] for s in remote['suggestions'] if s['volume'] and s['keyword'].lower() not in local]
+    return jsonify({"suggestions": [{"keyword": term, "volume": "(coming soon)"} for term in local]})
 
 @tool_bp.route('/ai-generator', methods=['GET', 'POST'])
 @login_required
@@ -242,6 +208,7 @@ def api_generate_script():
 @login_required
 def get_transcript(video_id):
     try:
+        from youtube_transcript_api import YouTubeTranscriptApi
         transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
         full_transcript = " ".join([item['text'] for item in transcript_list])
         return jsonify({'success': True, 'transcript': full_transcript})
@@ -254,28 +221,21 @@ def get_transcript(video_id):
 @tool_bp.route('/api/get-trend/<string:keyword>')
 @login_required
 def get_google_trend(keyword):
-    cache_key = f"google_trend:{keyword}"
-    cached_data = get_from_cache(cache_key)
-    if cached_data:
-        return jsonify(cached_data)
-
-    try:
-        pytrends = TrendReq(hl='en-US', tz=330, timeout=(10, 30))
-        
-        pytrends.build_payload([keyword], cat=0, timeframe='today 12-m', geo='', gprop='youtube')
-        
-        interest_over_time_df = pytrends.interest_over_time()
-
-        if interest_over_time_df.empty:
-            return jsonify({'error': 'Not enough data for this keyword.'}), 404
-            
-        trend_data = {
-            'labels': interest_over_time_df.index.strftime('%b %Y').tolist(),
-            'data': interest_over_time_df[keyword].tolist()
-        }
-        
-        set_to_cache(cache_key, trend_data, expire_hours=12)
-        
-        return jsonify(trend_data)
-    except Exception as e:
-        return jsonify({'error': f'Could not fetch trend data: {str(e)}'}), 500
\ No newline at end of file
+    trend_data = get_trends([keyword], timeframe=request.args.get('timeframe', 'today 12-m')).get(keyword)
+    if not trend_data:
+        return jsonify({'error': 'Please enter a keyword.'}), 400
+    if 'error' in trend_data:
+        return jsonify(trend_data), 429 if 'retry_after' in trend_data else 500
+    if not trend_data['data']:
+        return jsonify({'error': 'Not enough data for this keyword.'}), 404
+    return jsonify(trend_data)
+
+@tool_bp.route('/api/get-trends')
+@login_required
+def get_google_trends():
+    keywords = [k.strip() for k in request.args.getlist('keyword') if k.strip()]
+    if not keywords:
+        return jsonify({'error': 'Please enter a keyword.'}), 400
+    if len(keywords) > MAX_TREND_KEYWORDS:
+        return jsonify({'error': f'At most {MAX_TREND_KEYWORDS} keywords at a time.'}), 400
+    return jsonify(get_trends(keywords, timeframe=request.args.get('timeframe', 'today 12-m')))
\ No newline at end of file
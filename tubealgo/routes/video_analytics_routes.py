@@ -4,10 +4,7 @@ import logging
 import json
 from flask import Blueprint, render_template, jsonify, flash, redirect, url_for, current_app
 from flask_login import login_required, current_user
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-# <<< FIX 1: Import Class with an Alias >>>
-from youtube_transcript_api import YouTubeTranscriptApi as YTTApi, TranscriptsDisabled, NoTranscriptFound
 import concurrent.futures
 import threading
 from ..services.ai_service import generate_retention_insights
@@ -90,6 +87,7 @@ def stream_all_video_data(video_id):
                 sse.publish(error_dict, type=event_type, channel=channel)
 
     # --- Specific Task Definitions ---
+    from googleapiclient.discovery import build
     def task_views(): analytics_client = build('youtubeAnalytics', 'v2', credentials=creds); return get_views_for_video(analytics_client, video_id)
     def task_watch_time(): analytics_client = build('youtubeAnalytics', 'v2', credentials=creds); return get_watch_time_for_video(analytics_client, video_id)
     def task_subscribers(): analytics_client = build('youtubeAnalytics', 'v2', credentials=creds); return get_subscribers_for_video(analytics_client, video_id)
@@ -122,6 +120,7 @@ def stream_all_video_data(video_id):
         except Exception as e_dep: logger.warning(f"AI Insights: Skipping dep fetch error for {video_id}: {e_dep}"); return {'insights_error': f'Could not get data for AI: {str(e_dep)[:50]}...'}
 
         transcript_ai = ""
+        from youtube_transcript_api import YouTubeTranscriptApi as YTTApi, TranscriptsDisabled, NoTranscriptFound
         try: # Fetch Transcript
             # <<< FIX 2: Use the imported Alias YTTApi >>>
             logger.debug(f"AI Insights: Attempting transcript fetch for {video_id} using YTTApi.get_transcript")
@@ -14,6 +14,7 @@ from ..services.youtube_manager import (
     get_user_videos, update_video_details, get_single_video,
     upload_video, set_video_thumbnail
 )
+from ..services.user_cache import get_competitor_count
 from ..models import get_setting, log_system_event, User
 from .utils import get_credentials
 from ..jobs import bulk_edit_videos
@@ -189,7 +190,7 @@ def upload():
         flash('Please connect your Google account to upload videos.', 'warning')
         return redirect(url_for('auth_google.connect_youtube'))
 
-    has_competitors = current_user.competitors.count() > 0
+    has_competitors = get_competitor_count(current_user) > 0
 
     if request.method == 'POST':
         form = UploadForm()
@@ -329,7 +330,7 @@ def edit_video(video_id):
                 flash('Invalid schedule date format submitted.', 'error')
                 return render_template( 'edit_video.html', video=video_details, form=form,
                     current_visibility=current_visibility,
-                    has_competitors=current_user.competitors.count() > 0,
+                    has_competitors=get_competitor_count(current_user) > 0,
                     is_video_short=is_video_short )
 
         final_visibility = 'private' if visibility_choice == 'schedule' and publish_at_time else visibility_choice
@@ -383,7 +384,7 @@ def edit_video(video_id):
         video=video_details,
         form=form,
         current_visibility=current_visibility,
-        has_competitors=current_user.competitors.count() > 0,
+        has_competitors=get_competitor_count(current_user) > 0,
         is_video_short=is_video_short
     )
 
@@ -0,0 +1,144 @@
+# tubealgo/services/activity_tracker.py
+"""
+Write-behind buffer for User.last_seen.
+
+Updating last_seen used to cost a commit inside a user's request every few
+minutes. Now a request only records the user id and time in a Redis hash
+(repeated writes for the same user just overwrite one field), and the
+flush_last_seen job copies the whole hash to the User table with one bulk
+UPDATE per batch.
+
+Each process also skips users it already recorded within
+LOCAL_THROTTLE_SECONDS, so most requests don't touch Redis at all. If Redis
+is unavailable, activity is kept in a process-local buffer and written to the
+DB at most once per LOCAL_FLUSH_SECONDS.
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from redis.exceptions import RedisError
+from sqlalchemy import or_
+from .. import db
+from ..models import User
+from .redis_client import get_redis, mark_redis_failure
+from .db_bulk import bulk_update_from_values
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_KEY = 'activity:last_seen'
+LOCAL_THROTTLE_SECONDS = 60
+LOCAL_FLUSH_SECONDS = 60
+FLUSH_BATCH_SIZE = 1000
+
+_recorded = {}          # user_id -> monotonic time last recorded by this process
+_pending = {}           # user_id -> epoch seconds, used while Redis is down
+_last_local_flush = time.monotonic()
+_last_prune = time.monotonic()
+_lock = threading.Lock()
+
+
+def record_activity(user_id):
+    """Notes that a user was active now. Cheap enough to call on every request."""
+    now = time.monotonic()
+    last = _recorded.get(user_id)
+    if last is not None and now - last < LOCAL_THROTTLE_SECONDS:
+        return
+    _prune_recorded(now)
+    _recorded[user_id] = now
+    seen_at = int(time.time())
+
+    client = get_redis()
+    if client is not None:
+        try:
+            client.hset(ACTIVITY_KEY, user_id, seen_at)
+            return
+        except RedisError as e:
+            mark_redis_failure(e)
+
+    with _lock:
+        _pending[user_id] = seen_at
+    _flush_local_if_due()
+
+
+def _prune_recorded(now):
+    """Drops throttle entries that have expired, so _recorded only holds recently active users."""
+    global _recorded, _last_prune
+    if now - _last_prune < LOCAL_THROTTLE_SECONDS:
+        return
+    with _lock:
+        if now - _last_prune < LOCAL_THROTTLE_SECONDS:
+            return
+        _recorded = {uid: at for uid, at in list(_recorded.items()) if now - at < LOCAL_THROTTLE_SECONDS}
+        _last_prune = now
+
+
+def _flush_local_if_due():
+    global _pending, _last_local_flush
+    with _lock:
+        if not _pending or time.monotonic() - _last_local_flush < LOCAL_FLUSH_SECONDS:
+            return
+        pending, _pending = _pending, {}
+        _last_local_flush = time.monotonic()
+    try:
+        _write_last_seen(pending)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Could not write buffered last_seen values: {e}")
+
+
+def _write_last_seen(seen_by_user):
+    user_table = User.__table__
+    rows = [{'id': int(uid), 'last_seen': datetime.utcfromtimestamp(int(ts))} for uid, ts in seen_by_user.items()]
+    return bulk_update_from_values(
+        user_table, 'id', ['last_seen'], rows,
+        # Never move last_seen backwards.
+        condition=lambda table, v: or_(table.c.last_seen.is_(None), table.c.last_seen < v.c.last_seen)
+    )
+
+
+def flush_activity():
+    """
+    Moves the buffered activity from Redis to User.last_seen. Returns the number
+    of users written. Called from the flush_last_seen job.
+    """
+    _flush_local_if_due()
+    client = get_redis()
+    if client is None:
+        return 0
+
+    # Claim the current hash atomically; new activity goes into a fresh one.
+    processing_key = f"{ACTIVITY_KEY}:flushing"
+    if not client.exists(processing_key):
+        try:
+            client.rename(ACTIVITY_KEY, processing_key)
+        except RedisError as e:
+            if 'no such key' in str(e).lower():
+                return 0
+            raise
+
+    written = 0
+    cursor = 0
+    while True:
+        cursor, batch = client.hscan(processing_key, cursor, count=FLUSH_BATCH_SIZE)
+        if batch:
+            try:
+                _write_last_seen(batch)
+                db.session.commit()
+                written += len(batch)
+            except Exception:
+                # The processing hash is left in place; the next run retries it.
+                db.session.rollback()
+                raise
+        if cursor == 0:
+            break
+    client.delete(processing_key)
+    return written
+
+
+def active_user_count(hours=24):
+    """Users seen in the last `hours`. Cheap thanks to the index on last_seen."""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    return User.query.filter(User.last_seen >= since).count()
@@ -1,12 +1,9 @@
 # tubealgo/services/ai_service.py
 
 import os
-import openai
 import json
 import traceback
 from datetime import datetime
-import google.generativeai as genai
-from youtube_transcript_api import YouTubeTranscriptApi # <-- Make sure this is imported
 from .cache_manager import get_from_cache, set_to_cache
 from .video_fetcher import get_latest_videos
 from tubealgo.models import get_config_value, get_setting, APIKeyStatus, log_system_event
@@ -15,6 +12,7 @@ from tubealgo import db
 # Global variables for managing AI clients
 gemini_keys = []
 openai_client = None
+_clients_initialized = False
 
 def _mask_gemini_key(key):
     """Masks a Gemini API key for logging."""
@@ -23,9 +21,10 @@ def _mask_gemini_key(key):
     return "invalid_gemini_key"
 
 def initialize_ai_clients():
-    """Initializes all AI clients once when the application starts."""
-    global gemini_keys, openai_client
-    
+    """Loads the AI keys and clients. Runs on first use in each process and again when admins change keys."""
+    global gemini_keys, openai_client, _clients_initialized
+    _clients_initialized = True
+
     gemini_keys_str = get_config_value('GEMINI_API_KEY', '')
     if gemini_keys_str:
         try:
@@ -43,15 +42,22 @@ def initialize_ai_clients():
     openai_key = get_config_value('OPENAI_API_KEY')
     if openai_key:
         print("INFO: Initializing OpenAI Client.")
+        import openai  # Heavy import, only needed when an OpenAI key is configured
         openai_client = openai.OpenAI(api_key=openai_key)
 
+def _ensure_ai_clients():
+    if not _clients_initialized:
+        initialize_ai_clients()
+
 def get_next_gemini_client():
     """
     Finds a valid, active Gemini key, configures the service, and returns it.
     Marks keys as 'exhausted' upon failure.
     """
+    _ensure_ai_clients()
     if not gemini_keys:
         return None
+    import google.generativeai as genai
 
     all_key_identifiers = [_mask_gemini_key(key) for key in gemini_keys]
     
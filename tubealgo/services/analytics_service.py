@@ -2,11 +2,11 @@
 
 import logging
 import time
+import random
 from functools import wraps # Import wraps for decorator preservation
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from datetime import date, timedelta
-import numpy as np # Make sure numpy is installed
+# numpy is imported inside the retention helpers that use it, to keep it out of app startup.
 
 # Configure logging (ensure this runs only once, maybe better in __init__.py)
 # If already configured in __init__.py, you might not need basicConfig here again.
@@ -44,7 +44,7 @@ def retry_api_call(max_retries=2, delay=3): # <<< Initial delay slightly increas
                     if (is_timeout or is_retryable_http_error) and retries < max_retries:
                         retries += 1
                         # Exponential backoff with jitter
-                        wait_time = (delay * (2 ** (retries - 1))) + np.random.uniform(0, 1)
+                        wait_time = (delay * (2 ** (retries - 1))) + random.uniform(0, 1)
                         logger.warning(f"API call failed ({type(e).__name__} in {func.__name__}). Retrying in {wait_time:.2f} seconds... (Attempt {retries}/{max_retries})")
                         time.sleep(wait_time)
                         continue # <<< Continue to next retry iteration
@@ -76,6 +76,7 @@ def find_key_moments(retention_data):
 
     # Use numpy for slightly cleaner calculations if available and data is numeric
     try:
+        import numpy as np
         data_np = np.array(retention_data, dtype=float) # Convert Nones or non-numerics to NaN
         if len(data_np) < 3: return dips, spikes
 
@@ -118,6 +119,7 @@ def find_key_moments(retention_data):
 @retry_api_call()
 def get_recent_video_ids(credentials, max_results=20):
     """Fetches the IDs of the user's most recent videos."""
+    from googleapiclient.discovery import build
     youtube = build('youtube', 'v3', credentials=credentials)
     channels_response = youtube.channels().list(mine=True, part='contentDetails').execute()
 
@@ -206,6 +208,7 @@ def get_subscribers_for_video(analytics, video_id):
 @retry_api_call(max_retries=1) # Fewer retries for CTR as it might be less critical
 def get_video_ctr(credentials, video_id, start_date, end_date):
     """Fetches impression click-through rate for a specific video and date range."""
+    from googleapiclient.discovery import build
     analytics = build('youtubeAnalytics', 'v2', credentials=credentials)
     start_date_str = start_date.strftime('%Y-%m-%d')
     end_date_str = end_date.strftime('%Y-%m-%d')
@@ -234,6 +237,7 @@ def get_video_ctr(credentials, video_id, start_date, end_date):
 @retry_api_call()
 def get_audience_retention(credentials, video_id):
     """Fetches audience retention data for a video."""
+    from googleapiclient.discovery import build
     analytics = build('youtubeAnalytics', 'v2', credentials=credentials)
     start_date = (date.today() - timedelta(days=28)).strftime('%Y-%m-%d') # Keep 28 days for retention
     end_date = date.today().strftime('%Y-%m-%d')
@@ -330,6 +334,7 @@ def get_average_retention(credentials):
 
         # Calculate average only if we have curves
         try:
+             import numpy as np
              avg_retention_curve = np.mean(all_retention_curves, axis=0).tolist()
              logger.info(f"Calculated average retention based on {len(all_retention_curves)} videos.")
              return {'data': avg_retention_curve, 'error': None}
@@ -347,6 +352,7 @@ def get_average_retention(credentials):
 @retry_api_call()
 def get_traffic_sources(credentials, video_id):
     """Fetches top traffic sources for a video."""
+    from googleapiclient.discovery import build
     analytics = build('youtubeAnalytics', 'v2', credentials=credentials)
     start_date = (date.today() - timedelta(days=28)).strftime('%Y-%m-%d')
     end_date = date.today().strftime('%Y-%m-%d')
@@ -0,0 +1,243 @@
+# tubealgo/services/analytics_warehouse.py
+"""
+Local analytics warehouse.
+
+A nightly Celery job pulls per-video, per-day metrics for every connected
+channel with a few large paged `reports().query` calls and stores them in
+compact fact tables, plus channel-level daily totals (subscriber changes are
+only complete at channel level). Monthly reports and the A/B test CTR check
+read from these tables instead of issuing live per-video Analytics queries.
+"""
+
+import logging
+from datetime import date, timedelta, datetime
+from googleapiclient.errors import HttpError
+from sqlalchemy import func
+from .. import db
+from ..models import VideoDailyMetric, ChannelDailyMetric, ChannelTrafficDaily, AnalyticsIngestRun
+from .analytics_service import retry_api_call
+
+logger = logging.getLogger(__name__)
+
+# Analytics data settles with a 2-3 day lag, so every run re-pulls a short
+# trailing window on top of whatever is new since the last run.
+BACKFILL_DAYS = 90
+REFRESH_WINDOW_DAYS = 3
+PAGE_SIZE = 200
+
+VIDEO_METRICS = 'views,estimatedMinutesWatched,subscribersGained,subscribersLost'
+
+
+@retry_api_call()
+def _fetch_report_page(analytics, **params):
+    return analytics.reports().query(**params).execute()
+
+def _query_all_rows(analytics, **params):
+    """Pages through a report using startIndex until a short page is returned."""
+    rows = []
+    start_index = 1
+    while True:
+        response = _fetch_report_page(analytics, startIndex=start_index, maxResults=PAGE_SIZE, **params)
+        page = response.get('rows', []) or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start_index += PAGE_SIZE
+
+def _ingest_window(channel, end_date):
+    """Returns the ingest-run row and the first date the next ingestion should cover."""
+    run = AnalyticsIngestRun.query.filter_by(channel_db_id=channel.id).first()
+    start_date = end_date - timedelta(days=BACKFILL_DAYS - 1)
+    if run and run.last_ingested_date:
+        resume_from = min(run.last_ingested_date - timedelta(days=REFRESH_WINDOW_DAYS - 1), end_date)
+        start_date = max(start_date, resume_from)
+    return run, start_date
+
+def ingest_channel_metrics(channel, credentials, end_date=None):
+    """
+    Pulls day/video metrics, day channel totals and day/traffic-source views
+    for one channel and replaces the affected date window in the warehouse tables.
+    Returns the number of fact rows written.
+    """
+    end_date = end_date or (date.today() - timedelta(days=1))
+    run, start_date = _ingest_window(channel, end_date)
+    start_str, end_str = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+
+    from googleapiclient.discovery import build
+    analytics = build('youtubeAnalytics', 'v2', credentials=credentials)
+    base_params = {'ids': 'channel==MINE', 'startDate': start_str, 'endDate': end_str}
+
+    video_rows = _query_all_rows(analytics, metrics=VIDEO_METRICS, dimensions='day,video', sort='day', **base_params)
+    channel_rows = _query_all_rows(analytics, metrics=VIDEO_METRICS, dimensions='day', sort='day', **base_params)
+
+    # CTR is not available for every channel/report combination; treat it as optional.
+    ctr_by_key = {}
+    try:
+        ctr_rows = _query_all_rows(analytics, metrics='impressionClickThroughRate', dimensions='day,video', sort='day', **base_params)
+        ctr_by_key = {(row[0], row[1]): row[2] for row in ctr_rows if len(row) >= 3}
+    except HttpError as e:
+        logger.info(f"Warehouse: CTR not available for channel {channel.id}: {e}")
+
+    traffic_rows = _query_all_rows(analytics, metrics='views', dimensions='day,insightTrafficSourceType', sort='day', **base_params)
+
+    video_mappings = []
+    for row in video_rows:
+        try:
+            day_str, video_id, views, minutes, gained, lost = row[:6]
+            video_mappings.append({
+                'channel_db_id': channel.id,
+                'video_id': video_id,
+                'date': datetime.strptime(day_str, '%Y-%m-%d').date(),
+                'views': int(views or 0),
+                'watch_minutes': int(minutes or 0),
+                'subscribers_gained': int(gained or 0),
+                'subscribers_lost': int(lost or 0),
+                'impressions_ctr': ctr_by_key.get((day_str, video_id)),
+            })
+        except (ValueError, TypeError):
+            logger.warning(f"Warehouse: skipping malformed video row for channel {channel.id}: {row}")
+
+    channel_mappings = []
+    for row in channel_rows:
+        try:
+            day_str, views, minutes, gained, lost = row[:5]
+            channel_mappings.append({
+                'channel_db_id': channel.id,
+                'date': datetime.strptime(day_str, '%Y-%m-%d').date(),
+                'views': int(views or 0),
+                'watch_minutes': int(minutes or 0),
+                'subscribers_gained': int(gained or 0),
+                'subscribers_lost': int(lost or 0),
+            })
+        except (ValueError, TypeError):
+            logger.warning(f"Warehouse: skipping malformed channel row for channel {channel.id}: {row}")
+
+    traffic_mappings = []
+    for row in traffic_rows:
+        try:
+            traffic_mappings.append({
+                'channel_db_id': channel.id,
+                'date': datetime.strptime(row[0], '%Y-%m-%d').date(),
+                'source_type': row[1],
+                'views': int(row[2] or 0),
+            })
+        except (ValueError, TypeError, IndexError):
+            logger.warning(f"Warehouse: skipping malformed traffic row for channel {channel.id}: {row}")
+
+    VideoDailyMetric.query.filter(
+        VideoDailyMetric.channel_db_id == channel.id,
+        VideoDailyMetric.date.between(start_date, end_date)
+    ).delete(synchronize_session=False)
+    ChannelDailyMetric.query.filter(
+        ChannelDailyMetric.channel_db_id == channel.id,
+        ChannelDailyMetric.date.between(start_date, end_date)
+    ).delete(synchronize_session=False)
+    ChannelTrafficDaily.query.filter(
+        ChannelTrafficDaily.channel_db_id == channel.id,
+        ChannelTrafficDaily.date.between(start_date, end_date)
+    ).delete(synchronize_session=False)
+
+    if video_mappings:
+        db.session.bulk_insert_mappings(VideoDailyMetric, video_mappings)
+    if channel_mappings:
+        db.session.bulk_insert_mappings(ChannelDailyMetric, channel_mappings)
+    if traffic_mappings:
+        db.session.bulk_insert_mappings(ChannelTrafficDaily, traffic_mappings)
+
+    if not run:
+        run = AnalyticsIngestRun(channel_db_id=channel.id)
+        db.session.add(run)
+    run.last_ingested_date = end_date
+    run.last_run_at = datetime.utcnow()
+    run.last_status = 'ok'
+    run.rows_written = len(video_mappings) + len(channel_mappings) + len(traffic_mappings)
+    db.session.commit()
+
+    logger.info(f"Warehouse: channel {channel.id} ingested {start_str}..{end_str} ({run.rows_written} rows)")
+    return run.rows_written
+
+def mark_ingest_failed(channel):
+    """Records a failed run without touching previously ingested data."""
+    run = AnalyticsIngestRun.query.filter_by(channel_db_id=channel.id).first()
+    if not run:
+        run = AnalyticsIngestRun(channel_db_id=channel.id)
+        db.session.add(run)
+    run.last_run_at = datetime.utcnow()
+    run.last_status = 'error'
+    db.session.commit()
+
+
+# --- Read helpers (local queries only, no API calls) ---
+
+def has_warehouse_data(channel_db_id, start_date=None, end_date=None):
+    """True if ingestion covers the whole of start_date..end_date for the channel (either may be open)."""
+    last_ingested = db.session.query(AnalyticsIngestRun.last_ingested_date).filter_by(channel_db_id=channel_db_id).scalar()
+    if not last_ingested or (end_date and last_ingested < end_date):
+        return False
+    if not start_date:
+        return True
+    first_day = db.session.query(func.min(ChannelDailyMetric.date)).filter(ChannelDailyMetric.channel_db_id == channel_db_id).scalar()
+    return first_day is not None and first_day <= start_date
+
+def get_channel_period_totals(channel_db_id, start_date, end_date):
+    """Summed views, watch hours and net subscribers for a channel over a period, or None if not ingested."""
+    if not has_warehouse_data(channel_db_id, start_date, end_date):
+        return None
+    views, minutes, gained, lost = db.session.query(
+        func.coalesce(func.sum(ChannelDailyMetric.views), 0),
+        func.coalesce(func.sum(ChannelDailyMetric.watch_minutes), 0),
+        func.coalesce(func.sum(ChannelDailyMetric.subscribers_gained), 0),
+        func.coalesce(func.sum(ChannelDailyMetric.subscribers_lost), 0),
+    ).filter(
+        ChannelDailyMetric.channel_db_id == channel_db_id,
+        ChannelDailyMetric.date.between(start_date, end_date)
+    ).one()
+    return {
+        'views': int(views),
+        'watch_hours': round(int(minutes) / 60, 1),
+        'net_subscribers': int(gained) - int(lost),
+    }
+
+def get_channel_daily_series(channel_db_id, start_date, end_date):
+    """Per-day views and net subscribers for charting, keyed by date."""
+    rows = db.session.query(
+        ChannelDailyMetric.date, ChannelDailyMetric.views,
+        ChannelDailyMetric.subscribers_gained - ChannelDailyMetric.subscribers_lost,
+    ).filter(
+        ChannelDailyMetric.channel_db_id == channel_db_id,
+        ChannelDailyMetric.date.between(start_date, end_date)
+    ).all()
+    return {day: {'views': int(views or 0), 'net_subscribers': int(subs or 0)} for day, views, subs in rows}
+
+def get_top_videos_by_views(channel_db_id, start_date, end_date, limit=5):
+    """Returns [(video_id, views_in_period), ...] ordered by views in the period."""
+    views_sum = func.sum(VideoDailyMetric.views)
+    rows = db.session.query(VideoDailyMetric.video_id, views_sum).filter(
+        VideoDailyMetric.channel_db_id == channel_db_id,
+        VideoDailyMetric.date.between(start_date, end_date)
+    ).group_by(VideoDailyMetric.video_id).order_by(views_sum.desc()).limit(limit).all()
+    return [(video_id, int(views or 0)) for video_id, views in rows]
+
+def get_video_ctr(channel_db_id, video_id, start_date, end_date):
+    """View-weighted CTR for a video over a period, or None if the warehouse has no CTR rows for it."""
+    rows = VideoDailyMetric.query.filter(
+        VideoDailyMetric.channel_db_id == channel_db_id,
+        VideoDailyMetric.video_id == video_id,
+        VideoDailyMetric.date.between(start_date, end_date),
+        VideoDailyMetric.impressions_ctr.isnot(None)
+    ).all()
+    if not rows:
+        return None
+    total_views = sum(r.views for r in rows)
+    if total_views <= 0:
+        return round(sum(r.impressions_ctr for r in rows) / len(rows), 2)
+    return round(sum(r.impressions_ctr * r.views for r in rows) / total_views, 2)
+
+def get_traffic_breakdown(channel_db_id, start_date, end_date):
+    """Channel views per traffic source type over a period, largest first."""
+    views_sum = func.sum(ChannelTrafficDaily.views)
+    rows = db.session.query(ChannelTrafficDaily.source_type, views_sum).filter(
+        ChannelTrafficDaily.channel_db_id == channel_db_id,
+        ChannelTrafficDaily.date.between(start_date, end_date)
+    ).group_by(ChannelTrafficDaily.source_type).order_by(views_sum.desc()).all()
+    return [(source, int(views or 0)) for source, views in rows]
@@ -0,0 +1,259 @@
+# tubealgo/services/bulk_export.py
+"""
+Bulk export of every tracked competitor into one zip archive.
+
+The export_competitors Celery task walks the user's competitor list and, per
+channel, streams its videos (iter_channel_videos, page-cached) into a CSV or
+XLSX entry of a zip written on disk. The same rows go into a combined
+all_videos.csv (spooled to a temp file so memory stays flat), and a
+channels.csv summary comes from the cached analyze_channel results.
+
+Progress lives in Redis (bulk-export-job:<user_id>) for the competitors page
+to poll. When done, the user gets a Telegram message. Unless
+BULK_EXPORT_SHARED_DIR says the web process sees the worker's BULK_EXPORT_DIR,
+the archive is also handed over through Redis as a list of chunks, written in
+one transaction with its TTL so a failed push never leaves data behind. Redis
+is the Celery broker too, so this is capped at HANDOFF_MAX_BYTES. An archive that can't be handed over fails the job with a
+message saying why, instead of finishing as 'done' with nothing to download.
+"""
+
+import os
+import csv
+import glob
+import json
+import uuid
+import zipfile
+import logging
+import tempfile
+from datetime import datetime
+from flask import current_app
+from redis.exceptions import RedisError
+from .channel_fetcher import analyze_channel
+from .video_fetcher import iter_channel_videos
+from .export_stream import stream_csv, stream_xlsx, write_to_file
+from .redis_client import get_redis, mark_redis_failure
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+VIDEO_COLUMNS = ['title', 'video_url', 'upload_date', 'view_count', 'like_count', 'comment_count', 'duration_seconds', 'is_short']
+CHANNEL_COLUMNS = ['Title', 'id', 'Subscribers', 'Total Views', 'Video Count']
+JOB_STATUS_SECONDS = 6 * 3600
+HANDOFF_SECONDS = 3600
+# Redis is also the Celery broker and is persisted (appendonly) to a small disk,
+# so only small archives go through it; larger ones need BULK_EXPORT_SHARED_DIR.
+HANDOFF_MAX_BYTES = 4 * 1024 * 1024
+HANDOFF_CHUNK_BYTES = 512 * 1024
+
+
+def _status_key(user_id):
+    return f"bulk-export-job:{user_id}"
+
+def _handoff_key(user_id, job_id):
+    return f"bulk-export-zip:{user_id}:{job_id}"
+
+def archive_path(user_id, job_id):
+    return os.path.join(current_app.config['BULK_EXPORT_DIR'], f"competitors_{user_id}_{job_id}.zip")
+
+def archive_filename():
+    return f"TubeAlgo_Competitors_{datetime.utcnow().strftime('%Y_%m_%d')}.zip"
+
+
+# --- Job status ---
+
+def get_export_status(user_id):
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(_status_key(user_id))
+    except RedisError as e:
+        mark_redis_failure(e)
+        return None
+    return json.loads(raw) if raw else None
+
+def set_export_status(user_id, job_id, state, done=0, total=0, error=None):
+    client = get_redis()
+    if client is None:
+        return
+    status = {'job_id': job_id, 'state': state, 'done': done, 'total': total, 'error': error}
+    try:
+        client.set(_status_key(user_id), json.dumps(status), ex=JOB_STATUS_SECONDS)
+    except RedisError as e:
+        mark_redis_failure(e)
+
+def queue_export(user_id, fmt):
+    """Queues an export unless one is already running. Returns the status, or {'error': ...}."""
+    if fmt not in EXPORT_FORMATS:
+        return {'error': 'Unsupported export format.'}
+    current = get_export_status(user_id)
+    if current and current.get('state') in ('queued', 'running'):
+        return current
+    if get_redis() is None:
+        return {'error': 'Exports are temporarily unavailable. Please try again in a few minutes.'}
+
+    job_id = uuid.uuid4().hex[:12]
+    set_export_status(user_id, job_id, 'queued')
+    from ..jobs import export_competitors
+    export_competitors.delay(user_id, job_id, fmt)
+    return get_export_status(user_id) or {'job_id': job_id, 'state': 'queued', 'done': 0, 'total': 0, 'error': None}
+
+
+# --- Building the archive ---
+
+def _video_row(channel_title, video):
+    upload_date = video.get('upload_date') or ''
+    row = {
+        'title': video.get('title', ''),
+        'video_url': f"https://www.youtube.com/watch?v={video.get('id', '')}",
+        'upload_date': upload_date.replace('T', ' ').replace('Z', '')[:16],
+    }
+    for column in VIDEO_COLUMNS[3:]:
+        row[column] = video.get(column, '')
+    return [channel_title] + [row[column] for column in VIDEO_COLUMNS]
+
+def _entry_name(competitor, used):
+    from ..routes.utils import sanitize_filename
+    base = sanitize_filename(competitor.channel_title or competitor.channel_id_youtube) or competitor.channel_id_youtube
+    name, n = base, 2
+    while name in used:
+        name, n = f"{base}_{n}", n + 1
+    used.add(name)
+    return name
+
+def build_competitor_archive(user, job_id, competitors, fmt):
+    """
+    Writes the zip for `competitors` to archive_path(user.id, job_id) and returns the path,
+    or None if it was built but can't be handed over to the web process (job set to 'error').
+    Progress is reported after each channel; the user's older archives are removed.
+    """
+    final_path = archive_path(user.id, job_id)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    tmp_path = f"{final_path}.{os.getpid()}.tmp"
+    headers = [column.replace('_', ' ').title() for column in VIDEO_COLUMNS]
+    total = len(competitors)
+    set_export_status(user.id, job_id, 'running', 0, total)
+
+    used_names = set()
+    channel_rows = []
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf, \
+            tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as combined:
+        combined_writer = csv.writer(combined)
+        combined_writer.writerow(['Channel'] + headers)
+
+        for done, competitor in enumerate(competitors, start=1):
+            title = competitor.channel_title or competitor.channel_id_youtube
+
+            def rows():
+                for video in iter_channel_videos(competitor.channel_id_youtube):
+                    row = _video_row(title, video)
+                    combined_writer.writerow(row)
+                    yield row[1:]
+
+            name = _entry_name(competitor, used_names)
+            if fmt == 'xlsx':
+                with zf.open(f"channels/{name}.xlsx", 'w') as entry:
+                    write_to_file(stream_xlsx(headers, rows(), sheet_title=title), entry)
+            else:
+                with zf.open(f"channels/{name}.csv", 'w') as entry:
+                    write_to_file(stream_csv(headers, rows()), entry)
+
+            stats = analyze_channel(competitor.channel_id_youtube)
+            if 'error' not in stats:
+                channel_rows.append([stats.get(column, '') for column in CHANNEL_COLUMNS])
+            else:
+                channel_rows.append([title, competitor.channel_id_youtube, '', '', ''])
+            set_export_status(user.id, job_id, 'running', done, total)
+
+        with zf.open('channels.csv', 'w') as entry:
+            write_to_file(stream_csv(['Channel', 'Channel ID', 'Subscribers', 'Total Views', 'Video Count'], channel_rows), entry)
+        combined.seek(0)
+        with zf.open('all_videos.csv', 'w') as entry:
+            entry.write('\ufeff'.encode('utf-8'))
+            for chunk in iter(lambda: combined.read(64 * 1024), ''):
+                entry.write(chunk.encode('utf-8'))
+
+    os.replace(tmp_path, final_path)
+    _remove_old_archives(user.id, keep=final_path)
+    error = _hand_off(user.id, job_id, final_path)
+    if error:
+        set_export_status(user.id, job_id, 'error', error=error)
+        return None
+    set_export_status(user.id, job_id, 'done', total, total)
+    return final_path
+
+def _remove_old_archives(user_id, keep):
+    pattern = os.path.join(current_app.config['BULK_EXPORT_DIR'], f"competitors_{user_id}_*.zip")
+    for path in glob.glob(pattern):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def _hand_off(user_id, job_id, path):
+    """Makes the archive reachable from the web process. Returns None, or an error message for the user."""
+    if current_app.config.get('BULK_EXPORT_SHARED_DIR'):
+        return None
+    size = os.path.getsize(path)
+    if size > HANDOFF_MAX_BYTES:
+        return (f"The export is {size / (1024 * 1024):.0f} MB, more than the {HANDOFF_MAX_BYTES // (1024 * 1024)} MB "
+                "that can be delivered. Please export in CSV format or track fewer competitors and try again.")
+    # Read the archive before touching Redis; the transaction below then either
+    # stores the complete list with its TTL or nothing at all.
+    with open(path, 'rb') as f:
+        chunks = list(iter(lambda: f.read(HANDOFF_CHUNK_BYTES), b''))
+    client = get_redis()
+    if client is None:
+        return 'The export could not be delivered. Please try again later.'
+    key = _handoff_key(user_id, job_id)
+    partial_key = f"{key}:partial"
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(partial_key)
+        pipe.rpush(partial_key, *chunks)
+        pipe.expire(partial_key, HANDOFF_SECONDS)
+        # Readers only ever see a complete list
+        pipe.rename(partial_key, key)
+        pipe.execute()
+    except RedisError as e:
+        mark_redis_failure(e)
+        return 'The export could not be delivered. Please try again later.'
+    return None
+
+def _read_handoff(client, key, tmp_path):
+    """Writes the handed-off chunks to tmp_path. False if there is no complete handoff."""
+    chunk_count = client.llen(key)
+    if not chunk_count:
+        return False
+    with open(tmp_path, 'wb') as f:
+        for index in range(chunk_count):
+            chunk = client.lindex(key, index)
+            if chunk is None:
+                # Expired while we were reading
+                return False
+            f.write(chunk)
+    return True
+
+def find_archive(user_id, job_id):
+    """Path of a finished archive on this machine (pulling a Redis handoff if needed), or None."""
+    path = archive_path(user_id, job_id)
+    if os.path.exists(path):
+        return path
+    client = get_redis()
+    if client is None:
+        return None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        complete = _read_handoff(client, _handoff_key(user_id, job_id), tmp_path)
+    except RedisError as e:
+        mark_redis_failure(e)
+        complete = False
+    if not complete:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, path)
+    _remove_old_archives(user_id, keep=path)
+    return path
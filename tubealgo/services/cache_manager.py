@@ -42,3 +42,11 @@ def set_to_cache(key, value, expire_hours=4):
     db.session.commit()
     print(f"CACHE SET for key: {key}")
 
+def delete_cache_prefix(prefix):
+    """
+    Drops every cache entry whose key starts with the prefix.
+    """
+    deleted = ApiCache.query.filter(ApiCache.cache_key.startswith(prefix, autoescape=True)).delete(synchronize_session=False)
+    db.session.commit()
+    print(f"CACHE DELETE {deleted} entries for prefix: {prefix}")
+
@@ -7,40 +7,29 @@ from datetime import datetime
 import pytz
 from .youtube_core import get_youtube_service
 from .cache_manager import get_from_cache, set_to_cache
+from .similarity_index import index_channel
+from .keyword_index import record_tagged_videos
+from .channel_resolver import parse_channel_input, lookup_channel_id, resolve_channel_id, remember_alias, forget_channel
+from .fetcher_utils import _create_video_objects
 from .video_fetcher import get_latest_videos, get_all_channel_videos # Note the import change
-from .discovery_fetcher import get_youtube_categories # Note the import change
+from .discovery_fetcher import get_category_name # Note the import change
 
 def analyze_channel(channel_input):
+    # Known IDs and previously resolved handles/URLs/queries are answered from
+    # the cache without building a YouTube client (which itself costs a call).
+    kind, value = parse_channel_input(channel_input)
+    channel_id = lookup_channel_id(kind, value)
+    if channel_id:
+        cached_data = get_from_cache(f"channel_analysis_v6:{channel_id}")
+        if cached_data:
+            return cached_data
+
     youtube, error = get_youtube_service()
     if error: return {'error': error}
 
-    channel_id = None
-    
     try:
-        patterns = [
-            r'(UC[a-zA-Z0-9_-]{22})', 
-            r'/@([a-zA-Z0-9_.-]+)', 
-            r'/channel/(UC[a-zA-Z0-9_-]{22})'
-        ]
-        
-        found_id = None
-        for pattern in patterns:
-            match = re.search(pattern, channel_input)
-            if match:
-                found_id = match.group(1)
-                break
-        
-        if found_id and found_id.startswith('UC'):
-            channel_id = found_id
-        elif found_id: 
-            search_response = youtube.search().list(q=found_id, part='snippet', type='channel', maxResults=1).execute()
-            if search_response.get('items'):
-                channel_id = search_response['items'][0]['id']['channelId']
-        else: 
-            search_response = youtube.search().list(q=channel_input, part='snippet', type='channel', maxResults=1).execute()
-            if search_response.get('items'):
-                channel_id = search_response['items'][0]['id']['channelId']
-
+        if not channel_id:
+            channel_id = resolve_channel_id(youtube, kind, value)
         if not channel_id:
             return {'error': f"No channel found for '{channel_input}'."}
         
@@ -52,11 +41,17 @@ def analyze_channel(channel_input):
         
         final_response = youtube.channels().list(part="snippet,statistics,brandingSettings", id=channel_id).execute()
         if not final_response.get('items'):
+            forget_channel(channel_id)
             return {'error': f"Could not fetch data for channel ID '{channel_id}'."}
         
         channel = final_response['items'][0]
         stats, snippet, branding = channel.get('statistics', {}), channel.get('snippet', {}), channel.get('brandingSettings', {})
         
+        # The channel's own handle comes for free here; remember it for later lookups
+        custom_url = snippet.get('customUrl') or ''
+        if custom_url.startswith('@'):
+            remember_alias('handle', custom_url[1:].lower(), channel_id)
+
         keywords_str = branding.get('channel', {}).get('keywords', '')
         keywords_list = [tag.strip() for tag in re.split(r'[\s,]+', keywords_str) if tag.strip()]
 
@@ -69,6 +64,8 @@ def analyze_channel(channel_input):
             'keywords': keywords_list
         }
         set_to_cache(cache_key, result, expire_hours=24)
+        index_channel(channel_id, title=result['Title'], thumbnail=snippet.get('thumbnails', {}).get('default', {}).get('url'),
+                      subscribers=result['Subscribers'], description=result['Description'], keywords=keywords_str)
         return result
 
     except Exception as e:
@@ -116,15 +113,19 @@ def get_most_used_tags(channel_id, video_limit=50):
     if error: return []
 
     all_tags = []
+    tagged_videos = []
     try:
         for i in range(0, len(video_ids), 50):
             batch_ids = video_ids[i:i+50]
-            videos_response = youtube.videos().list(part="snippet", id=",".join(batch_ids)).execute()
+            videos_response = youtube.videos().list(part="snippet,statistics", id=",".join(batch_ids)).execute()
             for item in videos_response.get('items', []):
                 if 'tags' in item['snippet']:
                     all_tags.extend(item['snippet']['tags'])
+                    tagged_videos.append((item['snippet']['tags'], int(item.get('statistics', {}).get('viewCount', 0))))
         
         if not all_tags: return []
+        index_channel(channel_id, tags=all_tags)
+        record_tagged_videos(tagged_videos)
         tag_counts = Counter(all_tags)
         most_common_tags = tag_counts.most_common(20)
         set_to_cache(cache_key, most_common_tags, expire_hours=24)
@@ -163,27 +164,40 @@ def get_upload_schedule_analysis(channel_id):
     set_to_cache(cache_key, result, expire_hours=24)
     return result
 
-def get_channel_main_category(channel_id):
+def _main_category_id(videos):
+    """Category with the most views across `videos` (each video counts at least once)."""
+    weights = Counter()
+    for video in videos:
+        if video and video.get('category_id'):
+            weights[video['category_id']] += max(video.get('view_count', 0), 0) + 1
+    return weights.most_common(1)[0][0] if weights else None
+
+def get_channel_main_category(channel_id, videos=None):
+    """
+    The channel's main category, weighted by views. Pass the videos you already
+    fetched (e.g. in the competitor package) to skip the search.list lookup.
+    """
     cache_key = f"channel_category_v3:{channel_id}"
     cached_data = get_from_cache(cache_key)
     if cached_data: return cached_data
-    youtube, error = get_youtube_service()
-    if error: return "N/A"
-    try:
-        search_response = youtube.search().list(part="snippet", channelId=channel_id, order="viewCount", type="video", maxResults=50).execute()
-        video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
-        if not video_ids: return "N/A"
-        
-        videos_response = youtube.videos().list(part="snippet", id=",".join(video_ids)).execute()
-        category_ids = [item['snippet']['categoryId'] for item in videos_response.get('items', []) if 'categoryId' in item['snippet']]
-        if not category_ids: return "N/A"
-        
-        most_common_id = Counter(category_ids).most_common(1)[0][0]
-        
-        all_categories = get_youtube_categories()
-        category_name = next((cat['snippet']['title'] for cat in all_categories if cat['id'] == most_common_id), "N/A")
-        
+
+    # Video lists cached before category_id was kept fall through to the API lookup
+    category_id = _main_category_id(videos or [])
+    if category_id is None:
+        youtube, error = get_youtube_service()
+        if error: return "N/A"
+        try:
+            search_response = youtube.search().list(part="snippet", channelId=channel_id, order="viewCount", type="video", maxResults=50).execute()
+            video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
+            if not video_ids: return "N/A"
+
+            videos_response = youtube.videos().list(part="snippet,statistics", id=",".join(video_ids)).execute()
+            category_id = _main_category_id(_create_video_objects(videos_response.get('items', [])))
+        except Exception as e:
+            return "N/A"
+    if category_id is None: return "N/A"
+
+    category_name = get_category_name(category_id)
+    if category_name != "N/A":
         set_to_cache(cache_key, category_name, expire_hours=24)
-        return category_name
-    except Exception as e:
-        return "N/A"
\ No newline at end of file
+    return category_name
\ No newline at end of file
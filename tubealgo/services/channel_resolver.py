@@ -0,0 +1,123 @@
+# tubealgo/services/channel_resolver.py
+"""
+Turns whatever the user typed (channel ID, @handle, channel URL or plain
+search text) into a channel ID, as cheaply as possible.
+
+Resolved inputs are stored in the ChannelAlias table, so a repeat lookup
+needs no API call and no YouTube client at all. On a miss, handles use
+channels.list(forHandle=...) and legacy /user/ URLs use forUsername, both
+1 quota unit. Only /c/ custom URLs that aren't also handles and free text
+fall back to search.list (100 units).
+
+Aliases are re-resolved after ALIAS_MAX_AGE_DAYS, because handles can be
+given up and claimed again and search results drift.
+"""
+
+import re
+import logging
+from datetime import datetime, timedelta
+from urllib.parse import unquote
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .. import db
+from ..models import ChannelAlias
+
+logger = logging.getLogger(__name__)
+
+ALIAS_MAX_AGE_DAYS = {'handle': 90, 'username': 90, 'custom': 90, 'query': 30}
+
+CHANNEL_ID_RE = re.compile(r'(UC[a-zA-Z0-9_-]{22})')
+HANDLE_RE = re.compile(r'(?:^|/)@([^/?#\s]+)')
+CUSTOM_URL_RE = re.compile(r'/c/([^/?#\s]+)')
+USERNAME_RE = re.compile(r'/user/([^/?#\s]+)')
+
+
+def parse_channel_input(channel_input):
+    """
+    Returns (kind, value): kind is 'id', 'handle', 'custom', 'username' or 'query'.
+    Handles and names are lowercased (YouTube treats them case-insensitively)
+    and queries are whitespace-normalized, so equivalent inputs share one alias.
+    """
+    text = (channel_input or '').strip()
+
+    match = CHANNEL_ID_RE.search(text)
+    if match:
+        return 'id', match.group(1)
+    for kind, pattern in (('handle', HANDLE_RE), ('custom', CUSTOM_URL_RE), ('username', USERNAME_RE)):
+        match = pattern.search(text)
+        if match:
+            return kind, unquote(match.group(1)).lower()
+    return 'query', ' '.join(text.lower().split())
+
+def _alias_key(kind, value):
+    return f"{kind}:{value}"[:255]
+
+
+def lookup_channel_id(kind, value):
+    """Channel ID stored for this input, or None if unknown or due for re-resolution."""
+    if kind == 'id':
+        return value
+    if not value:
+        return None
+    alias = ChannelAlias.query.filter_by(alias=_alias_key(kind, value)).first()
+    if not alias:
+        return None
+    if alias.resolved_at < datetime.utcnow() - timedelta(days=ALIAS_MAX_AGE_DAYS[kind]):
+        return None
+    return alias.channel_id_youtube
+
+# Aliases are written in their own session: resolving happens in the middle of
+# callers' work, whose pending db.session changes must not be committed here.
+
+def remember_alias(kind, value, channel_id):
+    if kind == 'id' or not value or not channel_id:
+        return
+    key = _alias_key(kind, value)
+    try:
+        with Session(db.engine) as session, session.begin():
+            alias = session.query(ChannelAlias).filter_by(alias=key).first()
+            if alias:
+                alias.channel_id_youtube = channel_id
+                alias.resolved_at = datetime.utcnow()
+            else:
+                session.add(ChannelAlias(alias=key, channel_id_youtube=channel_id))
+    except IntegrityError:
+        # Another worker resolved the same input at the same moment
+        pass
+
+def forget_channel(channel_id):
+    """Drops every alias pointing at a channel that no longer exists."""
+    with Session(db.engine) as session, session.begin():
+        session.query(ChannelAlias).filter_by(channel_id_youtube=channel_id).delete()
+
+
+def _channels_lookup(youtube, **params):
+    response = youtube.channels().list(part='id', maxResults=1, **params).execute()
+    items = response.get('items') or []
+    return items[0]['id'] if items else None
+
+def _search_lookup(youtube, query):
+    response = youtube.search().list(q=query, part='snippet', type='channel', maxResults=1).execute()
+    items = response.get('items') or []
+    return items[0]['id']['channelId'] if items else None
+
+def resolve_channel_id(youtube, kind, value):
+    """Resolves an input with the cheapest API call that works and stores the result."""
+    if kind == 'id':
+        return value
+    if not value:
+        return None
+
+    channel_id = None
+    if kind in ('handle', 'custom'):
+        # Most legacy /c/ names were carried over as handles
+        channel_id = _channels_lookup(youtube, forHandle=value)
+    elif kind == 'username':
+        channel_id = _channels_lookup(youtube, forUsername=value)
+
+    if not channel_id:
+        logger.info(f"Resolving '{value}' ({kind}) through search.list")
+        channel_id = _search_lookup(youtube, value)
+
+    remember_alias(kind, value, channel_id)
+    return channel_id
@@ -0,0 +1,336 @@
+# tubealgo/services/dashboard_service.py
+"""
+Dashboard widget builders.
+
+Every dashboard card is built by its own function and cached in its own
+DashboardCache section row, so the frontend can request cards independently
+and a slow card (e.g. competitor videos) never holds up a fast one (e.g.
+KPIs). The combined payload is assembled by running the independent builders
+concurrently.
+
+Sections are invalidated by domain events (new snapshot, competitor change,
+goal change) rather than all at once; only the affected sections and the
+sections derived from them are marked stale and recomputed.
+"""
+
+import json
+import logging
+import concurrent.futures
+from datetime import date, timedelta, datetime, timezone
+from flask import current_app
+from .. import db
+from ..models import User, ChannelSnapshot, Goal, DashboardCache, Competitor
+from .channel_fetcher import analyze_channel, get_upload_schedule_analysis
+from .video_fetcher import get_latest_videos
+from .youtube_manager import get_user_videos
+from .suggestion_service import analyze_best_time_to_post
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LAYOUT = {
+    'left': ['kpis', 'growth_chart', 'top_videos'],
+    'right': ['goal', 'best_time', 'ai_assistant']
+}
+
+# Widget name -> cache lifetime in hours.
+WIDGET_TTL_HOURS = {
+    'kpis': 1,
+    'growth_chart': 4,
+    'top_recent_videos': 4,
+    'goal': 1,
+    'best_time_to_post': 12,
+    'ai_assistant': 4,
+}
+
+# Widgets that are derived from other widgets. Everything else is independent.
+WIDGET_DEPENDENCIES = {
+    'goal': ('kpis',),
+    'ai_assistant': ('top_recent_videos',),
+}
+
+# Domain event -> sections whose source data it changes.
+EVENT_SECTIONS = {
+    'channel_stats': ('kpis', 'growth_chart'),
+    'competitors': ('top_recent_videos', 'best_time_to_post'),
+    'goals': ('goal',),
+}
+
+DASHBOARD_WORKERS = 4
+
+
+def _competitor_rows(user):
+    # The user's first five competitors, in the order they arranged them.
+    competitors = user.competitors.order_by(Competitor.position.asc()).limit(5).all()
+    return [(c.channel_id_youtube, c.channel_title) for c in competitors]
+
+
+# --- Builders ---
+
+def build_kpis(user, deps):
+    channel_data = analyze_channel(user.channel.channel_id_youtube)
+    if 'error' in channel_data:
+        raise Exception(channel_data['error'])
+    return {
+        'subscribers': channel_data.get('Subscribers', 0),
+        'views': channel_data.get('Total Views', 0),
+        'videos': channel_data.get('Video Count', 0),
+    }
+
+def build_growth_chart(user, deps):
+    channel_id = user.channel.id
+    start_date = date.today() - timedelta(days=29)
+    snapshots = ChannelSnapshot.query.filter(ChannelSnapshot.channel_db_id == channel_id, ChannelSnapshot.date >= start_date).order_by(ChannelSnapshot.date.asc()).all()
+    labels = [(start_date + timedelta(days=i)).strftime('%d %b') for i in range(30)]
+    sub_data, view_data, last_subs, last_views = [], [], 0, 0
+    first_snapshot = ChannelSnapshot.query.filter(ChannelSnapshot.channel_db_id == channel_id, ChannelSnapshot.date < start_date).order_by(ChannelSnapshot.date.desc()).first()
+    if first_snapshot:
+        last_subs, last_views = first_snapshot.subscribers, first_snapshot.views
+    elif snapshots:
+        last_subs, last_views = snapshots[0].subscribers, snapshots[0].views
+    snapshot_dict = {s.date: s for s in snapshots}
+    for i in range(30):
+        current_date = start_date + timedelta(days=i)
+        if current_date in snapshot_dict:
+            last_subs, last_views = snapshot_dict[current_date].subscribers, snapshot_dict[current_date].views
+        sub_data.append(last_subs)
+        view_data.append(last_views)
+    return {'labels': labels, 'subscribers': sub_data, 'views': view_data}
+
+def build_top_recent_videos(user, deps):
+    competitors = _competitor_rows(user)
+    if not competitors:
+        return []
+
+    thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
+    all_recent_competitor_videos = []
+    for channel_id_youtube, channel_title in competitors:
+        comp_videos_data = get_latest_videos(channel_id_youtube, max_results=20)
+        if comp_videos_data and 'videos' in comp_videos_data:
+            for video in comp_videos_data['videos']:
+                upload_date = datetime.fromisoformat(video['upload_date'].replace('Z', '+00:00'))
+                if upload_date > thirty_days_ago:
+                    video['channel_title'] = channel_title
+                    all_recent_competitor_videos.append(video)
+
+    return sorted(all_recent_competitor_videos, key=lambda x: x.get('view_count', 0), reverse=True)[:4]
+
+def build_goal(user, deps):
+    active_goal = Goal.query.filter_by(user_id=user.id, is_active=True).first()
+    if not active_goal:
+        return None
+
+    kpis = deps.get('kpis') or {}
+    current_value = 0
+    if active_goal.goal_type == 'subscribers':
+        current_value = kpis.get('subscribers', 0)
+    elif active_goal.goal_type == 'views':
+        current_value = kpis.get('views', 0)
+    elif active_goal.goal_type == 'videos_uploaded':
+        from ..routes.utils import get_credentials
+        creds = get_credentials(user)
+        if creds:
+            user_videos = get_user_videos(user, creds)
+            if isinstance(user_videos, list):
+                goal_start_time = active_goal.created_at.replace(tzinfo=timezone.utc)
+                videos_in_period = [
+                    v for v in user_videos
+                    if datetime.fromisoformat(v['published_at'].replace('Z', '+00:00')) >= goal_start_time
+                ]
+                current_value = len(videos_in_period)
+
+    progress_percentage = 0
+    if active_goal.target_value > active_goal.start_value:
+        progress_percentage = ((current_value - active_goal.start_value) / (active_goal.target_value - active_goal.start_value)) * 100
+
+    return {
+        'goal_type': active_goal.goal_type,
+        'target_value': active_goal.target_value,
+        'current_value': current_value,
+        'target_date': active_goal.target_date.isoformat() if active_goal.target_date else None,
+        'progress_percentage': min(100, max(0, progress_percentage)),
+        'projection_text': "🚀 Keep up the great work!"
+    }
+
+def build_best_time_to_post(user, deps):
+    competitors = _competitor_rows(user)
+    if not competitors:
+        return None
+
+    aggregated_by_day = [0] * 7
+    aggregated_by_hour = [0] * 24
+    for channel_id_youtube, _ in competitors:
+        schedule = get_upload_schedule_analysis(channel_id_youtube)
+        if schedule:
+            aggregated_by_day = [a + b for a, b in zip(aggregated_by_day, schedule.get('by_day', [0]*7))]
+            aggregated_by_hour = [a + b for a, b in zip(aggregated_by_hour, schedule.get('by_hour', [0]*24))]
+
+    return analyze_best_time_to_post({'by_day': aggregated_by_day, 'by_hour': aggregated_by_hour})
+
+def build_ai_assistant(user, deps):
+    suggestions = []
+    top_recent_videos = deps.get('top_recent_videos') or []
+    if top_recent_videos:
+        top_topic_title = top_recent_videos[0]['title']
+        suggestions.append({
+            "type": "topic",
+            "title": "Popular Topic",
+            "text": f"Your competitors are finding success with recent videos like '{top_topic_title[:50]}...'. Consider making a video on a similar topic."
+        })
+
+    suggestions.append({
+        "type": "consistency",
+        "title": "Consistency Tip",
+        "text": "Uploading a new video every week can boost your channel's momentum. Plan your next upload now!"
+    })
+    return suggestions
+
+def get_layout(user):
+    """The user's saved card layout, or the default one. Read straight from the user row, never cached."""
+    try:
+        layout = json.loads(user.dashboard_layout) if user.dashboard_layout else None
+    except (json.JSONDecodeError, TypeError):
+        layout = None
+
+    if not layout or not isinstance(layout, dict) or 'left' not in layout or 'right' not in layout:
+        layout = DEFAULT_LAYOUT
+    return layout
+
+WIDGET_BUILDERS = {
+    'kpis': build_kpis,
+    'growth_chart': build_growth_chart,
+    'top_recent_videos': build_top_recent_videos,
+    'goal': build_goal,
+    'best_time_to_post': build_best_time_to_post,
+    'ai_assistant': build_ai_assistant,
+}
+
+
+# --- Section cache ---
+
+def _get_section(user_id, name):
+    return DashboardCache.query.filter_by(user_id=user_id, section=name).first()
+
+def _is_fresh(entry, name):
+    if not entry or entry.is_stale:
+        return False
+    return (datetime.utcnow() - entry.updated_at).total_seconds() < WIDGET_TTL_HOURS[name] * 3600
+
+def _save_section(user_id, name, data):
+    try:
+        entry = _get_section(user_id, name)
+        if not entry:
+            entry = DashboardCache(user_id=user_id, section=name)
+            db.session.add(entry)
+        entry.data = data
+        entry.is_stale = False
+        entry.updated_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        # Two requests building the same section at once; the other one's copy is just as good.
+        db.session.rollback()
+        logger.warning(f"Dashboard: could not cache section '{name}' for user {user_id}: {e}")
+
+def get_cached_section(user_id, name):
+    """Last built data for a section regardless of staleness, or None. Used as a fallback when a rebuild fails."""
+    entry = _get_section(user_id, name)
+    return entry.data if entry else None
+
+def get_widget(user, name, deps=None, force_refresh=False):
+    """
+    Returns one widget's data from its section row, rebuilding it if it is missing,
+    stale or past its TTL. Dependencies not supplied in `deps` are resolved the same way.
+    """
+    if name not in WIDGET_BUILDERS:
+        raise KeyError(name)
+
+    if not force_refresh:
+        entry = _get_section(user.id, name)
+        if _is_fresh(entry, name):
+            return entry.data
+
+    deps = dict(deps or {})
+    for dep_name in WIDGET_DEPENDENCIES.get(name, ()):
+        if dep_name not in deps:
+            deps[dep_name] = get_widget(user, dep_name)
+
+    data = WIDGET_BUILDERS[name](user, deps)
+    _save_section(user.id, name, data)
+    return data
+
+def sections_affected_by(event):
+    """The sections touched by an event, plus every section derived from them."""
+    affected = set(EVENT_SECTIONS.get(event, ()))
+    changed = True
+    while changed:
+        changed = False
+        for name, dependencies in WIDGET_DEPENDENCIES.items():
+            if name not in affected and affected.intersection(dependencies):
+                affected.add(name)
+                changed = True
+    # Keep builder order so that dependencies are always rebuilt before their dependents.
+    return [name for name in WIDGET_BUILDERS if name in affected]
+
+def on_dashboard_event(user_id, event, recompute=True):
+    """
+    Marks the sections affected by a domain event as stale and, optionally, queues a
+    background rebuild of just those sections. Stale data is kept as a fallback.
+    """
+    sections = sections_affected_by(event)
+    if not sections:
+        return []
+
+    DashboardCache.query.filter(
+        DashboardCache.user_id == user_id,
+        DashboardCache.section.in_(sections)
+    ).update({DashboardCache.is_stale: True}, synchronize_session=False)
+    db.session.commit()
+
+    if recompute:
+        try:
+            from ..jobs import recompute_dashboard_sections
+            recompute_dashboard_sections.delay(user_id, sections)
+        except Exception as e:
+            # Stale sections are rebuilt on the next read anyway.
+            logger.warning(f"Dashboard: could not queue recompute for user {user_id}: {e}")
+    return sections
+
+def recompute_sections(user, sections):
+    """Rebuilds the given sections in dependency order."""
+    built = {}
+    for name in WIDGET_BUILDERS:
+        if name in sections:
+            built[name] = get_widget(user, name, deps=built, force_refresh=True)
+    return built
+
+def _get_widget_in_context(app, user_id, name, deps, force_refresh):
+    # Each worker thread gets its own app context and therefore its own DB session.
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        return get_widget(user, name, deps=deps, force_refresh=force_refresh)
+
+def assemble_dashboard(user, force_refresh=False):
+    """
+    Builds the full dashboard payload. Independent widgets are fetched concurrently,
+    then dependent widgets are built from those results. Raises on the first failed widget.
+    """
+    app = current_app._get_current_object()
+    independent = [name for name in WIDGET_BUILDERS if name not in WIDGET_DEPENDENCIES]
+    dependent = [name for name in WIDGET_BUILDERS if name in WIDGET_DEPENDENCIES]
+
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='DashboardWidget') as executor:
+        futures = {executor.submit(_get_widget_in_context, app, user.id, name, None, force_refresh): name for name in independent}
+        for future in concurrent.futures.as_completed(futures):
+            results[futures[future]] = future.result()
+
+        dep_futures = {
+            executor.submit(
+                _get_widget_in_context, app, user.id, name,
+                {d: results[d] for d in WIDGET_DEPENDENCIES[name]}, force_refresh
+            ): name for name in dependent
+        }
+        for future in concurrent.futures.as_completed(dep_futures):
+            results[dep_futures[future]] = future.result()
+
+    results['layout'] = get_layout(user)
+    return results
@@ -0,0 +1,70 @@
+# tubealgo/services/db_bulk.py
+"""
+Bulk UPDATE helpers.
+
+On PostgreSQL many rows are updated with a single statement:
+
+    UPDATE t SET col = v.col FROM (VALUES (...), (...)) AS v (id, col)
+    WHERE t.id = v.id
+
+Other databases (SQLite in development) fall back to one executemany UPDATE,
+which is still a single round of parameters rather than an ORM flush per row.
+"""
+
+from sqlalchemy import update, values, column, bindparam, and_
+from .. import db
+
+
+def bulk_update_from_values(table, key, columns, rows, condition=None):
+    """
+    Updates `table` from a list of row dicts in one statement.
+
+    key        -- name of the column matched against (e.g. 'id').
+    columns    -- names of the columns to set; every row must have them.
+    rows       -- [{key: ..., column: ..., ...}, ...]
+    condition  -- optional callable(table, source) returning an extra WHERE
+                  clause; `source` exposes the incoming values as `.c.<name>`.
+
+    Does not commit. Returns the number of rows matched.
+    """
+    if not rows:
+        return 0
+
+    names = [key] + list(columns)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        source = values(
+            *[column(name, table.c[name].type) for name in names], name='v'
+        ).data([tuple(row[name] for name in names) for row in rows])
+        clauses = [table.c[key] == source.c[key]]
+        if condition is not None:
+            clauses.append(condition(table, source))
+        stmt = update(table).where(and_(*clauses)).values(
+            **{name: source.c[name] for name in columns}
+        )
+        return db.session.execute(stmt).rowcount
+
+    # Bind names must differ from column names in an executemany UPDATE.
+    source = _BindSource(names)
+    clauses = [table.c[key] == source.c[key]]
+    if condition is not None:
+        clauses.append(condition(table, source))
+    stmt = update(table).where(and_(*clauses)).values(
+        **{name: source.c[name] for name in columns}
+    )
+    params = [{f"v_{name}": row[name] for name in names} for row in rows]
+    return db.session.execute(stmt, params).rowcount
+
+
+class _BindSource:
+    """Mimics `values(...).c` with bind parameters for the executemany fallback."""
+
+    def __init__(self, names):
+        self.c = _Columns({name: bindparam(f"v_{name}") for name in names})
+
+
+class _Columns(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
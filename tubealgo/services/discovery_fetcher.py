@@ -1,10 +1,13 @@
 # tubealgo/services/discovery_fetcher.py
 
+import time
 import logging
+import threading
 from collections import Counter
 from .youtube_core import get_youtube_service
 from .cache_manager import get_from_cache, set_to_cache
-from .video_fetcher import get_most_viewed_videos, get_video_details # Note the import change
+from .video_fetcher import get_latest_videos, get_most_viewed_videos, get_video_details # Note the import change
+from .similarity_index import index_channels, find_similar, profile_sources
 
 def get_youtube_categories(region_code="IN"):
     cache_key = f"youtube_categories_v2:{region_code}"
@@ -20,7 +23,35 @@ def get_youtube_categories(region_code="IN"):
     except Exception as e:
         return []
 
-def get_top_channels_by_category(category_id, region_code="IN"):
+CATEGORY_NAMES_SECONDS = 3600
+_category_names = {}
+_category_names_lock = threading.Lock()
+
+def get_category_name(category_id, region_code="IN"):
+    """Title for a category ID, from an in-memory copy of get_youtube_categories()."""
+    entry = _category_names.get(region_code)
+    if entry is None or time.monotonic() > entry[0]:
+        with _category_names_lock:
+            entry = _category_names.get(region_code)
+            if entry is None or time.monotonic() > entry[0]:
+                names = {cat['id']: cat['snippet']['title'] for cat in get_youtube_categories(region_code)}
+                if not names:
+                    return "N/A"
+                entry = (time.monotonic() + CATEGORY_NAMES_SECONDS, names)
+                _category_names[region_code] = entry
+    return entry[1].get(category_id, "N/A")
+
+def get_top_channels_by_category(category_id, region_code="IN", view='top'):
+    """
+    Top (or fastest-growing) channels from the daily precomputed leaderboard.
+    The on-demand search below only runs for categories/regions the
+    leaderboard job hasn't covered yet.
+    """
+    from .leaderboard_service import get_leaderboard
+    leaderboard = get_leaderboard(category_id, region_code, view)
+    if leaderboard is not None or view != 'top':
+        return leaderboard or []
+
     cache_key = f"top_channels_v2:{category_id}:{region_code}"
     cached_data = get_from_cache(cache_key)
     if cached_data: return cached_data
@@ -30,7 +61,14 @@ def get_top_channels_by_category(category_id, region_code="IN"):
         video_search = youtube.search().list(part="snippet", type="video", videoCategoryId=category_id, regionCode=region_code, order="viewCount", maxResults=20).execute()
         channel_ids = list(set([item['snippet']['channelId'] for item in video_search.get('items', [])]))
         if not channel_ids: return []
-        channel_details = youtube.channels().list(part="snippet,statistics", id=",".join(channel_ids)).execute()
+        channel_details = youtube.channels().list(part="snippet,statistics,brandingSettings", id=",".join(channel_ids)).execute()
+        index_channels([
+            {'channel_id': item['id'], 'title': item['snippet']['title'], 'description': item['snippet'].get('description', ''),
+             'keywords': item.get('brandingSettings', {}).get('channel', {}).get('keywords', ''),
+             'thumbnail': item['snippet']['thumbnails']['default']['url'],
+             'subscribers': int(item.get('statistics', {}).get('subscriberCount', 0))}
+            for item in channel_details.get("items", [])
+        ])
         channels = [
             {'title': item['snippet']['title'], 'channel_id': item['id'],
              'thumbnail': item['snippet']['thumbnails']['default']['url'],
@@ -43,16 +81,42 @@ def get_top_channels_by_category(category_id, region_code="IN"):
     except Exception as e:
         return []
 
+MIN_INDEX_RESULTS = 3
+
 def find_similar_channels(channel_id):
+    """
+    Similar channels from the local index (no quota). The source channel's
+    tags and video titles are added to its profile first if missing, using the
+    same cached video lists as the competitor pages. Falls back to the old
+    tag-search lookup while the index knows too few related channels.
+    """
+    from .channel_fetcher import get_most_used_tags
+    if 'video_titles' not in profile_sources(channel_id):
+        latest = get_latest_videos(channel_id, max_results=50).get('videos', [])
+        index_channels([{'channel_id': channel_id, 'video_titles': [v['title'] for v in latest if v.get('title')]}])
+    if 'tags' not in profile_sources(channel_id):
+        # A fresh lookup stores the full tag list itself; a cached one only has the top 20
+        top_tags = get_most_used_tags(channel_id, video_limit=50)
+        if top_tags and 'tags' not in profile_sources(channel_id):
+            index_channels([{'channel_id': channel_id, 'tags': [tag for tag, count in top_tags for _ in range(count)]}])
+
+    index_results = find_similar(channel_id)
+    if len(index_results) >= MIN_INDEX_RESULTS:
+        return index_results
+
+    def with_index_results(channels):
+        seen = {c['channel_id'] for c in index_results}
+        return index_results + [c for c in channels if c['channel_id'] not in seen][:10 - len(index_results)]
+
     cache_key = f"similar_channels_v2:{channel_id}"
     cached_data = get_from_cache(cache_key)
-    if cached_data: return cached_data
+    if cached_data: return with_index_results(cached_data)
     youtube, error = get_youtube_service()
-    if error: return []
+    if error: return index_results
     try:
         most_viewed_data = get_most_viewed_videos(channel_id, max_results=5)
         most_viewed = most_viewed_data.get('videos', [])
-        if not most_viewed: return []
+        if not most_viewed: return index_results
         
         video_ids = [v['id'] for v in most_viewed]
         video_details_list = [get_video_details(vid) for vid in video_ids]
@@ -60,18 +124,24 @@ def find_similar_channels(channel_id):
         for detail in video_details_list:
             if detail and 'tags' in detail:
                 source_tags.update(detail['tags'])
-        if not source_tags: return []
+        if not source_tags: return index_results
         search_query = " ".join(list(source_tags)[:5])
         search_response = youtube.search().list(part="snippet", q=search_query, type="channel", maxResults=10).execute()
+        index_channels([
+            {'channel_id': item['snippet']['channelId'], 'title': item['snippet']['title'],
+             'description': item['snippet'].get('description', ''),
+             'thumbnail': item['snippet']['thumbnails']['default']['url']}
+            for item in search_response.get("items", [])
+        ])
         similar_channels = [
             {'title': item['snippet']['title'], 'channel_id': item['snippet']['channelId'],
              'thumbnail': item['snippet']['thumbnails']['default']['url']}
             for item in search_response.get("items", []) if item['snippet']['channelId'] != channel_id
         ]
         set_to_cache(cache_key, similar_channels, expire_hours=24)
-        return similar_channels
+        return with_index_results(similar_channels)
     except Exception as e:
-        return []
+        return index_results
 
 def search_for_channels(query):
     cache_key = f"search_channels_v2:{query}"
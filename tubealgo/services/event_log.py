@@ -0,0 +1,228 @@
+# tubealgo/services/event_log.py
+"""
+Buffered pipeline behind log_system_event().
+
+Recording an event only updates an in-memory buffer. Events are grouped by
+fingerprint (log type + message with numbers masked), so a storm of the same
+error is one entry with a count. A background thread per process writes the
+buffer to SystemLog every FLUSH_SECONDS in a single commit (one row per
+fingerprint, "[×N]" appended when it repeated), and at process exit.
+
+Critical types also go into an alert buffer that is sent to the admin chat
+through the Telegram outbox as one digest every ALERT_DIGEST_SECONDS. Each
+fingerprint is alerted at most once per ALERT_COOLDOWN_SECONDS across all
+processes (Redis SET NX); later repeats are still counted in SystemLog.
+"""
+
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from redis.exceptions import RedisError
+from .. import db
+from .redis_client import get_redis, mark_redis_failure
+
+logger = logging.getLogger(__name__)
+
+CRITICAL_LOG_TYPES = ('QUOTA_EXCEEDED', 'ERROR', 'PROJECT_QUOTA_EXCEEDED')
+FLUSH_SECONDS = 5
+MAX_BUFFERED = 500
+ALERT_DIGEST_SECONDS = 30
+ALERT_COOLDOWN_SECONDS = 15 * 60
+DIGEST_MAX_ITEMS = 10
+
+# Per-entity parts of a message, masked so one failure mode is one fingerprint.
+EMAIL_RE = re.compile(r'[^\s@]+@[^\s@]+')
+CHANNEL_ID_RE = re.compile(r'(?<![\w-])UC[\w-]{22}(?![\w-])')
+# 11-character video ids; plain words are left alone by requiring a digit, '-', '_' or an inner capital.
+VIDEO_ID_RE = re.compile(r'(?<![\w-])(?=[\w-]*[0-9_-]|[\w-]+[A-Z])[\w-]{11}(?![\w-])')
+NUMBER_RE = re.compile(r'\d+')
+MARKDOWN_SPECIAL_RE = re.compile(r'([_*`\[])')
+
+
+def fingerprint(log_type, message):
+    message = EMAIL_RE.sub('<email>', message)
+    message = CHANNEL_ID_RE.sub('<channel>', message)
+    message = VIDEO_ID_RE.sub('<video>', message)
+    return hashlib.sha1(f"{log_type}|{NUMBER_RE.sub('#', message)}".encode('utf-8')).hexdigest()[:16]
+
+def format_details(details, traceback_info=None):
+    """The SystemLog.details text, exactly as log_system_event always built it."""
+    details_str = ""
+    if details:
+        if isinstance(details, dict):
+            if traceback_info:
+                details['traceback'] = traceback_info
+            details_str = json.dumps(details, indent=2, default=str)
+        else:
+            details_str = str(details)
+            if traceback_info:
+                details_str += f"\n\nTraceback:\n{traceback_info}"
+    elif traceback_info:
+        details_str = f"Traceback:\n{traceback_info}"
+    return details_str
+
+
+class _Aggregate:
+    __slots__ = ('log_type', 'message', 'details', 'count', 'first_at', 'last_at')
+
+    def __init__(self, log_type, message, details, now):
+        self.log_type, self.message, self.details = log_type, message, details
+        self.count, self.first_at, self.last_at = 1, now, now
+
+    def add(self, now):
+        self.count += 1
+        self.last_at = now
+
+
+class EventBuffer:
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.events = {}   # fingerprint -> _Aggregate, until the next flush
+        self.alerts = {}   # fingerprint -> _Aggregate, until the next digest
+        self.alerts_since = None
+        self.local_cooldowns = {}
+
+    def record(self, log_type, message, details):
+        now = datetime.utcnow()
+        key = fingerprint(log_type, message)
+        with self.lock:
+            entry = self.events.get(key)
+            if entry:
+                entry.add(now)
+            else:
+                self.events[key] = _Aggregate(log_type, message, details, now)
+                # First sighting in this window goes to stdout right away
+                logger.log(logging.ERROR if log_type in CRITICAL_LOG_TYPES else logging.INFO, f"[{log_type}] {message}")
+            if log_type in CRITICAL_LOG_TYPES:
+                alert = self.alerts.get(key)
+                if alert:
+                    alert.add(now)
+                else:
+                    self.alerts[key] = _Aggregate(log_type, message, details, now)
+                    self.alerts_since = self.alerts_since or time.monotonic()
+            if len(self.events) >= MAX_BUFFERED:
+                self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait(FLUSH_SECONDS)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self, final=False):
+        with self.lock:
+            events, self.events = self.events, {}
+            alerts = {}
+            if self.alerts and (final or time.monotonic() - self.alerts_since >= ALERT_DIGEST_SECONDS):
+                alerts, self.alerts, self.alerts_since = self.alerts, {}, None
+        if not events and not alerts:
+            return
+        with self.app.app_context():
+            if events:
+                self._write(events)
+            if alerts:
+                self._send_digest(alerts)
+
+    def _write(self, events):
+        from ..models import SystemLog
+        try:
+            db.session.add_all([SystemLog(
+                timestamp=e.first_at,
+                log_type=e.log_type,
+                message=e.message if e.count == 1 else f"{e.message} [×{e.count}]",
+                details=e.details if e.count == 1 else
+                    f"Repeated {e.count} times (similar messages grouped), {e.first_at:%H:%M:%S} - {e.last_at:%H:%M:%S} UTC\n\n{e.details}".rstrip()
+            ) for e in events.values()])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"!!! FAILED TO WRITE {len(events)} SYSTEM EVENTS: {e}")
+
+    def _claim_alert(self, key):
+        """True if no process has alerted on this fingerprint within the cooldown."""
+        client = get_redis()
+        if client is not None:
+            try:
+                return bool(client.set(f"log-alert:{key}", 1, nx=True, ex=ALERT_COOLDOWN_SECONDS))
+            except RedisError as e:
+                mark_redis_failure(e)
+        now = time.monotonic()
+        if self.local_cooldowns.get(key, 0) > now:
+            return False
+        self.local_cooldowns[key] = now + ALERT_COOLDOWN_SECONDS
+        return True
+
+    def _send_digest(self, alerts):
+        from ..models import get_setting
+        from .notification_service import send_telegram_message
+        try:
+            admin_chat_id = get_setting('ADMIN_TELEGRAM_CHAT_ID')
+            if not admin_chat_id:
+                return
+            fresh = [a for key, a in alerts.items() if self._claim_alert(key)]
+            if fresh:
+                send_telegram_message(admin_chat_id, _digest_text(fresh))
+        except Exception as e:
+            print(f"!!! FAILED TO SEND ALERT DIGEST: {e}")
+
+
+def _escape(text):
+    return MARKDOWN_SPECIAL_RE.sub(r'\\\1', text)
+
+def _details_block(details, limit):
+    if not details:
+        return ""
+    truncated = details[:limit].replace('`', "'") + ('...' if len(details) > limit else '')
+    return f"*Details:* ```\n{truncated}\n```"
+
+def _digest_text(alerts):
+    if len(alerts) == 1 and alerts[0].count == 1:
+        # A lone event reads exactly like the old per-event alert
+        alert = alerts[0]
+        title, icon = ("Critical Alert", "🚨") if alert.log_type == 'ERROR' else ("Quota Alert", "⚠️")
+        return f"{icon} *{title}: {alert.log_type}*\n\n*Message:* {_escape(alert.message)}\n\n{_details_block(alert.details, 1000)}"
+
+    alerts = sorted(alerts, key=lambda a: a.count, reverse=True)
+    lines = [f"🚨 *Alert digest: {sum(a.count for a in alerts)} events, {len(alerts)} kinds*\n"]
+    for alert in alerts[:DIGEST_MAX_ITEMS]:
+        lines.append(f"• *{alert.log_type}* ×{alert.count}: {_escape(alert.message[:200])}")
+    if len(alerts) > DIGEST_MAX_ITEMS:
+        lines.append(f"…and {len(alerts) - DIGEST_MAX_ITEMS} more. See System Logs in the admin panel.")
+    top = alerts[0]
+    if top.details:
+        lines.append(f"\n{_details_block(top.details, 600)}")
+    return "\n".join(lines)
+
+
+_buffer = None
+_buffer_pid = None
+_buffer_lock = threading.Lock()
+
+def _get_buffer(app):
+    """The process's buffer; a forked child starts its own (threads don't survive fork)."""
+    global _buffer, _buffer_pid
+    pid = os.getpid()
+    if _buffer_pid != pid:
+        with _buffer_lock:
+            if _buffer_pid != pid:
+                buffer = EventBuffer(app)
+                threading.Thread(target=buffer.run, name='system-event-flusher', daemon=True).start()
+                atexit.register(buffer.flush, True)
+                _buffer, _buffer_pid = buffer, pid
+    return _buffer
+
+def record_event(app, log_type, message, details_str):
+    _get_buffer(app).record(log_type, message, details_str)
+
+def flush_events():
+    """Writes buffered events now (and sends any pending alert digest)."""
+    if _buffer is not None and _buffer_pid == os.getpid():
+        _buffer.flush(final=True)
@@ -0,0 +1,161 @@
+# tubealgo/services/export_stream.py
+"""
+Streaming file writers for data exports.
+
+Each writer takes an iterable of rows and returns a generator of bytes that
+can be passed straight to Response(...), so the first bytes go out as soon
+as the first rows exist and memory use doesn't grow with the row count.
+
+XLSX is written as a zip stream (zipfile supports non-seekable output) with
+inline strings, so no workbook is held in memory. The same generators can
+write to a file (see write_to_file) for background exports.
+"""
+
+import csv
+import io
+import re
+import json
+import zipfile
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_MIMETYPE = 'text/csv'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+ROWS_PER_CHUNK = 200
+# Control characters XML can't hold (same set openpyxl strips; importing openpyxl costs ~170ms at startup).
+ILLEGAL_CHARACTERS_RE = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes until the generator drains them."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def get_column_letter(index):
+    """1 -> 'A', 27 -> 'AA'."""
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def _xlsx_cell(ref, value):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(ILLEGAL_CHARACTERS_RE.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _xlsx_row(row_number, values):
+    cells = ''.join(_xlsx_cell(f"{get_column_letter(i)}{row_number}", value) for i, value in enumerate(values, start=1))
+    return f'<row r="{row_number}">{cells}</row>'
+
+def stream_xlsx(headers, rows, sheet_title='Sheet1'):
+    """Yields an .xlsx file (one sheet: header row + rows) in chunks."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_title[:31], {'"': '&quot;'})))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield sink.drain()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((_SHEET_START + _xlsx_row(1, headers)).encode('utf-8'))
+            buffered = []
+            for row_number, values in enumerate(rows, start=2):
+                buffered.append(_xlsx_row(row_number, values))
+                if len(buffered) >= ROWS_PER_CHUNK:
+                    sheet.write(''.join(buffered).encode('utf-8'))
+                    buffered = []
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            sheet.write((''.join(buffered) + _SHEET_END).encode('utf-8'))
+    yield sink.drain()
+
+def stream_csv(headers, rows):
+    """Yields a UTF-8 CSV (with BOM so Excel detects the encoding) in chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for count, values in enumerate(rows, start=1):
+        writer.writerow(values)
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode('utf-8')
+
+def stream_ndjson(records):
+    """Yields one JSON object per line."""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, ensure_ascii=False, default=str))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+def write_to_file(chunks, file_obj):
+    """Writes a stream from one of the writers above to an open binary file."""
+    for chunk in chunks:
+        file_obj.write(chunk)
+
+def download_headers(filename):
+    """Content-Disposition header that survives non-ASCII filenames."""
+    ascii_filename = filename.encode('ascii', 'ignore').decode('ascii', 'ignore')
+    return {'Content-Disposition': 'attachment; filename*=UTF-8\'\'{}; filename="{}"'.format(quote(filename), ascii_filename)}
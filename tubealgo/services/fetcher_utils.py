@@ -34,6 +34,7 @@ def _create_video_objects(video_items):
             'upload_date': snippet.get('publishedAt'),
             'duration_seconds': duration_seconds,
             'is_short': 0 < duration_seconds <= 61,
+            'category_id': snippet.get('categoryId'),
         })
     return videos
 
@@ -0,0 +1,253 @@
+# tubealgo/services/keyword_engine.py
+"""
+Keyword research engine.
+
+Autocomplete suggestions come from Google's suggest endpoint through one
+pooled requests.Session per process (keep-alive, timeouts, a couple of
+retries on 429/5xx). Suggestions are cached in Redis per normalised prefix,
+so repeat keystrokes and searches don't go out again; a small in-process
+cache covers Redis outages.
+
+"Expanded" mode also asks for alphabet ("<kw> a" ... "<kw> z") and
+question-word ("how <kw>", ...) variants. Cached variants come back in one
+MGET and the rest are fetched concurrently.
+
+The YouTube side of a search (top ranking videos, their tags, competition
+score) is cached per keyword in ApiCache, so a repeat search doesn't spend
+another 100-unit search.list. research_keyword() runs both halves at once.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app
+from redis.exceptions import RedisError
+from .youtube_core import get_youtube_service
+from .cache_manager import get_from_cache, set_to_cache
+from .redis_client import get_redis, mark_redis_failure
+from .keyword_index import record_terms, record_tagged_videos, SEARCH_WEIGHT, SUGGESTION_WEIGHT
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_URL = "https://www.google.com/complete/search"
+REQUEST_TIMEOUT = (3, 5)  # (connect, read) seconds
+SUGGESTION_CACHE_SECONDS = 6 * 3600
+LOCAL_CACHE_SIZE = 2000
+COMPETITION_CACHE_HOURS = 24
+EXPANSION_WORKERS = 8
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+QUESTION_WORDS = ('how', 'what', 'why', 'when', 'which', 'best', 'kaise', 'kya')
+
+_sessions = {}
+_session_lock = threading.Lock()
+_local_cache = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+
+def normalize_keyword(text):
+    return ' '.join((text or '').lower().split())
+
+def get_session():
+    """One pooled Session per process (a forked worker must not reuse the parent's sockets)."""
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(pid)
+            if session is None:
+                session = requests.Session()
+                retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',))
+                session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=EXPANSION_WORKERS, max_retries=retry))
+                _sessions[pid] = session
+    return session
+
+
+# --- Suggestion cache ---
+
+def _cache_key(prefix):
+    return f"kw-suggest:{prefix}"
+
+def _local_get(prefix):
+    with _local_cache_lock:
+        entry = _local_cache.get(prefix)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+    return None
+
+def _local_set(prefix, suggestions):
+    with _local_cache_lock:
+        _local_cache[prefix] = (time.monotonic() + SUGGESTION_CACHE_SECONDS, suggestions)
+        _local_cache.move_to_end(prefix)
+        while len(_local_cache) > LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+def _cache_get_many(prefixes):
+    client = get_redis()
+    if client is not None:
+        try:
+            values = client.mget([_cache_key(p) for p in prefixes])
+            return {p: json.loads(v) for p, v in zip(prefixes, values) if v is not None}
+        except RedisError as e:
+            mark_redis_failure(e)
+    found = {}
+    for prefix in prefixes:
+        suggestions = _local_get(prefix)
+        if suggestions is not None:
+            found[prefix] = suggestions
+    return found
+
+def _cache_set_many(results):
+    client = get_redis()
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for prefix, suggestions in results.items():
+                pipe.set(_cache_key(prefix), json.dumps(suggestions), ex=SUGGESTION_CACHE_SECONDS)
+            pipe.execute()
+            return
+        except RedisError as e:
+            mark_redis_failure(e)
+    for prefix, suggestions in results.items():
+        _local_set(prefix, suggestions)
+
+
+# --- Suggestions ---
+
+def _fetch_suggestions(prefix):
+    """Suggestions for one prefix from Google, or None if the request failed."""
+    try:
+        response = get_session().get(SUGGEST_URL, params={'client': 'chrome', 'q': prefix, 'ie': 'utf-8', 'oe': 'utf-8'},
+                                     timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()[1]
+    except (requests.RequestException, ValueError, IndexError) as e:
+        logger.warning(f"Keyword suggestions failed for '{prefix}': {e}")
+        return None
+
+def _suggestions_for(prefixes):
+    """{prefix: [suggestions]}: cached prefixes first, then the rest fetched concurrently."""
+    found = _cache_get_many(prefixes)
+    missing = [p for p in prefixes if p not in found]
+    if len(missing) == 1:
+        fetched = {missing[0]: _fetch_suggestions(missing[0])}
+    elif missing:
+        with ThreadPoolExecutor(max_workers=min(EXPANSION_WORKERS, len(missing))) as pool:
+            fetched = dict(zip(missing, pool.map(_fetch_suggestions, missing)))
+    else:
+        fetched = {}
+    fetched = {p: s for p, s in fetched.items() if s is not None}
+    if fetched:
+        _cache_set_many(fetched)
+        found.update(fetched)
+        # Fresh suggestions also grow the local autocomplete corpus
+        record_terms({suggestion: SUGGESTION_WEIGHT for suggestions in fetched.values() for suggestion in suggestions})
+    return found
+
+def expansion_prefixes(prefix):
+    return [f"{prefix} {letter}" for letter in ALPHABET] + [f"{word} {prefix}" for word in QUESTION_WORDS]
+
+def get_keyword_suggestions(keyword, expanded=False):
+    prefix = normalize_keyword(keyword)
+    if not prefix:
+        return {"suggestions": [{"keyword": "No suggestions found.", "volume": ""}]}
+
+    prefixes = [prefix] + (expansion_prefixes(prefix) if expanded else [])
+    results = _suggestions_for(prefixes)
+    if prefix not in results:
+        return {'error': 'Could not fetch keyword suggestions right now. Please try again.'}
+
+    seen, keywords = set(), []
+    for p in prefixes:
+        for suggestion in results.get(p, []):
+            if suggestion.lower() not in seen:
+                seen.add(suggestion.lower())
+                keywords.append(suggestion)
+
+    formatted_suggestions = [{"keyword": suggestion, "volume": "(coming soon)"} for suggestion in keywords]
+    if not formatted_suggestions:
+        return {"suggestions": [{"keyword": "No suggestions found.", "volume": ""}]}
+    return {"suggestions": formatted_suggestions}
+
+
+# --- YouTube competition ---
+
+def _competition_score(total_views, high_view_count_videos):
+    if total_views > 2000000 and high_view_count_videos >= 2:
+        return {"score": "High", "text": "Very competitive. Dominated by high-view videos.", "color": "text-red-500"}
+    if total_views > 500000 or high_view_count_videos >= 1:
+        return {"score": "Medium", "text": "Moderately competitive. Opportunity exists.", "color": "text-yellow-500"}
+    return {"score": "Low", "text": "Less competitive. Good opportunity to rank!", "color": "text-green-500"}
+
+def get_keyword_competition(keyword):
+    """Top 5 ranking videos, their most used tags and a competition score. Cached per normalised keyword."""
+    cache_key = f"keyword_competition_v1:{normalize_keyword(keyword)}"[:255]
+    cached_data = get_from_cache(cache_key)
+    if cached_data:
+        return cached_data
+
+    youtube, error = get_youtube_service()
+    if error:
+        return {'error': f"API Error: {error}"}
+
+    try:
+        search_response = youtube.search().list(
+            q=keyword, part='id', type='video', maxResults=5, order='relevance'
+        ).execute()
+        video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
+
+        top_ranking_videos, all_tags, tagged_videos = [], [], []
+        total_views = high_view_count_videos = 0
+        if video_ids:
+            videos_response = youtube.videos().list(
+                part='snippet,statistics,contentDetails', id=','.join(video_ids)
+            ).execute()
+            for item in videos_response.get('items', []):
+                snippet = item.get('snippet', {})
+                view_count = int(item.get('statistics', {}).get('viewCount', 0))
+                total_views += view_count
+                if view_count > 500000: # 5 Lakh views
+                    high_view_count_videos += 1
+                top_ranking_videos.append({
+                    'id': item.get('id'),
+                    'title': snippet.get('title'),
+                    'thumbnail': snippet.get('thumbnails', {}).get('medium', {}).get('url'),
+                    'channel_title': snippet.get('channelTitle'),
+                    'view_count': view_count,
+                    'published_at': snippet.get('publishedAt')
+                })
+                all_tags.extend(snippet.get('tags', []))
+                tagged_videos.append((snippet.get('tags', []), view_count))
+    except Exception as e:
+        return {'error': f"Could not fetch complete YouTube data: {e}"}
+
+    result = {
+        'top_ranking_videos': top_ranking_videos,
+        'top_video_tags': Counter(all_tags).most_common(30),
+        'competition_score': _competition_score(total_views, high_view_count_videos) if video_ids else
+            {"score": "N/A", "text": "Could not determine.", "color": "text-gray-500"},
+    }
+    set_to_cache(cache_key, result, expire_hours=COMPETITION_CACHE_HOURS)
+    record_tagged_videos(tagged_videos)
+    record_terms({keyword: SEARCH_WEIGHT})
+    return result
+
+
+def research_keyword(keyword, expanded=False):
+    """Suggestions and YouTube competition for a keyword, fetched at the same time. Returns (suggestions, competition)."""
+    app = current_app._get_current_object()
+
+    def suggestions_in_context():
+        with app.app_context():
+            return get_keyword_suggestions(keyword, expanded)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(suggestions_in_context)
+        competition = get_keyword_competition(keyword)
+        return future.result(), competition
@@ -0,0 +1,149 @@
+# tubealgo/services/keyword_index.py
+"""
+Local keyword autocomplete.
+
+Every tag and keyword the app sees is recorded in the KeywordTerm table with
+a popularity score: video tags (from get_most_used_tags and keyword research)
+add 1 + log10(views + 1) for each video carrying them, searched keywords and
+Google suggestions add a small flat weight.
+
+Each process keeps a sorted array of all terms plus a precomputed top list
+for every 1-3 character prefix, so a lookup is a dict hit for short prefixes
+and a bisect + small scan for longer ones. Terms recorded in this process are
+inserted into the live index right away; the whole index is reloaded from the
+table every RELOAD_SECONDS to pick up other processes' terms.
+
+/api/keyword-suggestions answers from here and only asks Google (and records
+the answers) when a prefix has too few local completions.
+"""
+
+import math
+import time
+import heapq
+import bisect
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+from .. import db
+from ..models import KeywordTerm
+
+logger = logging.getLogger(__name__)
+
+SHORT_PREFIX_LEN = 3
+TOP_K = 10
+RELOAD_SECONDS = 600
+MAX_TERMS = 200000
+MIN_TERM_LEN = 2
+MAX_TERM_LEN = 100
+SEARCH_WEIGHT = 2.0
+SUGGESTION_WEIGHT = 0.5
+
+
+def normalize_term(text):
+    term = ' '.join((text or '').lower().replace('#', ' ').split())
+    return term if MIN_TERM_LEN <= len(term) <= MAX_TERM_LEN else None
+
+def view_weight(view_count):
+    return 1 + math.log10(max(view_count or 0, 0) + 1)
+
+
+class PrefixIndex:
+    def __init__(self, scores):
+        self.scores = dict(scores)
+        self.terms = sorted(self.scores)
+        groups = defaultdict(list)
+        for term in self.terms:
+            for n in range(1, min(len(term), SHORT_PREFIX_LEN) + 1):
+                groups[term[:n]].append(term)
+        self.top = {prefix: heapq.nlargest(TOP_K, terms, key=self.scores.get) for prefix, terms in groups.items()}
+
+    def add(self, term, weight):
+        if term not in self.scores:
+            bisect.insort(self.terms, term)
+        self.scores[term] = self.scores.get(term, 0) + weight
+        for n in range(1, min(len(term), SHORT_PREFIX_LEN) + 1):
+            top = [t for t in self.top.get(term[:n], []) if t != term]
+            top.append(term)
+            top.sort(key=self.scores.get, reverse=True)
+            self.top[term[:n]] = top[:TOP_K]
+
+    def complete(self, prefix, limit=TOP_K):
+        if len(prefix) <= SHORT_PREFIX_LEN:
+            return self.top.get(prefix, [])[:limit]
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + '\uffff', lo)
+        return heapq.nlargest(limit, self.terms[lo:hi], key=self.scores.get)
+
+
+_index = None
+_index_loaded_at = 0
+_index_lock = threading.Lock()
+
+def _get_index():
+    global _index, _index_loaded_at
+    if _index is None or time.monotonic() - _index_loaded_at > RELOAD_SECONDS:
+        with _index_lock:
+            if _index is None or time.monotonic() - _index_loaded_at > RELOAD_SECONDS:
+                rows = db.session.query(KeywordTerm.term, KeywordTerm.score).order_by(KeywordTerm.score.desc()).limit(MAX_TERMS).all()
+                _index, _index_loaded_at = PrefixIndex(rows), time.monotonic()
+                logger.info(f"Keyword index loaded with {len(rows)} terms")
+    return _index
+
+
+def record_terms(weights):
+    """
+    Adds {text: weight} to the corpus (one commit, in its own session so the
+    caller's pending changes are left alone) and to this process's live
+    index. Texts are normalised; duplicates are summed. Never raises.
+    """
+    merged = defaultdict(float)
+    for text, weight in weights.items():
+        term = normalize_term(text)
+        if term and weight > 0:
+            merged[term] += weight
+    if not merged:
+        return
+
+    table = KeywordTerm.__table__
+    now = datetime.utcnow()
+    # Sorted so concurrent upserts lock rows in the same order
+    rows = [{'term': term, 'score': weight, 'uses': 1, 'updated_at': now} for term, weight in sorted(merged.items())]
+    try:
+        with Session(db.engine) as session, session.begin():
+            dialect = postgresql if session.get_bind().dialect.name == 'postgresql' else sqlite
+            stmt = dialect.insert(table).values(rows)
+            # Increment in SQL so concurrent writers can't lose each other's updates
+            stmt = stmt.on_conflict_do_update(index_elements=[table.c.term], set_={
+                'score': table.c.score + stmt.excluded.score,
+                'uses': table.c.uses + 1,
+                'updated_at': stmt.excluded.updated_at,
+            })
+            session.execute(stmt)
+    except Exception as e:
+        logger.warning(f"Could not record keyword terms: {e}")
+        return
+
+    if _index is not None:
+        with _index_lock:
+            for term, weight in merged.items():
+                _index.add(term, weight)
+
+def record_tagged_videos(videos):
+    """Records tags from (tags, view_count) pairs, each tag weighted by its video's views."""
+    weights = defaultdict(float)
+    for tags, view_count in videos:
+        for tag in tags or []:
+            weights[tag] += view_weight(view_count)
+    record_terms(weights)
+
+def complete_keyword(prefix, limit=TOP_K):
+    """Most popular known terms starting with `prefix`."""
+    prefix = ' '.join((prefix or '').lower().split())
+    if not prefix:
+        return []
+    index = _get_index()
+    with _index_lock:
+        return index.complete(prefix, limit)
@@ -0,0 +1,162 @@
+# tubealgo/services/leaderboard_service.py
+"""
+Precomputed top-channels-by-category leaderboards.
+
+The refresh_category_leaderboards Celery task runs once a day per configured
+region (LEADERBOARD_REGIONS). For every assignable video category it runs the
+same most-viewed search the Discover page used to run on demand, then fetches
+stats for those channels plus every channel ranked in that category during
+the last TRACK_DAYS, 50 channels per channels.list call. One row per channel
+per day goes into category_leaderboard, so subscriber deltas can be read
+straight from the table. Titles and thumbnails go into ChannelProfile (which
+also feeds the similar-channels index).
+
+Discover reads the latest day's rows: "top" sorts by subscribers, "growing"
+by subscribers gained since the snapshot GROWTH_DAYS earlier.
+"""
+
+import logging
+from datetime import date, timedelta
+from sqlalchemy import func
+from .. import db
+from ..models import CategoryLeaderboardEntry, ChannelProfile
+from .youtube_core import get_youtube_service
+from .discovery_fetcher import get_youtube_categories
+from .similarity_index import index_channels
+
+logger = logging.getLogger(__name__)
+
+SEARCH_RESULTS = 20
+CATEGORY_BATCH_SIZE = 8
+TRACK_DAYS = 30
+RETENTION_DAYS = 90
+GROWTH_DAYS = 7
+LEADERBOARD_SIZE = 10
+LEADERBOARD_VIEWS = ('top', 'growing')
+
+
+# --- Refresh ---
+
+def _ranked_channel_ids(youtube, category_id, region_code):
+    response = youtube.search().list(part="snippet", type="video", videoCategoryId=category_id, regionCode=region_code,
+                                     order="viewCount", maxResults=SEARCH_RESULTS).execute()
+    channel_ids = []
+    for item in response.get('items', []):
+        channel_id = item['snippet']['channelId']
+        if channel_id not in channel_ids:
+            channel_ids.append(channel_id)
+    return channel_ids
+
+def _fetch_channel_stats(youtube, channel_ids):
+    """{channel_id: (subscribers, views)} in channels.list batches of 50; profiles are updated on the way."""
+    stats, profiles = {}, []
+    channel_ids = list(channel_ids)
+    for start in range(0, len(channel_ids), 50):
+        response = youtube.channels().list(part="snippet,statistics,brandingSettings", id=",".join(channel_ids[start:start + 50])).execute()
+        for item in response.get('items', []):
+            statistics, snippet = item.get('statistics', {}), item.get('snippet', {})
+            subscribers = int(statistics.get('subscriberCount', 0))
+            stats[item['id']] = (subscribers, int(statistics.get('viewCount', 0)))
+            profiles.append({
+                'channel_id': item['id'], 'title': snippet.get('title'), 'description': snippet.get('description', ''),
+                'keywords': item.get('brandingSettings', {}).get('channel', {}).get('keywords', ''),
+                'thumbnail': snippet.get('thumbnails', {}).get('default', {}).get('url'), 'subscribers': subscribers,
+            })
+    index_channels(profiles)
+    return stats
+
+def refresh_region_leaderboards(region_code, today=None):
+    """Rebuilds today's leaderboard rows for every assignable category in a region. Returns rows written."""
+    today = today or date.today()
+    youtube, error = get_youtube_service()
+    if error:
+        raise RuntimeError(error)
+
+    categories = [c['id'] for c in get_youtube_categories(region_code) if c.get('snippet', {}).get('assignable')]
+    written = 0
+    for start in range(0, len(categories), CATEGORY_BATCH_SIZE):
+        batch = categories[start:start + CATEGORY_BATCH_SIZE]
+        ranked = {category_id: _ranked_channel_ids(youtube, category_id, region_code) for category_id in batch}
+
+        members = {category_id: list(ids) for category_id, ids in ranked.items()}
+        tracked = db.session.query(CategoryLeaderboardEntry.category_id, CategoryLeaderboardEntry.channel_id_youtube).filter(
+            CategoryLeaderboardEntry.region_code == region_code,
+            CategoryLeaderboardEntry.category_id.in_(batch),
+            CategoryLeaderboardEntry.date >= today - timedelta(days=TRACK_DAYS),
+            CategoryLeaderboardEntry.rank.isnot(None)
+        ).distinct().all()
+        for category_id, channel_id in tracked:
+            if channel_id not in members[category_id]:
+                members[category_id].append(channel_id)
+
+        stats = _fetch_channel_stats(youtube, {cid for ids in members.values() for cid in ids})
+
+        CategoryLeaderboardEntry.query.filter(
+            CategoryLeaderboardEntry.region_code == region_code,
+            CategoryLeaderboardEntry.category_id.in_(batch),
+            CategoryLeaderboardEntry.date == today
+        ).delete(synchronize_session=False)
+        for category_id, channel_ids in members.items():
+            for channel_id in channel_ids:
+                if channel_id not in stats:
+                    continue
+                rank = ranked[category_id].index(channel_id) + 1 if channel_id in ranked[category_id] else None
+                subscribers, views = stats[channel_id]
+                db.session.add(CategoryLeaderboardEntry(
+                    region_code=region_code, category_id=category_id, channel_id_youtube=channel_id,
+                    date=today, rank=rank, subscribers=subscribers, views=views
+                ))
+                written += 1
+        db.session.commit()
+
+    CategoryLeaderboardEntry.query.filter(
+        CategoryLeaderboardEntry.region_code == region_code,
+        CategoryLeaderboardEntry.date < today - timedelta(days=RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return written
+
+
+# --- Reading ---
+
+def get_leaderboard(category_id, region_code="IN", view='top', limit=LEADERBOARD_SIZE):
+    """
+    Latest precomputed ranking as a list of channel dicts, or None if this
+    category has never been refreshed. "growing" entries carry
+    subscriber_delta/delta_days and are empty until a second day exists.
+    """
+    filters = (CategoryLeaderboardEntry.region_code == region_code, CategoryLeaderboardEntry.category_id == str(category_id))
+    latest = db.session.query(func.max(CategoryLeaderboardEntry.date)).filter(*filters).scalar()
+    if latest is None:
+        return None
+    rows = CategoryLeaderboardEntry.query.filter(*filters, CategoryLeaderboardEntry.date == latest).all()
+
+    deltas, delta_days = {}, None
+    if view == 'growing':
+        base_date = db.session.query(func.max(CategoryLeaderboardEntry.date)).filter(
+            *filters, CategoryLeaderboardEntry.date <= latest - timedelta(days=GROWTH_DAYS)).scalar()
+        if base_date is None:
+            base_date = db.session.query(func.min(CategoryLeaderboardEntry.date)).filter(
+                *filters, CategoryLeaderboardEntry.date < latest).scalar()
+        if base_date is None:
+            return []
+        delta_days = (latest - base_date).days
+        base = dict(db.session.query(CategoryLeaderboardEntry.channel_id_youtube, CategoryLeaderboardEntry.subscribers).filter(
+            *filters, CategoryLeaderboardEntry.date == base_date).all())
+        deltas = {r.channel_id_youtube: r.subscribers - base[r.channel_id_youtube] for r in rows if r.channel_id_youtube in base}
+        rows = sorted((r for r in rows if r.channel_id_youtube in deltas), key=lambda r: deltas[r.channel_id_youtube], reverse=True)
+    else:
+        rows = sorted(rows, key=lambda r: r.subscribers, reverse=True)
+    rows = rows[:limit]
+
+    profiles = {p.channel_id_youtube: p for p in ChannelProfile.query.filter(
+        ChannelProfile.channel_id_youtube.in_([r.channel_id_youtube for r in rows])).all()}
+    leaderboard = []
+    for r in rows:
+        profile = profiles.get(r.channel_id_youtube)
+        entry = {'title': profile.title if profile else r.channel_id_youtube, 'channel_id': r.channel_id_youtube,
+                 'thumbnail': profile.thumbnail_url if profile else None, 'subscribers': r.subscribers}
+        if view == 'growing':
+            entry.update(subscriber_delta=deltas[r.channel_id_youtube], delta_days=delta_days)
+        leaderboard.append(entry)
+    return leaderboard
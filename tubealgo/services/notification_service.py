@@ -1,56 +1,302 @@
 # Filepath: tubealgo/services/notification_service.py
+"""
+Telegram notifications through an outbox.
+
+send_telegram_message() and send_telegram_photo_with_caption() only insert a
+NotificationOutbox row and nudge the deliver_notifications Celery task, so
+request handlers, jobs and log_system_event never wait on Telegram.
+
+deliver_notifications runs on its own "notifications" queue (one delivery
+run at a time, guarded by a Redis lock) and:
+  * coalesces pending plain messages for the same chat into one message
+    (messages with buttons and photos are always sent on their own),
+  * stays under MAX_PER_SECOND messages overall and one message per
+    PER_CHAT_INTERVAL seconds per chat,
+  * retries network errors, 5xx and 429 (honouring retry_after) with
+    exponential backoff, and gives up after MAX_ATTEMPTS; 400/403 (bad chat,
+    bot blocked) fail immediately.
+
+Beat also runs the task every minute, so messages go out even if a nudge is
+lost. send_telegram_message_now() is kept for the one place that needs the
+answer (the "send test message" button).
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
 import requests
-import json # json को इम्पोर्ट करें
+from requests.adapters import HTTPAdapter
+from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from .. import db
+from .redis_client import get_redis, mark_redis_failure
 
-def send_telegram_message(chat_id, message, reply_markup=None):
-    # इम्पोर्ट को फंक्शन के अंदर ले जाया गया है
-    from tubealgo.models import get_config_value 
-    
-    TELEGRAM_TOKEN = get_config_value('TELEGRAM_BOT_TOKEN')
-    if not TELEGRAM_TOKEN:
-        print("ERROR: TELEGRAM_BOT_TOKEN is not set.")
-        return None
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.telegram.org/bot{token}/{method}"
+REQUEST_TIMEOUT = (5, 15)  # (connect, read) seconds
+MAX_PER_SECOND = 25  # Telegram allows about 30 messages/second per bot
+PER_CHAT_INTERVAL = 1.0
+MAX_MESSAGE_LENGTH = 4096
+COALESCE_SEPARATOR = "\n\n➖➖➖\n\n"
+BATCH_SIZE = 200
+RUN_SECONDS = 50
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+SENT_RETENTION_DAYS = 7
+FAILED_RETENTION_DAYS = 30
+
+LOCK_KEY = "telegram-outbox:lock"
+KICK_KEY = "telegram-outbox:kick"
+
+_sessions = {}
+_session_lock = threading.Lock()
+
+
+def _get_token():
+    from tubealgo.models import get_config_value
+    return get_config_value('TELEGRAM_BOT_TOKEN')
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {
-        'chat_id': chat_id,
-        'text': message,
-        'parse_mode': 'Markdown'
-    }
-    
-    # === यहाँ बदलाव किया गया है ===
-    # अगर बटन भेजे गए हैं, तो उन्हें पेलोड में जोड़ें
+def get_session():
+    """One pooled Session per process (a forked worker must not reuse the parent's sockets)."""
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(pid)
+            if session is None:
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+                _sessions[pid] = session
+    return session
+
+def call_telegram(method, payload, token=None):
+    """POSTs one Bot API call. Returns the decoded response, or {'ok': False, 'description': ...} on network errors."""
+    token = token or _get_token()
+    if not token:
+        return {'ok': False, 'error_code': None, 'description': 'TELEGRAM_BOT_TOKEN is not set.'}
+    try:
+        response = get_session().post(API_URL.format(token=token, method=method), data=payload, timeout=REQUEST_TIMEOUT)
+        return response.json()
+    except (requests.RequestException, ValueError) as e:
+        return {'ok': False, 'error_code': None, 'description': f"Could not reach Telegram: {e}"}
+
+def _message_payload(chat_id, text, reply_markup=None):
+    payload = {'chat_id': chat_id, 'text': text, 'parse_mode': 'Markdown'}
     if reply_markup:
         payload['reply_markup'] = json.dumps(reply_markup)
-    # === यहाँ तक ===
+    return payload
+
+
+# --- Enqueueing ---
 
+def _kick_delivery():
+    """Queues a delivery run, at most about once a second across all processes."""
+    client = get_redis()
+    if client is not None:
+        try:
+            if not client.set(KICK_KEY, 1, nx=True, px=1000):
+                return
+        except RedisError as e:
+            mark_redis_failure(e)
     try:
-        response = requests.post(url, data=payload)
-        return response.json()
+        from ..jobs import deliver_notifications
+        deliver_notifications.apply_async(retry=False)
     except Exception as e:
-        print(f"Error sending Telegram message: {e}")
-        return None
+        # The every-minute beat run picks the message up anyway.
+        logger.warning(f"Could not queue Telegram delivery: {e}")
 
-def send_telegram_photo_with_caption(chat_id, photo_url, caption):
-    # इम्पोर्ट को इस फंक्शन के अंदर भी ले जाया गया है
-    from tubealgo.models import get_config_value
-    
-    TELEGRAM_TOKEN = get_config_value('TELEGRAM_BOT_TOKEN')
-    if not TELEGRAM_TOKEN:
+def _enqueue(chat_id, kind, text, photo_url=None, reply_markup=None):
+    from tubealgo.models import NotificationOutbox
+    if not _get_token():
         print("ERROR: TELEGRAM_BOT_TOKEN is not set.")
         return None
-        
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendPhoto"
-    payload = {
-        'chat_id': chat_id,
-        'photo': photo_url,
-        'caption': caption,
-        'parse_mode': 'Markdown'
-    }
+    if not chat_id or not text:
+        return None
+    # Own session: queueing must neither commit nor roll back the caller's pending changes.
     try:
-        response = requests.post(url, data=payload)
-        return response.json()
+        with Session(db.engine) as session, session.begin():
+            entry = NotificationOutbox(chat_id=str(chat_id), kind=kind, text=text, photo_url=photo_url, reply_markup=reply_markup)
+            session.add(entry)
+            session.flush()
+            entry_id = entry.id
     except Exception as e:
-        print(f"Error sending Telegram photo: {e}")
-        # Fallback to text message if photo fails
-        return send_telegram_message(chat_id, caption)
\ No newline at end of file
+        logger.error(f"Could not queue Telegram {kind} for chat {chat_id}, message dropped: {e}", exc_info=True)
+        return None
+    _kick_delivery()
+    return entry_id
+
+def send_telegram_message(chat_id, message, reply_markup=None):
+    """Queues a Markdown message. Returns the outbox id, or None if it couldn't be queued."""
+    return _enqueue(chat_id, 'message', message, reply_markup=reply_markup)
+
+def send_telegram_photo_with_caption(chat_id, photo_url, caption):
+    """Queues a photo; if Telegram rejects the photo, the caption is sent as text."""
+    return _enqueue(chat_id, 'photo', caption, photo_url=photo_url)
+
+def send_telegram_message_now(chat_id, message, reply_markup=None):
+    """Sends immediately and returns Telegram's response. Only for callers that must show the result."""
+    return call_telegram('sendMessage', _message_payload(chat_id, message, reply_markup))
+
+
+# --- Delivery ---
+
+class _RateLimiter:
+    def __init__(self):
+        self.sent_at = []      # send times within the last second
+        self.chat_ready = {}   # chat_id -> earliest next send
+
+    def chat_ready_in(self, chat_id):
+        return max(0.0, self.chat_ready.get(chat_id, 0) - time.monotonic())
+
+    def wait_global(self):
+        now = time.monotonic()
+        self.sent_at = [t for t in self.sent_at if now - t < 1]
+        if len(self.sent_at) >= MAX_PER_SECOND:
+            time.sleep(1 - (now - self.sent_at[0]))
+
+    def record(self, chat_id):
+        now = time.monotonic()
+        self.sent_at.append(now)
+        self.chat_ready[chat_id] = now + PER_CHAT_INTERVAL
+
+def _coalesce(entries):
+    """Splits one chat's due entries into send units: lists of entries that go out as one message."""
+    units, current, length = [], [], 0
+    for entry in entries:
+        if entry.kind != 'message' or entry.reply_markup:
+            if current:
+                units.append(current)
+                current, length = [], 0
+            units.append([entry])
+            continue
+        added = len(entry.text) + (len(COALESCE_SEPARATOR) if current else 0)
+        if current and length + added > MAX_MESSAGE_LENGTH:
+            units.append(current)
+            current, length = [], 0
+            added = len(entry.text)
+        current.append(entry)
+        length += added
+    if current:
+        units.append(current)
+    return units
+
+def _send_unit(unit, token):
+    first = unit[0]
+    if first.kind == 'photo':
+        result = call_telegram('sendPhoto', {'chat_id': first.chat_id, 'photo': first.photo_url,
+                                             'caption': first.text, 'parse_mode': 'Markdown'}, token)
+        if not result.get('ok') and result.get('error_code') == 400:
+            result = call_telegram('sendMessage', _message_payload(first.chat_id, first.text), token)
+        return result
+    text = COALESCE_SEPARATOR.join(entry.text for entry in unit)
+    return call_telegram('sendMessage', _message_payload(first.chat_id, text, first.reply_markup), token)
+
+def _mark(unit, result, now):
+    """Updates entries after a send. Returns seconds Telegram asked us to wait (429), else 0."""
+    if result.get('ok'):
+        for entry in unit:
+            entry.status, entry.sent_at, entry.last_error = 'sent', now, None
+        return 0
+
+    code = result.get('error_code')
+    retry_after = (result.get('parameters') or {}).get('retry_after', 0) if code == 429 else 0
+    for entry in unit:
+        entry.attempts += 1
+        entry.last_error = (result.get('description') or 'Unknown error')[:500]
+        if code in (400, 403) or entry.attempts >= MAX_ATTEMPTS:
+            entry.status = 'failed'
+        else:
+            delay = max(retry_after, min(RETRY_BASE_SECONDS * 2 ** (entry.attempts - 1), RETRY_MAX_SECONDS))
+            entry.next_attempt_at = now + timedelta(seconds=delay)
+    return retry_after
+
+def _due_entries(now):
+    from tubealgo.models import NotificationOutbox
+    return NotificationOutbox.query.filter(
+        NotificationOutbox.status == 'pending',
+        NotificationOutbox.next_attempt_at <= now
+    ).order_by(NotificationOutbox.id).limit(BATCH_SIZE).all()
+
+def _deliver_batch(entries, limiter, token, deadline):
+    """Sends one batch of due entries. Returns the number of Telegram calls made."""
+    by_chat = {}
+    for entry in entries:
+        by_chat.setdefault(entry.chat_id, []).append(entry)
+
+    calls = 0
+    queue = [(chat_id, unit) for chat_id, chat_entries in by_chat.items() for unit in _coalesce(chat_entries)]
+    while queue and time.monotonic() < deadline:
+        waiting = []
+        for chat_id, unit in queue:
+            if limiter.chat_ready_in(chat_id) > 0:
+                waiting.append((chat_id, unit))
+                continue
+            limiter.wait_global()
+            result = _send_unit(unit, token)
+            limiter.record(chat_id)
+            calls += 1
+
+            if not result.get('ok') and result.get('error_code') == 400 and len(unit) > 1:
+                # One malformed message shouldn't sink the rest: send them one by one
+                waiting.extend((chat_id, [entry]) for entry in unit)
+                continue
+            retry_after = _mark(unit, result, datetime.utcnow())
+            db.session.commit()
+            if retry_after:
+                # Bot-wide flood limit: everything else waits too
+                time.sleep(min(retry_after, max(0, deadline - time.monotonic())))
+        if waiting and len(waiting) == len(queue):
+            time.sleep(min(limiter.chat_ready_in(chat_id) for chat_id, _ in waiting))
+        queue = waiting
+    return calls
+
+def _prune_outbox(now):
+    from tubealgo.models import NotificationOutbox
+    NotificationOutbox.query.filter(
+        NotificationOutbox.status == 'sent', NotificationOutbox.created_at < now - timedelta(days=SENT_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    NotificationOutbox.query.filter(
+        NotificationOutbox.status == 'failed', NotificationOutbox.created_at < now - timedelta(days=FAILED_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+def deliver_pending_notifications():
+    """
+    Delivers due outbox entries for up to RUN_SECONDS. Returns the number of
+    Telegram calls made, or None if another delivery run holds the lock.
+    """
+    token = _get_token()
+    if not token:
+        return 0
+
+    client = get_redis()
+    if client is not None:
+        try:
+            if not client.set(LOCK_KEY, os.getpid(), nx=True, ex=RUN_SECONDS + 30):
+                return None
+        except RedisError as e:
+            mark_redis_failure(e)
+            client = None
+
+    try:
+        limiter = _RateLimiter()
+        deadline = time.monotonic() + RUN_SECONDS
+        calls = 0
+        while time.monotonic() < deadline:
+            entries = _due_entries(datetime.utcnow())
+            if not entries:
+                break
+            calls += _deliver_batch(entries, limiter, token, deadline)
+        _prune_outbox(datetime.utcnow())
+        return calls
+    finally:
+        if client is not None:
+            try:
+                client.delete(LOCK_KEY)
+            except RedisError as e:
+                mark_redis_failure(e)
@@ -0,0 +1,116 @@
+# tubealgo/services/ordering.py
+"""
+Ordering for user-sorted lists (planner columns, competitor list).
+
+Positions are spaced POSITION_GAP apart, so moving one item only rewrites
+that item: it gets a position between its new neighbours. When two
+neighbours have no free integer between them, the group is renumbered with
+a single bulk UPDATE and the move is retried. Saving a whole board is also
+one UPDATE ... FROM (VALUES ...) statement, scoped to the user.
+
+Functions return {'success': True, ...} or {'error': ...} and do not commit.
+"""
+
+from sqlalchemy import func
+from .. import db
+from .db_bulk import bulk_update_from_values
+
+POSITION_GAP = 1024
+
+
+def _user_filter(user_id):
+    return lambda table, source: table.c.user_id == user_id
+
+def next_position(model, user_id, first=False, **group):
+    """Position for a new item at the end (or start, if first=True) of a group."""
+    query = db.session.query(func.min(model.position) if first else func.max(model.position)).filter(
+        model.user_id == user_id, *[getattr(model, key) == value for key, value in group.items()]
+    )
+    edge = query.scalar()
+    if edge is None:
+        return POSITION_GAP
+    return edge - POSITION_GAP if first else edge + POSITION_GAP
+
+def apply_order(model, user_id, ids_by_group, group_column=None):
+    """
+    Saves a whole ordering in one statement.
+
+    ids_by_group: {group value: [id, ...]} when the model has a group column
+    (e.g. ContentIdea.status), or {None: [id, ...]} when it doesn't.
+    Ids that don't belong to the user are ignored by the UPDATE.
+    """
+    rows = []
+    seen = set()
+    for group_value, ids in ids_by_group.items():
+        if not isinstance(ids, list):
+            continue
+        for index, item_id in enumerate(ids):
+            try:
+                item_id = int(item_id)
+            except (ValueError, TypeError):
+                continue
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            row = {'id': item_id, 'position': (index + 1) * POSITION_GAP}
+            if group_column:
+                row[group_column] = group_value
+            rows.append(row)
+
+    columns = ['position'] + ([group_column] if group_column else [])
+    updated = bulk_update_from_values(model.__table__, 'id', columns, rows, condition=_user_filter(user_id))
+    return {'success': True, 'updated': updated}
+
+def renumber(model, user_id, **group):
+    """Spreads a group out to POSITION_GAP spacing, keeping its order. One UPDATE."""
+    query = db.session.query(model.id).filter(model.user_id == user_id)
+    for key, value in group.items():
+        query = query.filter(getattr(model, key) == value)
+    ids = [row.id for row in query.order_by(model.position, model.id)]
+    rows = [{'id': item_id, 'position': (index + 1) * POSITION_GAP} for index, item_id in enumerate(ids)]
+    bulk_update_from_values(model.__table__, 'id', ['position'], rows, condition=_user_filter(user_id))
+
+def move_item(model, user_id, item_id, before_id=None, after_id=None, **group):
+    """
+    Moves one item so it sits after `before_id` and before `after_id` (either may be
+    None at the ends of the list). `group` sets group columns, e.g. status='filming'.
+    Usually a single-row UPDATE.
+    """
+    item = db.session.query(model).filter(model.user_id == user_id, model.id == item_id).first()
+    if item is None:
+        return {'error': 'Item not found or unauthorized.'}
+
+    # Neighbours must already be in the group the item is moving into.
+    neighbour_ids = {i for i in (before_id, after_id) if i is not None}
+    query = db.session.query(model).filter(
+        model.user_id == user_id, model.id.in_(neighbour_ids),
+        *[getattr(model, key) == value for key, value in group.items()]
+    )
+    rows = {row.id: row for row in query}
+    if any(i is not None and i not in rows for i in (before_id, after_id)):
+        return {'error': 'Neighbouring item not found.'}
+
+    for _ in range(2):
+        low = rows[before_id].position if before_id is not None else None
+        high = rows[after_id].position if after_id is not None else None
+        if low is None and high is None:
+            position = POSITION_GAP
+        elif low is None:
+            position = high - POSITION_GAP
+        elif high is None:
+            position = low + POSITION_GAP
+        elif high - low > 1:
+            position = (low + high) // 2
+        else:
+            # No room between the neighbours: spread the group out and try again.
+            renumber(model, user_id, **group)
+            rows = {row.id: row for row in query.populate_existing()}
+            continue
+        break
+    else:
+        return {'error': 'Could not find a free position.'}
+
+    for key, value in group.items():
+        setattr(item, key, value)
+    item.position = position
+    return {'success': True, 'position': position}
@@ -0,0 +1,42 @@
+# tubealgo/services/redis_client.py
+"""
+Shared Redis client for request-path features (usage metering, caches).
+
+One connection pool per process, short socket timeouts, and a small circuit
+breaker: after a failure, get_redis() returns None for a while so callers
+fall back to their database path instead of waiting on timeouts.
+"""
+
+import os
+import time
+import logging
+import redis
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+FAILURE_COOLDOWN_SECONDS = 30
+
+_clients = {}
+_down_until = 0
+
+
+def get_redis():
+    """Returns a Redis client, or None if Redis recently failed."""
+    if time.monotonic() < _down_until:
+        return None
+    url = current_app.config.get('REDIS_URL')
+    if not url:
+        return None
+    key = (os.getpid(), url)  # A forked worker must not reuse the parent's sockets.
+    client = _clients.get(key)
+    if client is None:
+        client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1, health_check_interval=30)
+        _clients[key] = client
+    return client
+
+def mark_redis_failure(error):
+    """Opens the circuit breaker after a Redis error."""
+    global _down_until
+    _down_until = time.monotonic() + FAILURE_COOLDOWN_SECONDS
+    logger.warning(f"Redis unavailable, using fallbacks for {FAILURE_COOLDOWN_SECONDS}s: {error}")
@@ -0,0 +1,311 @@
+# tubealgo/services/report_service.py
+"""
+Monthly PDF reports, generated in the background and cached on disk.
+
+Rendering a report (API calls + WeasyPrint) takes seconds of CPU, so it runs
+in the generate_monthly_report_pdf Celery task instead of the request. The
+PDF is saved under REPORT_CACHE_DIR/<user_id>/<period>_<version>.pdf, where
+the period is the last complete calendar month (YYYYMM) and the version comes
+from the latest warehouse ingest and channel snapshot inside that month. A
+repeat download of the same month with unchanged data is served straight from
+disk, including the copy generate_month_end_reports builds on the 1st.
+
+Job progress is kept in Redis (report-job:<user_id>) for the status page to
+poll. When the web process can't see the worker's disk (separate services),
+an on-demand PDF is also handed over through Redis for HANDOFF_SECONDS and
+written to the web process's own cache on first download.
+"""
+
+import os
+import json
+import glob
+import logging
+from datetime import datetime, timedelta, timezone, time
+from flask import current_app, render_template
+from redis.exceptions import RedisError
+from sqlalchemy import func
+from .. import db
+from ..models import ChannelSnapshot, AnalyticsIngestRun
+from .channel_fetcher import analyze_channel
+from .youtube_manager import get_user_videos
+from .analytics_warehouse import (
+    has_warehouse_data, get_channel_period_totals, get_channel_daily_series,
+    get_top_videos_by_views, get_traffic_breakdown, REFRESH_WINDOW_DAYS
+)
+from .redis_client import get_redis, mark_redis_failure
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_SECONDS = 3600
+# YouTube Analytics insightTrafficSourceType values; others are shown title-cased.
+TRAFFIC_SOURCE_LABELS = {
+    'YT_SEARCH': 'YouTube search',
+    'SUGGESTED': 'Suggested videos',
+    'BROWSE': 'Browse features',
+    'SHORTS': 'Shorts feed',
+    'SUBSCRIBER': 'Subscriptions feed',
+    'NOTIFICATION': 'Notifications',
+    'YT_CHANNEL': 'Channel pages',
+    'PLAYLIST': 'Playlists',
+    'END_SCREEN': 'End screens',
+    'EXT_URL': 'External websites',
+    'NO_LINK_OTHER': 'Direct or unknown',
+    'YT_OTHER_PAGE': 'Other YouTube features',
+}
+HANDOFF_SECONDS = 86400
+
+
+# --- Cache keys and paths ---
+
+def report_period(today=None):
+    """(start, end) of the report window: the last complete calendar month (UTC, end inclusive)."""
+    today = today or datetime.now(timezone.utc).date()
+    last_day = today.replace(day=1) - timedelta(days=1)
+    start = datetime.combine(last_day.replace(day=1), time.min, tzinfo=timezone.utc)
+    end = datetime.combine(last_day, time.max, tzinfo=timezone.utc)
+    return start, end
+
+def is_period_final(channel, end):
+    """True once ingestion has moved past the refresh window, so days up to `end` are no longer re-pulled."""
+    ingested = db.session.query(AnalyticsIngestRun.last_ingested_date).filter_by(channel_db_id=channel.id).scalar()
+    return bool(ingested and ingested >= end.date() + timedelta(days=REFRESH_WINDOW_DAYS))
+
+def data_version(channel, end):
+    """Changes whenever new warehouse data or a new channel snapshot lands for days up to `end`."""
+    if is_period_final(channel, end):
+        ingested = 'final'
+    else:
+        # Every ingest run may re-pull the last REFRESH_WINDOW_DAYS, so key on the run itself
+        last_run = db.session.query(AnalyticsIngestRun.last_run_at).filter_by(channel_db_id=channel.id).scalar()
+        ingested = last_run.strftime('%Y%m%d%H%M%S') if last_run else 'none'
+    snapshot = db.session.query(func.max(ChannelSnapshot.date)).filter(
+        ChannelSnapshot.channel_db_id == channel.id, ChannelSnapshot.date <= end.date()
+    ).scalar()
+    return f"{ingested}-{snapshot.strftime('%Y%m%d') if snapshot else 'none'}"
+
+def report_key(channel, today=None):
+    start, end = report_period(today)
+    return f"{start.strftime('%Y%m')}_{data_version(channel, end)}"
+
+def _user_dir(user_id):
+    return os.path.join(current_app.config['REPORT_CACHE_DIR'], str(user_id))
+
+def report_path(user_id, key):
+    return os.path.join(_user_dir(user_id), f"{key}.pdf")
+
+def _period_from_key(key):
+    """report_period() of the month a report key was made for."""
+    month_start = datetime.strptime(key.split('_', 1)[0], '%Y%m').date()
+    return report_period((month_start + timedelta(days=32)).replace(day=1))
+
+def report_filename(channel, key):
+    from ..routes.utils import sanitize_filename
+    month = datetime.strptime(key.split('_', 1)[0], '%Y%m')
+    return f"Monthly_Report_{sanitize_filename(channel.channel_title or 'Channel')}_{month.strftime('%Y_%m')}.pdf"
+
+def _handoff_key(user_id, key):
+    return f"report-pdf:{user_id}:{key}"
+
+
+# --- Disk cache ---
+
+def save_report(user_id, key, pdf_bytes):
+    """Writes the PDF atomically and drops the user's oldest reports beyond REPORT_CACHE_KEEP."""
+    directory = _user_dir(user_id)
+    os.makedirs(directory, exist_ok=True)
+    path = report_path(user_id, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, path)
+
+    keep = current_app.config.get('REPORT_CACHE_KEEP', 3)
+    reports = sorted(glob.glob(os.path.join(directory, '*.pdf')), key=os.path.getmtime, reverse=True)
+    for old_path in reports[keep:]:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+    return path
+
+def find_cached_report(user_id, key):
+    """Path of a ready report on this machine's disk (pulling a Redis handoff if needed), or None."""
+    path = report_path(user_id, key)
+    if os.path.exists(path):
+        return path
+
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        pdf_bytes = client.get(_handoff_key(user_id, key))
+    except RedisError as e:
+        mark_redis_failure(e)
+        return None
+    if not pdf_bytes:
+        return None
+    return save_report(user_id, key, pdf_bytes)
+
+
+# --- Job status ---
+
+def get_job_status(user_id):
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(f"report-job:{user_id}")
+    except RedisError as e:
+        mark_redis_failure(e)
+        return None
+    return json.loads(raw) if raw else None
+
+def set_job_status(user_id, key, state, progress=0, error=None):
+    client = get_redis()
+    if client is None:
+        return
+    status = {'key': key, 'state': state, 'progress': progress, 'error': error}
+    try:
+        client.set(f"report-job:{user_id}", json.dumps(status), ex=JOB_STATUS_SECONDS)
+    except RedisError as e:
+        mark_redis_failure(e)
+
+def queue_report(user_id, key):
+    """
+    Queues generation unless a job for the same report is already queued or running.
+    Returns the job status, or None if Redis is unavailable (caller generates inline).
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    status = {'key': key, 'state': 'queued', 'progress': 0, 'error': None}
+    try:
+        current = client.get(f"report-job:{user_id}")
+        if current:
+            current = json.loads(current)
+            if current.get('key') == key and current.get('state') in ('queued', 'running'):
+                return current
+        client.set(f"report-job:{user_id}", json.dumps(status), ex=JOB_STATUS_SECONDS)
+    except RedisError as e:
+        mark_redis_failure(e)
+        return None
+
+    from ..jobs import generate_monthly_report_pdf
+    generate_monthly_report_pdf.delay(user_id, key, True)
+    return status
+
+
+# --- Generation ---
+
+def build_report_context(user, credentials, period=None):
+    """Data for reports/monthly_summary.html, or {'error': ...}."""
+    start, end = period or report_period()
+    channel = user.channel
+
+    channel_stats = analyze_channel(channel.channel_id_youtube)
+    if 'error' in channel_stats:
+        return {'error': channel_stats['error']}
+
+    growth = {"subscribers_gained": 0, "views_gained": 0}
+    # Prefer the local analytics warehouse; fall back to the snapshots around the period
+    warehouse_totals = get_channel_period_totals(channel.id, start.date(), end.date())
+    if warehouse_totals:
+        growth["subscribers_gained"] = warehouse_totals['net_subscribers']
+        growth["views_gained"] = warehouse_totals['views']
+    else:
+        past_snapshot = ChannelSnapshot.query.filter(
+            ChannelSnapshot.channel_db_id == channel.id,
+            ChannelSnapshot.date <= start.date()
+        ).order_by(ChannelSnapshot.date.desc()).first()
+        end_snapshot = ChannelSnapshot.query.filter(
+            ChannelSnapshot.channel_db_id == channel.id,
+            ChannelSnapshot.date <= end.date()
+        ).order_by(ChannelSnapshot.date.desc()).first()
+        if past_snapshot:
+            end_subscribers = end_snapshot.subscribers if end_snapshot else channel_stats.get('Subscribers', 0)
+            end_views = end_snapshot.views if end_snapshot else channel_stats.get('Total Views', 0)
+            growth["subscribers_gained"] = end_subscribers - past_snapshot.subscribers
+            growth["views_gained"] = end_views - past_snapshot.views
+
+    all_videos = get_user_videos(user, credentials) if credentials else []
+    if not isinstance(all_videos, list):
+        all_videos = []
+
+    from_warehouse = has_warehouse_data(channel.id, start.date(), end.date())
+    if from_warehouse:
+        # Any video can top the month, not just the ones uploaded in it
+        videos_by_id = {v['id']: v for v in all_videos}
+        top_videos = [
+            dict(videos_by_id.get(video_id, {'title': video_id, 'view_count': 0, 'like_count': 0}), period_views=views)
+            for video_id, views in get_top_videos_by_views(channel.id, start.date(), end.date())
+        ]
+        weekly = _weekly_totals(get_channel_daily_series(channel.id, start.date(), end.date()), start.date(), end.date())
+        traffic_sources = _traffic_shares(get_traffic_breakdown(channel.id, start.date(), end.date()))
+    else:
+        videos_in_period = [
+            v for v in all_videos
+            if start <= datetime.fromisoformat(v['published_at'].replace('Z', '+00:00')) <= end
+        ]
+        top_videos = sorted(videos_in_period, key=lambda x: x.get('view_count', 0), reverse=True)[:5]
+        weekly, traffic_sources = [], []
+
+    return {
+        'channel_stats': channel_stats,
+        'report_period': f"{start.strftime('%B %d, %Y')} - {end.strftime('%B %d, %Y')}",
+        'growth': growth,
+        'watch_hours': warehouse_totals['watch_hours'] if warehouse_totals else None,
+        'top_videos': top_videos,
+        'from_warehouse': from_warehouse,
+        'weekly': weekly,
+        'traffic_sources': traffic_sources,
+        'generation_date': datetime.now(timezone.utc).strftime('%B %d, %Y'),
+    }
+
+def _weekly_totals(daily, start_date, end_date):
+    """Buckets a get_channel_daily_series() result into 7-day rows from start_date (the last one may be shorter)."""
+    weeks = []
+    week_start = start_date
+    while week_start <= end_date:
+        week_end = min(week_start + timedelta(days=6), end_date)
+        days = [daily[d] for d in daily if week_start <= d <= week_end]
+        weeks.append({
+            'label': f"{week_start.strftime('%b %d')} - {week_end.strftime('%b %d')}",
+            'views': sum(d['views'] for d in days),
+            'net_subscribers': sum(d['net_subscribers'] for d in days),
+        })
+        week_start = week_end + timedelta(days=1)
+    return weeks
+
+def _traffic_shares(breakdown):
+    total = sum(views for _, views in breakdown)
+    if not total:
+        return []
+    return [{
+        'source': TRAFFIC_SOURCE_LABELS.get(source, source.replace('_', ' ').title()),
+        'views': views,
+        'share': round(views * 100 / total, 1),
+    } for source, views in breakdown]
+
+def generate_report(user, credentials, key, handoff=False):
+    """Renders and caches one report. Returns {'success': True, 'path': ...} or {'error': ...}."""
+    set_job_status(user.id, key, 'running', 10)
+    context = build_report_context(user, credentials, _period_from_key(key))
+    if 'error' in context:
+        set_job_status(user.id, key, 'error', error=context['error'])
+        return context
+
+    set_job_status(user.id, key, 'running', 50)
+    html_string = render_template('reports/monthly_summary.html', **context)
+    from weasyprint import HTML
+    pdf_bytes = HTML(string=html_string).write_pdf()
+    path = save_report(user.id, key, pdf_bytes)
+
+    if handoff:
+        client = get_redis()
+        if client is not None:
+            try:
+                client.set(_handoff_key(user.id, key), pdf_bytes, ex=HANDOFF_SECONDS)
+            except RedisError as e:
+                mark_redis_failure(e)
+    set_job_status(user.id, key, 'done', 100)
+    return {'success': True, 'path': path}
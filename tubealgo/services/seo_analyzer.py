@@ -7,7 +7,6 @@ YouTube video aur channel ke liye comprehensive SEO score calculate karta hai
 import re
 from typing import Dict, List, Tuple
 from collections import Counter
-import google.generativeai as genai
 from tubealgo import db
 from tubealgo.models.youtube_models import Video
 import logging
@@ -35,6 +34,7 @@ class SEOScoreAnalyzer:
     
     def __init__(self, gemini_api_key: str):
         """Initialize SEO Analyzer with Gemini API"""
+        import google.generativeai as genai
         genai.configure(api_key=gemini_api_key)
         self.model = genai.GenerativeModel('gemini-pro')
     
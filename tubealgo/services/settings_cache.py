@@ -0,0 +1,117 @@
+# tubealgo/services/settings_cache.py
+"""
+Process-local snapshot of the SiteSetting table.
+
+get_setting() is called from templates, logging, feature flags and API
+clients, so reading the table on every call adds dozens of identical queries
+to a single page. Instead each process loads all settings once and serves
+reads from a dict.
+
+When settings are saved, publish_settings_changed() drops the local copy and
+publishes on a Redis channel; a listener thread in every other process drops
+its copy too, so the next read reloads. If Redis is unavailable the snapshot
+still expires after SNAPSHOT_TTL_SECONDS.
+"""
+
+import os
+import time
+import logging
+import threading
+import redis
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_CHANNEL = 'tubealgo:settings-changed'
+SNAPSHOT_TTL_SECONDS = 300
+RETRY_AFTER_FAILURE_SECONDS = 5
+LISTENER_RECONNECT_SECONDS = 5
+
+
+def _parse_value(value):
+    if value is None:
+        return None
+    val_lower = value.lower()
+    if val_lower == 'true': return True
+    if val_lower == 'false': return False
+    return value
+
+
+class SettingsSnapshot:
+    """Thread-safe, lazily loaded {key: parsed value} copy of SiteSetting."""
+
+    def __init__(self):
+        self._values = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def get(self, key, default=None):
+        values = self._values
+        if values is None or time.monotonic() > self._expires_at:
+            values = self._load()
+        value = values.get(key)
+        return default if value is None else value
+
+    def invalidate(self):
+        self._values = None
+
+    def _load(self):
+        from .. import db
+        from ..models import SiteSetting
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock.
+            if self._values is not None and time.monotonic() <= self._expires_at:
+                return self._values
+            self._ensure_listener()
+            try:
+                values = {s.key: _parse_value(s.value) for s in SiteSetting.query.all()}
+                self._expires_at = time.monotonic() + SNAPSHOT_TTL_SECONDS
+            except Exception as e:
+                # Table missing or DB down: serve defaults and retry shortly.
+                db.session.rollback()
+                logger.warning(f"Could not load site settings: {e}")
+                values = {}
+                self._expires_at = time.monotonic() + RETRY_AFTER_FAILURE_SECONDS
+            self._values = values
+            return values
+
+    def _ensure_listener(self):
+        # Started lazily (and again after a fork) so every worker process gets its own thread.
+        if self._listener_pid == os.getpid():
+            return
+        try:
+            redis_url = current_app.config.get('REDIS_URL')
+        except RuntimeError:
+            return
+        if not redis_url:
+            return
+        self._listener_pid = os.getpid()
+        thread = threading.Thread(target=self._listen, args=(redis_url,), name='SettingsListener', daemon=True)
+        thread.start()
+
+    def _listen(self, redis_url):
+        while True:
+            try:
+                pubsub = redis.from_url(redis_url).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(SETTINGS_CHANNEL)
+                # Anything published while we were disconnected was missed.
+                self.invalidate()
+                for message in pubsub.listen():
+                    if message and message.get('type') == 'message':
+                        self.invalidate()
+            except Exception as e:
+                logger.info(f"Settings listener disconnected, retrying: {e}")
+                time.sleep(LISTENER_RECONNECT_SECONDS)
+
+
+settings_snapshot = SettingsSnapshot()
+
+
+def publish_settings_changed():
+    """Call after committing SiteSetting changes; invalidates this process and all others."""
+    settings_snapshot.invalidate()
+    try:
+        redis.from_url(current_app.config['REDIS_URL']).publish(SETTINGS_CHANNEL, '1')
+    except Exception as e:
+        logger.warning(f"Could not publish settings change (other workers refresh within {SNAPSHOT_TTL_SECONDS}s): {e}")
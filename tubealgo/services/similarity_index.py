@@ -0,0 +1,206 @@
+# tubealgo/services/similarity_index.py
+"""
+Local "similar channels" index.
+
+Every channel the app fetches (analysed channels, competitors, top channels
+per category, search results) gets a ChannelProfile row: term counts from its
+title, description, keywords, video tags and video titles, kept per source so
+each fetch path only replaces what it saw.
+
+Each process keeps an in-memory TF-IDF index over those profiles with an
+inverted term -> channels map. A query only scores channels sharing one of the
+source channel's strongest terms (ignoring terms common to a large share of
+the corpus), then ranks them by cosine similarity. New profiles are added to
+the local index immediately; other processes pick them up on their next
+reload (INDEX_RELOAD_SECONDS).
+"""
+
+import re
+import math
+import time
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from sqlalchemy.orm import Session
+from .. import db
+from ..models import ChannelProfile
+
+logger = logging.getLogger(__name__)
+
+SOURCE_WEIGHTS = {'title': 3.0, 'keywords': 2.0, 'tags': 2.0, 'video_titles': 1.0, 'description': 1.0}
+MAX_TERMS_PER_SOURCE = 150
+INDEX_RELOAD_SECONDS = 600
+QUERY_TERMS = 40
+MAX_DOC_FRACTION = 0.3
+MIN_SCORE = 0.05
+
+TOKEN_RE = re.compile(r'[\w\u0900-\u097F]+')
+STOPWORDS = frozenset("""
+a an and are as at be by for from how i in is it my of on or our the this to we what with you your
+new video videos channel official full episode part vs top best live watch subscribe youtube shorts short
+hindi english 2023 2024 2025 2026
+का की के को में है हैं और से पर यह ये एक कैसे क्या
+""".split())
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower())
+            if len(t) > 1 and not t.isdigit() and t not in STOPWORDS]
+
+def _term_counts(texts):
+    counts = Counter()
+    for text in texts:
+        counts.update(tokenize(text))
+    return dict(counts.most_common(MAX_TERMS_PER_SOURCE))
+
+def _combined_weights(sources):
+    weights = Counter()
+    for source, counts in (sources or {}).items():
+        factor = SOURCE_WEIGHTS.get(source, 1.0)
+        for term, count in counts.items():
+            weights[term] += factor * count
+    return dict(weights)
+
+
+class SimilarityIndex:
+    """
+    Vectors are normalised with the IDF at the time they were added; the
+    periodic reload recomputes them all against the current corpus.
+    """
+    def __init__(self):
+        self.weights = {}   # channel_id -> {term: weight}
+        self.vectors = {}   # channel_id -> normalised TF-IDF vector
+        self.meta = {}      # channel_id -> {'title', 'thumbnail', 'subscribers'}
+        self.df = Counter()
+        self.postings = defaultdict(set)
+
+    def put(self, channel_id, weights, meta, vectorize=True):
+        for term in self.weights.get(channel_id, ()):
+            self.df[term] -= 1
+            self.postings[term].discard(channel_id)
+        self.weights[channel_id] = weights
+        self.meta[channel_id] = meta
+        for term in weights:
+            self.df[term] += 1
+            self.postings[term].add(channel_id)
+        if vectorize:
+            self.vectors[channel_id] = self._vector(weights)
+
+    def vectorize_all(self):
+        self.vectors = {channel_id: self._vector(weights) for channel_id, weights in self.weights.items()}
+
+    def _vector(self, weights):
+        n = len(self.weights)
+        vector = {term: (1 + math.log(w)) * (math.log((1 + n) / (1 + self.df[term])) + 1)
+                  for term, w in weights.items() if w > 0}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {term: v / norm for term, v in vector.items()}
+
+    def query(self, channel_id, limit=10):
+        source = self.vectors.get(channel_id)
+        if not source:
+            return []
+        max_df = max(2, len(self.weights) * MAX_DOC_FRACTION)
+
+        candidates = set()
+        for term in sorted(source, key=source.get, reverse=True)[:QUERY_TERMS]:
+            if self.df[term] <= max_df:
+                candidates |= self.postings[term]
+        candidates.discard(channel_id)
+
+        scored = []
+        for candidate in candidates:
+            small, large = sorted((source, self.vectors[candidate]), key=len)
+            score = sum(v * large.get(term, 0.0) for term, v in small.items())
+            if score >= MIN_SCORE:
+                scored.append((score, candidate))
+        scored.sort(reverse=True)
+        return [dict(self.meta[c], channel_id=c, score=round(s, 3)) for s, c in scored[:limit]]
+
+
+_index = None
+_index_loaded_at = 0
+_index_lock = threading.Lock()
+
+def _profile_meta(profile):
+    return {'title': profile.title, 'thumbnail': profile.thumbnail_url, 'subscribers': profile.subscribers}
+
+def _get_index():
+    global _index, _index_loaded_at
+    if _index is None or time.monotonic() - _index_loaded_at > INDEX_RELOAD_SECONDS:
+        with _index_lock:
+            if _index is None or time.monotonic() - _index_loaded_at > INDEX_RELOAD_SECONDS:
+                index = SimilarityIndex()
+                for profile in ChannelProfile.query.all():
+                    index.put(profile.channel_id_youtube, _combined_weights(profile.sources), _profile_meta(profile), vectorize=False)
+                index.vectorize_all()
+                _index, _index_loaded_at = index, time.monotonic()
+                logger.info(f"Similarity index loaded with {len(index.weights)} channels")
+    return _index
+
+
+def index_channels(entries):
+    """
+    Creates or updates profiles in one commit. Each entry is a dict with
+    'channel_id' plus any of 'title', 'thumbnail', 'subscribers', and the text
+    sources ('description', 'keywords': str; 'tags', 'video_titles': lists).
+    Sources that are left out keep their previous terms. Never raises.
+
+    Uses its own session, so the caller's pending changes in db.session are
+    neither committed early nor rolled back by a failure here.
+    """
+    try:
+        ids = [e['channel_id'] for e in entries if e.get('channel_id')]
+        if not ids:
+            return
+        with Session(db.engine, expire_on_commit=False) as session, session.begin():
+            profiles = {p.channel_id_youtube: p for p in session.query(ChannelProfile).filter(ChannelProfile.channel_id_youtube.in_(ids)).all()}
+            for entry in entries:
+                channel_id = entry.get('channel_id')
+                if not channel_id:
+                    continue
+                profile = profiles.get(channel_id)
+                if profile is None:
+                    profile = ChannelProfile(channel_id_youtube=channel_id, title=entry.get('title') or channel_id, sources={})
+                    session.add(profile)
+                    profiles[channel_id] = profile
+
+                sources = dict(profile.sources or {})
+                if entry.get('title'):
+                    profile.title = entry['title'][:200]
+                    sources['title'] = _term_counts([entry['title']])
+                for source in ('description', 'keywords'):
+                    if entry.get(source) is not None:
+                        sources[source] = _term_counts([entry[source]])
+                for source in ('tags', 'video_titles'):
+                    if entry.get(source) is not None:
+                        sources[source] = _term_counts(entry[source])
+                profile.sources = sources
+                if entry.get('thumbnail'):
+                    profile.thumbnail_url = entry['thumbnail'][:255]
+                if entry.get('subscribers') is not None:
+                    profile.subscribers = entry['subscribers']
+                profile.updated_at = datetime.utcnow()
+    except Exception as e:
+        logger.warning(f"Could not update channel profiles: {e}")
+        return
+
+    if _index is not None:
+        with _index_lock:
+            for channel_id in set(ids):
+                profile = profiles[channel_id]
+                _index.put(channel_id, _combined_weights(profile.sources), _profile_meta(profile))
+
+def index_channel(channel_id, **fields):
+    index_channels([dict(fields, channel_id=channel_id)])
+
+def profile_sources(channel_id):
+    """Names of the text sources already stored for a channel."""
+    profile = ChannelProfile.query.filter_by(channel_id_youtube=channel_id).first()
+    return set(profile.sources or {}) if profile else set()
+
+def find_similar(channel_id, limit=10):
+    index = _get_index()
+    with _index_lock:
+        return index.query(channel_id, limit)
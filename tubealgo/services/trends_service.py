@@ -0,0 +1,176 @@
+# tubealgo/services/trends_service.py
+"""
+Google Trends (YouTube search) interest for keywords.
+
+Google accepts up to 5 keywords per payload and scales every payload to its
+own 0-100 range, so lone-keyword charts can't be compared with each other.
+Here each payload carries up to KEYWORDS_PER_PAYLOAD keywords plus a fixed
+anchor keyword (TRENDS_ANCHOR_KEYWORD), and every series is rescaled so the
+anchor's average is 100. A keyword at 50 is searched about half as much as
+the anchor, whichever payload it came from.
+
+Results are cached in ApiCache per normalised keyword and timeframe. Cache
+misses from one call are fetched together, with one TrendReq (and its Google
+cookies) kept per process. A 429 from Google starts an exponential backoff
+stored in Redis, so every worker stops asking until it expires.
+"""
+
+import os
+import time
+import logging
+import threading
+from flask import current_app
+from redis.exceptions import RedisError
+from .cache_manager import get_from_cache, set_to_cache
+from .redis_client import get_redis, mark_redis_failure
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAMES = ('today 12-m', 'today 3-m', 'today 5-y')
+DEFAULT_TIMEFRAME = 'today 12-m'
+KEYWORDS_PER_PAYLOAD = 4  # Google's limit is 5; one slot goes to the anchor
+MAX_KEYWORDS = 8
+CACHE_HOURS = 12
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 3600
+BACKOFF_UNTIL_KEY = "trends:backoff-until"
+BACKOFF_LEVEL_KEY = "trends:backoff-level"
+BACKOFF_LEVEL_TTL = 6 * 3600
+
+_clients = {}
+_client_lock = threading.Lock()
+_local_backoff_until = 0
+
+
+def normalize_keyword(text):
+    return ' '.join((text or '').lower().split())
+
+def _cache_key(keyword, timeframe):
+    return f"google_trend_v2:{timeframe}:{keyword}"[:255]
+
+def _get_client():
+    """One TrendReq per process; creating one fetches Google cookies. Call with _client_lock held."""
+    pid = os.getpid()
+    client = _clients.get(pid)
+    if client is None:
+        from pytrends.request import TrendReq  # Pulls in pandas; only needed on a cache miss
+        client = TrendReq(hl='en-US', tz=330, timeout=(10, 30))
+        _clients[pid] = client
+    return client
+
+
+# --- Shared backoff ---
+
+def backoff_remaining():
+    """Seconds until Google Trends may be asked again (0 if not backing off)."""
+    client = get_redis()
+    if client is not None:
+        try:
+            until = client.get(BACKOFF_UNTIL_KEY)
+            return max(0, int(float(until) - time.time())) if until else 0
+        except RedisError as e:
+            mark_redis_failure(e)
+    return max(0, int(_local_backoff_until - time.time()))
+
+def _start_backoff():
+    global _local_backoff_until
+    level = 1
+    client = get_redis()
+    if client is not None:
+        try:
+            level = client.incr(BACKOFF_LEVEL_KEY)
+            client.expire(BACKOFF_LEVEL_KEY, BACKOFF_LEVEL_TTL)
+        except RedisError as e:
+            mark_redis_failure(e)
+            client = None
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (level - 1), BACKOFF_MAX_SECONDS)
+    until = time.time() + delay
+    _local_backoff_until = until
+    if client is not None:
+        try:
+            client.set(BACKOFF_UNTIL_KEY, until, ex=delay)
+        except RedisError as e:
+            mark_redis_failure(e)
+    logger.warning(f"Google Trends rate limited; backing off for {delay}s")
+
+def _reset_backoff():
+    client = get_redis()
+    if client is not None:
+        try:
+            client.delete(BACKOFF_LEVEL_KEY)
+        except RedisError as e:
+            mark_redis_failure(e)
+
+
+# --- Fetching ---
+
+def _is_rate_limited(error):
+    return getattr(getattr(error, 'response', None), 'status_code', None) == 429
+
+def _busy_error(wait):
+    return {'error': f'Google Trends is busy. Please try again in {max(1, wait // 60)} min.', 'retry_after': wait}
+
+def _fetch_payload(keywords, timeframe):
+    """{keyword: trend} for up to KEYWORDS_PER_PAYLOAD keywords, rescaled to the anchor."""
+    anchor = normalize_keyword(current_app.config.get('TRENDS_ANCHOR_KEYWORD'))
+    payload = keywords + ([anchor] if anchor and anchor not in keywords else [])
+    with _client_lock:
+        pytrends = _get_client()
+        pytrends.build_payload(payload, cat=0, timeframe=timeframe, geo='', gprop='youtube')
+        df = pytrends.interest_over_time()
+
+    if df.empty:
+        return {keyword: {'labels': [], 'data': [], 'anchor': anchor} for keyword in keywords}
+
+    labels = df.index.strftime('%d %b' if timeframe == 'today 3-m' else '%b %Y').tolist()
+    anchor_mean = float(df[anchor].mean()) if anchor in df else 0
+    scale = 100 / anchor_mean if anchor_mean else 1
+    return {keyword: {
+        'labels': labels,
+        'data': [round(float(v) * scale, 1) for v in df[keyword].tolist()],
+        'anchor': anchor if anchor_mean else None,
+    } for keyword in keywords}
+
+def get_trends(keywords, timeframe=DEFAULT_TIMEFRAME):
+    """
+    {keyword: {'labels', 'data', 'anchor'}} for up to MAX_KEYWORDS keywords
+    (as given). Keywords that couldn't be fetched map to {'error': ...};
+    an empty 'data' list means Google has too little data for it.
+    """
+    if timeframe not in TIMEFRAMES:
+        timeframe = DEFAULT_TIMEFRAME
+    requested = {}
+    for keyword in keywords[:MAX_KEYWORDS]:
+        normalized = normalize_keyword(keyword)
+        if normalized:
+            requested[keyword] = normalized
+
+    found = {}
+    for normalized in set(requested.values()):
+        cached = get_from_cache(_cache_key(normalized, timeframe))
+        if cached:
+            found[normalized] = cached
+
+    pending = sorted(set(requested.values()) - set(found))
+    for start in range(0, len(pending), KEYWORDS_PER_PAYLOAD):
+        batch = pending[start:start + KEYWORDS_PER_PAYLOAD]
+        wait = backoff_remaining()
+        if wait:
+            found.update({keyword: _busy_error(wait) for keyword in pending[start:]})
+            break
+        try:
+            fetched = _fetch_payload(batch, timeframe)
+        except Exception as e:
+            if _is_rate_limited(e):
+                _start_backoff()
+                found.update({keyword: _busy_error(backoff_remaining()) for keyword in pending[start:]})
+                break
+            logger.warning(f"Google Trends failed for {batch}: {e}")
+            found.update({keyword: {'error': f'Could not fetch trend data: {e}'} for keyword in batch})
+            continue
+        _reset_backoff()
+        for keyword, trend in fetched.items():
+            set_to_cache(_cache_key(keyword, timeframe), trend, expire_hours=CACHE_HOURS)
+        found.update(fetched)
+
+    return {keyword: found[normalized] for keyword, normalized in requested.items()}
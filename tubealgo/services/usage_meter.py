@@ -0,0 +1,193 @@
+# tubealgo/services/usage_meter.py
+"""
+Daily usage metering for plan limits.
+
+Plans are cached in memory as plain dicts. Daily counters live in Redis and
+are checked and incremented in one Lua call, so concurrent requests can't
+both slip past a limit and no DB write happens on the request path.
+A periodic job copies the counters back to the User columns for reporting.
+
+If Redis is unavailable the old behaviour is used: counters on the User
+row, committed per request.
+"""
+
+import time
+import logging
+import threading
+from datetime import date, timedelta
+from redis.exceptions import RedisError
+from sqlalchemy import update, or_, bindparam, case, func, Date, Integer
+from .. import db
+from ..models import User, SubscriptionPlan
+from .redis_client import get_redis, mark_redis_failure
+
+logger = logging.getLogger(__name__)
+
+# feature -> (plan limit attribute, User counter column)
+METERED_FEATURES = {
+    'keyword_search': ('keyword_searches_limit', 'daily_keyword_searches'),
+    'ai_generation': ('ai_generations_limit', 'daily_ai_generations'),
+}
+
+PLAN_FIELDS = ('plan_id', 'competitors_limit', 'keyword_searches_limit', 'ai_generations_limit',
+               'has_discover_tools', 'has_ai_suggestions', 'playlist_suggestions_limit', 'has_comment_reply')
+PLAN_CACHE_SECONDS = 60
+COUNTER_TTL_SECONDS = 2 * 24 * 3600
+FLUSH_BATCH_SIZE = 500
+
+# KEYS: counter, dirty set. ARGV: limit (-1 = unlimited), ttl, user id, seed value.
+# Seeds a missing counter from the DB value (e.g. after a Redis restart), then
+# increments, undoing the increment if it went past the limit.
+_CONSUME_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SET', KEYS[1], ARGV[4], 'EX', ARGV[2])
+end
+local used = redis.call('INCR', KEYS[1])
+local limit = tonumber(ARGV[1])
+if limit >= 0 and used > limit then
+    redis.call('DECR', KEYS[1])
+    return -1
+end
+redis.call('SADD', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return used
+"""
+
+_plan_cache = {}
+_plan_cache_expires = 0
+_plan_lock = threading.Lock()
+_consume_scripts = {}
+
+
+# --- Plans ---
+
+def _load_plans():
+    return {p.plan_id: {field: getattr(p, field) for field in PLAN_FIELDS} for p in SubscriptionPlan.query.all()}
+
+def get_plan(plan_id):
+    """Plan limits as a dict, falling back to the free plan. Served from memory."""
+    global _plan_cache, _plan_cache_expires
+    if time.monotonic() > _plan_cache_expires:
+        with _plan_lock:
+            if time.monotonic() > _plan_cache_expires:
+                _plan_cache = _load_plans()
+                _plan_cache_expires = time.monotonic() + PLAN_CACHE_SECONDS
+    return _plan_cache.get(plan_id) or _plan_cache.get('free')
+
+def invalidate_plan_cache():
+    global _plan_cache_expires
+    _plan_cache_expires = 0
+
+
+# --- Counters ---
+
+def _counter_key(day, user_id, feature):
+    return f"usage:{day.isoformat()}:{user_id}:{feature}"
+
+def _dirty_key(day):
+    return f"usage:dirty:{day.isoformat()}"
+
+def _db_count(user, column, today):
+    return (getattr(user, column) or 0) if user.last_usage_date == today else 0
+
+def _consume_in_db(user, column, limit, today):
+    if user.last_usage_date != today:
+        user.last_usage_date = today
+        for _, other_column in METERED_FEATURES.values():
+            setattr(user, other_column, 0)
+    used = getattr(user, column) or 0
+    if limit != -1 and used >= limit:
+        return False
+    setattr(user, column, used + 1)
+    db.session.commit()
+    return True
+
+def consume(user, feature):
+    """
+    Uses one unit of a metered feature for today. Returns False (and uses nothing)
+    if the user's plan limit is already reached.
+    """
+    limit_field, column = METERED_FEATURES[feature]
+    plan = get_plan(user.subscription_plan)
+    limit = plan[limit_field] if plan else 0
+    today = date.today()
+
+    client = get_redis()
+    if client is not None:
+        try:
+            script = _consume_scripts.get(id(client))
+            if script is None:
+                script = _consume_scripts[id(client)] = client.register_script(_CONSUME_SCRIPT)
+            used = script(
+                keys=[_counter_key(today, user.id, feature), _dirty_key(today)],
+                args=[limit, COUNTER_TTL_SECONDS, user.id, _db_count(user, column, today)]
+            )
+            return int(used) != -1
+        except RedisError as e:
+            mark_redis_failure(e)
+
+    return _consume_in_db(user, column, limit, today)
+
+
+# --- Flush to the User table ---
+
+def flush_usage_counters():
+    """
+    Copies Redis counters for users with activity today/yesterday into the User
+    columns with one executemany UPDATE per batch. Returns the number of users written.
+
+    A feature without a Redis counter keeps its same-day column value (it may hold
+    counts made while Redis was down), and a counter never lowers the column.
+    """
+    client = get_redis()
+    if client is None:
+        return 0
+
+    today = date.today()
+    columns = {feature: column for feature, (_, column) in METERED_FEATURES.items()}
+    user_table = User.__table__
+    day_param = bindparam('day', type_=Date)
+    same_day = user_table.c.last_usage_date == day_param
+
+    def _merged(column):
+        current = case((same_day, func.coalesce(user_table.c[column], 0)), else_=0)
+        value = bindparam(f"v_{column}", type_=Integer)
+        return case((value.is_(None), current), (current > value, current), else_=value)
+
+    stmt = update(user_table).where(
+        user_table.c.id == bindparam('uid'),
+        # Never overwrite a newer day's numbers with an older day's.
+        or_(user_table.c.last_usage_date.is_(None), user_table.c.last_usage_date <= day_param)
+    ).values(
+        last_usage_date=day_param,
+        **{column: _merged(column) for column in columns.values()}
+    )
+
+    written = 0
+    for day in (today - timedelta(days=1), today):
+        while True:
+            user_ids = client.spop(_dirty_key(day), FLUSH_BATCH_SIZE)
+            if not user_ids:
+                break
+            user_ids = [int(uid) for uid in user_ids]
+            keys = [_counter_key(day, uid, feature) for uid in user_ids for feature in columns]
+            values = client.mget(keys)
+
+            rows = []
+            for i, uid in enumerate(user_ids):
+                row = {'uid': uid, 'day': day}
+                for j, column in enumerate(columns.values()):
+                    raw = values[i * len(columns) + j]
+                    row[f"v_{column}"] = int(raw) if raw is not None else None
+                rows.append(row)
+
+            try:
+                db.session.execute(stmt, rows)
+                db.session.commit()
+                written += len(rows)
+            except Exception:
+                db.session.rollback()
+                # Put them back so the next run retries.
+                client.sadd(_dirty_key(day), *user_ids)
+                raise
+    return written
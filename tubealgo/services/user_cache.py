@@ -0,0 +1,187 @@
+# tubealgo/services/user_cache.py
+"""
+Cached user loading for Flask-Login.
+
+load_user used to run User.query.get() on every request, and pages then
+lazily loaded current_user.channel and counted competitors with more queries.
+Now the user, their channel and their competitor count are read with one
+joined query and kept in Redis for USER_CACHE_SECONDS. On a hit the objects
+are attached to the session without any query, so they behave like normally
+loaded rows (changes to current_user are still saved on commit).
+
+Only the User columns in CACHED_USER_COLUMNS (what login checks and page
+rendering read) are copied to Redis. Everything else, including the password
+hash and the Google OAuth tokens, is left expired and loaded from the DB the
+first time a request touches it.
+
+Cached entries are dropped after any commit that touches a User,
+YouTubeChannel or Competitor row through the ORM (see
+register_cache_invalidation). Writes that bypass the ORM should call
+invalidate_user(). Plan limits are not part of the entry; they come from
+usage_meter.get_plan(), which has its own in-memory cache.
+"""
+
+import json
+import logging
+from datetime import date, datetime
+from redis.exceptions import RedisError
+from sqlalchemy import event, select, func, Date, DateTime
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from .. import db
+from ..models import User, YouTubeChannel, Competitor
+from .redis_client import get_redis, mark_redis_failure
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_SECONDS = 60
+# The only User columns copied to Redis. Keep credentials and other secrets out.
+CACHED_USER_COLUMNS = {
+    'id', 'email', 'profile_pic_url', 'is_admin', 'status', 'timezone', 'created_at', 'last_seen',
+    'subscription_plan', 'subscription_end_date',
+    'last_usage_date', 'daily_keyword_searches', 'daily_ai_generations', 'daily_bulk_edits',
+}
+
+
+def _cache_key(user_id):
+    return f"user-session:{user_id}"
+
+
+# --- Serialization ---
+
+def _dump_row(obj, only=None):
+    data = {}
+    for column in obj.__table__.columns:
+        if only is not None and column.key not in only:
+            continue
+        value = getattr(obj, column.key)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        data[column.key] = value
+    return data
+
+def _load_row(model, data):
+    values = {}
+    for column in model.__table__.columns:
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column.type, Date):
+            value = date.fromisoformat(value)
+        values[column.key] = value
+    obj = model(**values)
+    # Mark as an already-persisted row with no pending changes; missing columns become expired.
+    make_transient_to_detached(obj)
+    return obj
+
+
+# --- Loading ---
+
+def _load_from_db(user_id):
+    competitor_count = select(func.count(Competitor.id)).where(Competitor.user_id == User.id).scalar_subquery()
+    row = db.session.query(User, competitor_count).options(joinedload(User.channel)).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    user, count = row
+    user._cached_competitor_count = count
+    return user
+
+def _store(client, user):
+    entry = {
+        'user': _dump_row(user, only=CACHED_USER_COLUMNS),
+        'channel': _dump_row(user.channel) if user.channel else None,
+        'competitor_count': user._cached_competitor_count,
+    }
+    client.set(_cache_key(user.id), json.dumps(entry), ex=USER_CACHE_SECONDS)
+
+def _attach(entry):
+    user = _load_row(User, entry['user'])
+    channel = _load_row(YouTubeChannel, entry['channel']) if entry['channel'] else None
+    set_committed_value(user, 'channel', channel)
+    if channel is not None:
+        set_committed_value(channel, 'user', user)
+    user = db.session.merge(user, load=False)
+    user._cached_competitor_count = entry['competitor_count']
+    return user
+
+def load_user_cached(user_id):
+    """User for Flask-Login: from Redis if cached, else one joined query (then cached)."""
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = client.get(_cache_key(user_id))
+            if raw is not None:
+                return _attach(json.loads(raw))
+        except RedisError as e:
+            mark_redis_failure(e)
+            client = None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable user cache entry for {user_id}: {e}")
+
+    user = _load_from_db(user_id)
+    if user is not None and client is not None:
+        try:
+            _store(client, user)
+        except RedisError as e:
+            mark_redis_failure(e)
+    return user
+
+def get_competitor_count(user):
+    """Competitor count loaded with the user, falling back to a COUNT query."""
+    count = getattr(user, '_cached_competitor_count', None)
+    if count is None:
+        count = user.competitors.count()
+    return count
+
+
+# --- Invalidation ---
+
+def invalidate_user(*user_ids):
+    client = get_redis()
+    if client is None or not user_ids:
+        return
+    try:
+        client.delete(*[_cache_key(user_id) for user_id in user_ids])
+    except RedisError as e:
+        mark_redis_failure(e)
+
+def _touched_user_ids(session):
+    user_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+        elif isinstance(obj, (YouTubeChannel, Competitor)):
+            user_ids.add(obj.user_id)
+    user_ids.discard(None)
+    return user_ids
+
+def _after_flush(session, flush_context):
+    user_ids = _touched_user_ids(session)
+    if not user_ids:
+        return
+    session.info.setdefault('user_cache_invalidate', set()).update(user_ids)
+    # The count loaded with the user may now be wrong for the rest of this request too.
+    for obj in session.identity_map.values():
+        if isinstance(obj, User) and obj.id in user_ids:
+            obj.__dict__.pop('_cached_competitor_count', None)
+
+def _after_commit(session):
+    user_ids = session.info.pop('user_cache_invalidate', None)
+    if user_ids:
+        try:
+            invalidate_user(*user_ids)
+        except RuntimeError:
+            # Committed outside an app context (no config to reach Redis); entries expire on their own.
+            pass
+
+def _after_rollback(session):
+    session.info.pop('user_cache_invalidate', None)
+
+def register_cache_invalidation():
+    """Hooks ORM session events once per process. Called from create_app."""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
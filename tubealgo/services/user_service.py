@@ -1,7 +1,6 @@
 # tubealgo/services/user_service.py
 
 import os
-from googleapiclient.discovery import build
 from flask_login import current_user
 from .. import db
 from ..models import User, YouTubeChannel
@@ -37,6 +36,7 @@ def create_new_user(email, password=None, referred_by_code=None):
 
 def process_google_login(credentials, flow_type):
     try:
+        from googleapiclient.discovery import build
         user_info_service = build('oauth2', 'v2', credentials=credentials)
         user_info = user_info_service.userinfo().get().execute()
         email_from_google = user_info.get('email', '').lower().strip()
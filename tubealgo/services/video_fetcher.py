@@ -4,16 +4,18 @@ import json
 import logging
 from googleapiclient.errors import HttpError
 from .youtube_core import get_youtube_service
-from .cache_manager import get_from_cache, set_to_cache
+from .cache_manager import get_from_cache, set_to_cache, delete_cache_prefix
 from .fetcher_utils import _create_video_objects, _get_uploads_playlist_id
+from .similarity_index import index_channel
 
-def get_latest_videos(channel_id, max_results=20, page_token=None):
+def get_latest_videos(channel_id, max_results=20, page_token=None, force_refresh=False):
     uploads_playlist_id = _get_uploads_playlist_id(channel_id)
     if not uploads_playlist_id: return {'videos': [], 'nextPageToken': None}
 
     cache_key = f"playlist_videos_v7:{uploads_playlist_id}:{max_results}:{page_token or 'first'}"
-    cached_data = get_from_cache(cache_key)
-    if cached_data: return cached_data
+    if not force_refresh:
+        cached_data = get_from_cache(cache_key)
+        if cached_data: return cached_data
 
     youtube, error = get_youtube_service()
     if error: return {'videos': [], 'nextPageToken': None, 'error': error}
@@ -52,6 +54,34 @@ def get_latest_videos(channel_id, max_results=20, page_token=None):
     except Exception as e:
         return {'videos': [], 'nextPageToken': None, 'error': str(e)}
 
+def get_latest_upload_id(channel_id):
+    """
+    Id of the channel's newest upload from one playlistItems call (1 quota unit,
+    no cache), for cheap new-upload checks. Returns {'video_id': ...} or {'error': ...}.
+    """
+    uploads_playlist_id = _get_uploads_playlist_id(channel_id)
+    if not uploads_playlist_id: return {'video_id': None}
+
+    youtube, error = get_youtube_service()
+    if error: return {'error': error}
+
+    try:
+        response = youtube.playlistItems().list(part="contentDetails", playlistId=uploads_playlist_id, maxResults=1).execute()
+        items = response.get('items', [])
+        return {'video_id': items[0].get('contentDetails', {}).get('videoId') if items else None}
+    except HttpError as e:
+        if e.resp.status == 404:
+            return {'video_id': None}
+        return {'error': str(e)}
+    except Exception as e:
+        return {'error': str(e)}
+
+def invalidate_latest_videos(channel_id):
+    """Drops every cached page of a channel's uploads, e.g. after a new upload was detected."""
+    uploads_playlist_id = _get_uploads_playlist_id(channel_id)
+    if uploads_playlist_id:
+        delete_cache_prefix(f"playlist_videos_v7:{uploads_playlist_id}:")
+
 def get_all_channel_videos(channel_id):
     cache_key = f"all_videos_v2:{channel_id}"
     cached_data = get_from_cache(cache_key)
@@ -73,8 +103,31 @@ def get_all_channel_videos(channel_id):
             break
             
     set_to_cache(cache_key, all_videos, expire_hours=12)
+    if all_videos:
+        index_channel(channel_id, video_titles=[v['title'] for v in all_videos if v.get('title')])
     return all_videos
 
+def iter_channel_videos(channel_id, max_pages=10):
+    """
+    Yields a channel's videos page by page (50 per page, same 500-video cap as
+    get_all_channel_videos), so exports can start before every page is fetched.
+    Uses the full-list cache if it exists; each page is cached by get_latest_videos.
+    """
+    cached_data = get_from_cache(f"all_videos_v2:{channel_id}")
+    if cached_data:
+        yield from cached_data
+        return
+
+    next_page_token = None
+    for _ in range(max_pages):
+        data = get_latest_videos(channel_id, max_results=50, page_token=next_page_token)
+        if 'error' in data or not data.get('videos'):
+            break
+        yield from data['videos']
+        next_page_token = data.get('nextPageToken')
+        if not next_page_token:
+            break
+
 def get_most_viewed_videos(channel_id, max_results=20, page_token=None):
     cache_key = f"most_viewed_v6:{channel_id}:{max_results}:{page_token or 'first'}"
     cached_data = get_from_cache(cache_key)
@@ -3,7 +3,6 @@
 import itertools
 import logging
 from datetime import datetime, timedelta
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from tubealgo.models import get_config_value, APIKeyStatus
 from tubealgo import db
@@ -15,6 +14,7 @@ def get_youtube_service():
     Creates and returns a YouTube Data API service object.
     Cycles through available API keys and automatically resets keys older than 24 hours.
     """
+    from googleapiclient.discovery import build  # ~0.2 s import; kept out of app startup
     API_KEYS_STRING = get_config_value('YOUTUBE_API_KEYS', '')
     API_KEYS = [key.strip() for key in API_KEYS_STRING.split(',') if key.strip()]
     
@@ -5,7 +5,6 @@ import logging
 import re
 import mimetypes
 from datetime import timedelta, datetime
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 import json
@@ -52,6 +51,7 @@ def get_user_videos(user, credentials):
         return cached_videos
 
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         if not user.channel or not user.channel.channel_id_youtube: 
             return []
@@ -95,6 +95,7 @@ def get_user_videos(user, credentials):
 
 def get_user_playlists(credentials):
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         playlists_request = youtube.playlists().list(
             part="snippet,contentDetails,status",
@@ -150,6 +151,7 @@ def get_single_video(credentials, video_id):
     if cached_data:
         return cached_data
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         request = youtube.videos().list(part="snippet,status,contentDetails", id=video_id)
         response = request.execute()
@@ -167,6 +169,7 @@ def get_single_video(credentials, video_id):
 
 def get_single_playlist(credentials, playlist_id):
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         request = youtube.playlists().list(part="snippet,status", id=playlist_id)
         response = request.execute()
@@ -183,6 +186,7 @@ def get_single_playlist(credentials, playlist_id):
 
 def create_playlist(credentials, title, description, privacy_status):
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         body = {
             "snippet": { "title": title, "description": description },
@@ -201,6 +205,7 @@ def create_playlist(credentials, title, description, privacy_status):
 
 def update_playlist(credentials, playlist_id, title, description, privacy_status):
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         playlist_response = youtube.playlists().list(part='snippet,status', id=playlist_id).execute()
         if not playlist_response.get('items'):
@@ -222,6 +227,7 @@ def update_playlist(credentials, playlist_id, title, description, privacy_status
 
 def update_video_details(credentials, video_id, title, description, tags, privacy_status, publish_at=None):
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         video_response = youtube.videos().list(part='snippet,status', id=video_id).execute()
         if not video_response.get('items'): return {'error': 'Video not found.'}
@@ -247,6 +253,7 @@ def update_video_details(credentials, video_id, title, description, tags, privac
 
 def upload_video(credentials, video_filepath, metadata):
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         body = {
             "snippet": {
@@ -275,6 +282,7 @@ def upload_video(credentials, video_filepath, metadata):
 
 def set_video_thumbnail(credentials, video_id, image_filepath):
     try:
+        from googleapiclient.discovery import build
         youtube = build('youtube', 'v3', credentials=credentials)
         mimetype, _ = mimetypes.guess_type(image_filepath)
         with open(image_filepath, 'rb') as file_handle:
@@ -2,10 +2,16 @@
 
 import requests
 import traceback
+from collections import OrderedDict
+from redis.exceptions import RedisError
 from .models import is_admin_telegram_user, User, SystemLog, db, log_system_event
-from .services.notification_service import send_telegram_message
+from .services.notification_service import send_telegram_message, call_telegram
+from .services.redis_client import get_redis, mark_redis_failure
+
+UPDATE_DEDUP_SECONDS = 24 * 3600  # Telegram gives up re-sending an update well within a day
 
 last_update_id = 0
+_seen_updates = OrderedDict()
 
 def answer_callback_query(callback_query_id):
     """बटन क्लिक के बाद लोडिंग आइकॉन को हटाने के लिए टेलीग्राम को जवाब देता है।"""
@@ -13,15 +19,12 @@ def answer_callback_query(callback_query_id):
     TELEGRAM_TOKEN = get_config_value('TELEGRAM_BOT_TOKEN')
     if not TELEGRAM_TOKEN: return
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/answerCallbackQuery"
-    payload = {'callback_query_id': callback_query_id}
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
+    result = call_telegram('answerCallbackQuery', {'callback_query_id': callback_query_id}, TELEGRAM_TOKEN)
+    if not result.get('ok'):
         log_system_event(
             message="Error answering Telegram callback query",
             log_type='ERROR',
-            details={'error': str(e), 'traceback': traceback.format_exc()}
+            details={'error': result.get('description')}
         )
 
 def handle_stats(chat_id):
@@ -197,8 +200,76 @@ def handle_start_or_help(chat_id):
     
     send_telegram_message(chat_id, admin_message, reply_markup=reply_markup)
 
+def handle_update(update):
+    """एक टेलीग्राम अपडेट (मैसेज या बटन क्लिक) को सही कमांड हैंडलर तक पहुँचाता है।"""
+    if 'callback_query' in update:
+        callback_id = update['callback_query']['id']
+        chat_id = update['callback_query']['message']['chat']['id']
+        data = update['callback_query']['data']
+
+        answer_callback_query(callback_id)
+
+        if data == 'stats':
+            handle_stats(chat_id)
+        elif data == 'users':
+            handle_users(chat_id)
+        elif data == 'get_logs':
+            handle_get_logs(chat_id)
+        return
+
+    if 'message' in update and 'text' in update['message']:
+        chat_id = update['message']['chat']['id']
+        text = update['message']['text']
+
+        if text.startswith('/stats'):
+            handle_stats(chat_id)
+        elif text.startswith('/users'):
+            handle_users(chat_id)
+        elif text.startswith('/get_logs'):
+            handle_get_logs(chat_id)
+        elif text.startswith('/find_user'):
+            handle_find_user(chat_id, text)
+        elif text.startswith('/suspend_user'):
+            handle_suspend_user(chat_id, text)
+        elif text.startswith('/upgrade_plan'):
+            handle_upgrade_plan(chat_id, text)
+        elif text.startswith('/start') or text.startswith('/help'):
+            handle_start_or_help(chat_id)
+
+def claim_update(update_id):
+    """
+    True the first time an update_id is seen, across every web node and worker
+    (Redis SET NX). Telegram re-sends updates it thinks failed; those are dropped.
+    Without Redis, falls back to this process's memory.
+    """
+    client = get_redis()
+    if client is not None:
+        try:
+            return bool(client.set(f"telegram-update:{update_id}", 1, nx=True, ex=UPDATE_DEDUP_SECONDS))
+        except RedisError as e:
+            mark_redis_failure(e)
+    if update_id in _seen_updates:
+        return False
+    _seen_updates[update_id] = True
+    while len(_seen_updates) > 1000:
+        _seen_updates.popitem(last=False)
+    return True
+
+def release_update(update_id):
+    """Forgets a claimed update so Telegram's retry is processed (used when it couldn't be queued)."""
+    _seen_updates.pop(update_id, None)
+    client = get_redis()
+    if client is not None:
+        try:
+            client.delete(f"telegram-update:{update_id}")
+        except RedisError as e:
+            mark_redis_failure(e)
+
 def process_updates(app):
-    """टेलीग्राम से नए मैसेज और बटन क्लिक को प्रोसेस करता है।"""
+    """
+    टेलीग्राम से नए मैसेज और बटन क्लिक getUpdates से खींचकर प्रोसेस करता है।
+    सिर्फ लोकल डेवलपमेंट के लिए; प्रोडक्शन में वेबहुक (routes/telegram_routes.py) इस्तेमाल होता है।
+    """
     global last_update_id
     from .models import get_config_value
 
@@ -216,40 +287,8 @@ def process_updates(app):
 
             for update in updates:
                 last_update_id = update['update_id']
-                
-                if 'callback_query' in update:
-                    callback_id = update['callback_query']['id']
-                    chat_id = update['callback_query']['message']['chat']['id']
-                    data = update['callback_query']['data']
-                    
-                    answer_callback_query(callback_id)
-
-                    if data == 'stats':
-                        handle_stats(chat_id)
-                    elif data == 'users':
-                        handle_users(chat_id)
-                    elif data == 'get_logs':
-                        handle_get_logs(chat_id)
-                    continue
-
-                if 'message' in update and 'text' in update['message']:
-                    chat_id = update['message']['chat']['id']
-                    text = update['message']['text']
-
-                    if text.startswith('/stats'):
-                        handle_stats(chat_id)
-                    elif text.startswith('/users'):
-                        handle_users(chat_id)
-                    elif text.startswith('/get_logs'):
-                        handle_get_logs(chat_id)
-                    elif text.startswith('/find_user'):
-                        handle_find_user(chat_id, text)
-                    elif text.startswith('/suspend_user'):
-                        handle_suspend_user(chat_id, text)
-                    elif text.startswith('/upgrade_plan'):
-                        handle_upgrade_plan(chat_id, text)
-                    elif text.startswith('/start') or text.startswith('/help'):
-                        handle_start_or_help(chat_id)
+                if claim_update(update['update_id']):
+                    handle_update(update)
 
         except requests.exceptions.RequestException as e:
             log_system_event(
@@ -262,4 +301,4 @@ def process_updates(app):
                 message="Error processing Telegram updates",
                 log_type='ERROR',
                 details={'error': str(e), 'traceback': traceback.format_exc()}
-            )
\ No newline at end of file
+            )